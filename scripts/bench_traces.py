@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+# scripts/bench_traces.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Benchmarks for the per-seed trace processing: the Spike log filter, the
+Spike and RTL log to CSV conversions, the UVM golden file conversion, the
+trace comparison and the memory image conversion.
+
+The inputs are synthetic but in the exact formats the flow produces: a
+filtered and a full Spike log, the text and binary RTL traces written by
+tb_top.sv, a raw binary image and a small RISC-V ELF for the disassembly.
+They are generated once per size (10k, 1m and 10m commits) under BENCH_DIR
+(default: logs/bench), so no simulator, Spike or toolchain is needed.
+
+Every benchmark runs its script in a fresh child process, the way the
+runners start them, which measures its own time and peak RSS. The best of
+--repeat runs is compared with the stored baseline
+(results/bench_baseline.json, or BENCH_BASELINE), and the run fails if a
+benchmark got slower or larger by more than the tolerance. --save-baseline
+records the current numbers.
+
+Usage:
+    python3 scripts/bench_traces.py [--sizes 10k 1m] [--repeat 3]
+                                    [--only trace_compare_text ...]
+                                    [--tolerance 0.25] [--save-baseline]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import runpy
+import struct
+import resource
+import argparse
+import subprocess
+from commit_log import TEST_START_PC, ECALL_BINARY, format_commit
+from rtl_trace import FLAG_ECALL, FLAG_REG_WRITE, HEADER, RECORD
+from rtl_trace import TRACE_MAGIC, TRACE_VERSION
+from rv32i_disasm import TEST_START_SYMBOL, disassemble
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_BENCH_DIR = os.path.join("logs", "bench")
+DEFAULT_BASELINE = os.path.join("results", "bench_baseline.json")
+
+# Bump when the generated inputs change, so they are regenerated
+GENERATOR_VERSION = "1"
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# The synthetic program: a loop body of this many instructions, executed
+# over and over until the requested number of commits, then an ECALL
+PROGRAM_LENGTH = 4096
+
+# Commit kinds of the loop body, with their share of the instructions
+ALU, LOAD, STORE, BRANCH = range(4)
+KIND_WEIGHTS = {ALU: 70, LOAD: 12, STORE: 12, BRANCH: 6}
+
+# Lines are generated and written in blocks of this many commits
+BLOCK_COMMITS = 65536
+
+# name: (script, arguments); {name} fields are the generated input files
+BENCHMARKS = {
+    "spike_filter": ("commit_log", []),
+    "spike_log_to_csv": (
+        "spike_log_to_csv.py",
+        ["--log", "{spike_log}", "--csv", "{out}"],
+    ),
+    "spike_log_to_golden": (
+        "spike_log_to_golden.py",
+        ["--log", "{spike_log}", "--golden", "{out}"],
+    ),
+    "rtl_log_to_csv_text": (
+        "rtl_log_to_csv.py",
+        ["--log", "{rtl_log}", "--csv", "{out}", "--elf", "{elf}"],
+    ),
+    "rtl_log_to_csv_bin": (
+        "rtl_log_to_csv.py",
+        ["--log", "{rtl_bin}", "--csv", "{out}", "--elf", "{elf}"],
+    ),
+    "trace_compare_text": (
+        "trace_compare.py",
+        ["--spike", "{spike_log}", "--rtl", "{rtl_log}", "--elf", "{elf}"],
+    ),
+    "trace_compare_bin": (
+        "trace_compare.py",
+        ["--spike", "{spike_log}", "--rtl", "{rtl_bin}", "--elf", "{elf}"],
+    ),
+    "bin_conv_bin": ("bin_conv.py", ["--format", "bin", "{image}", "{out}"]),
+    "bin_conv_hex": ("bin_conv.py", ["--format", "hex", "{image}", "{out}"]),
+}
+
+
+def bench_dir():
+    """Directory of the generated inputs"""
+    return os.environ.get("BENCH_DIR", DEFAULT_BENCH_DIR)
+
+
+def baseline_path():
+    """Baseline file, overridable with the BENCH_BASELINE variable"""
+    return os.environ.get("BENCH_BASELINE", DEFAULT_BASELINE)
+
+
+def input_files(size_dir):
+    """Paths of the generated inputs of one size"""
+    return {
+        "spike_log": os.path.join(size_dir, "spike.log"),
+        "spike_full_log": os.path.join(size_dir, "spike_full.log"),
+        "rtl_log": os.path.join(size_dir, "rtl_trace.log"),
+        "rtl_bin": os.path.join(size_dir, "rtl_trace.bin"),
+        "image": os.path.join(size_dir, "image.bin"),
+        "elf": os.path.join(size_dir, "program.o"),
+        "out": os.path.join(size_dir, "out"),
+    }
+
+
+def encode_instruction(rng, kind):
+    """A random RV32I instruction of the given kind, and its destination"""
+    rd = rng.randrange(1, 32)
+    rs1 = rng.randrange(32)
+    rs2 = rng.randrange(32)
+    if kind == LOAD:
+        # lw rd, imm(rs1)
+        imm = rng.randrange(0, 2048, 4)
+        return imm << 20 | rs1 << 15 | 0x2 << 12 | rd << 7 | 0x03, rd
+    if kind == STORE:
+        # sw rs2, 0(rs1)
+        return rs2 << 20 | rs1 << 15 | 0x2 << 12 | 0x23, None
+    if kind == BRANCH:
+        # bne rs1, rs2, +8 (never taken in the synthetic execution)
+        return rs2 << 20 | rs1 << 15 | 0x1 << 12 | 0x8 << 7 | 0x63, None
+
+    choice = rng.randrange(4)
+    if choice == 0:
+        # lui rd, imm
+        return rng.getrandbits(20) << 12 | rd << 7 | 0x37, rd
+    if choice == 1:
+        # addi/xori/ori/andi rd, rs1, imm
+        funct3 = rng.choice([0, 4, 6, 7])
+        return rng.getrandbits(12) << 20 | rs1 << 15 | funct3 << 12 | rd << 7 | 0x13, rd
+    # add/sub/sll/xor/or/and rd, rs1, rs2
+    funct7, funct3 = rng.choice([(0, 0), (0x20, 0), (0, 1), (0, 4), (0, 6), (0, 7)])
+    return funct7 << 25 | rs2 << 20 | rs1 << 15 | funct3 << 12 | rd << 7 | 0x33, rd
+
+
+def synthetic_program(rng):
+    """
+    The loop body as a list of (pc, insn, kind, rd), plus the pc of the
+    ECALL that follows it.
+    """
+    kinds = list(KIND_WEIGHTS)
+    weights = list(KIND_WEIGHTS.values())
+    program = []
+    for index in range(PROGRAM_LENGTH):
+        kind = rng.choices(kinds, weights)[0]
+        insn, rd = encode_instruction(rng, kind)
+        program.append((TEST_START_PC + 4 * index, insn, kind, rd))
+    return program, TEST_START_PC + 4 * PROGRAM_LENGTH
+
+
+def write_elf(path, code, entry):
+    """
+    A minimal 32-bit RISC-V executable: one PT_LOAD segment with the code,
+    a .text section and a symbol table holding TEST_START_SYMBOL.
+    """
+    strtab = b"\0" + TEST_START_SYMBOL.encode() + b"\0"
+    shstrtab = b"\0.text\0.symtab\0.strtab\0.shstrtab\0"
+    symtab = bytes(16) + struct.pack("<IIIBBH", 1, entry, 0, 0x10, 0, 1)
+
+    text_offset = 0x100
+    symtab_offset = text_offset + len(code)
+    strtab_offset = symtab_offset + len(symtab)
+    shstrtab_offset = strtab_offset + len(strtab)
+    shoff = (shstrtab_offset + len(shstrtab) + 3) & ~3
+
+    header = b"\x7fELF" + bytes([1, 1, 1]) + bytes(9)
+    header += struct.pack(
+        "<HHIIIIIHHHHHH", 2, 243, 1, entry, 52, shoff, 0, 52, 32, 1, 40, 5, 4
+    )
+    program_header = struct.pack(
+        "<IIIIIIII", 1, text_offset, entry, entry, len(code), len(code), 5, 4
+    )
+    sections = [
+        (0, 0, 0, 0, 0, 0, 0, 0, 0, 0),
+        (1, 1, 0x6, entry, text_offset, len(code), 0, 0, 4, 0),
+        (7, 2, 0, 0, symtab_offset, len(symtab), 3, 1, 4, 16),
+        (15, 3, 0, 0, strtab_offset, len(strtab), 0, 0, 1, 0),
+        (23, 3, 0, 0, shstrtab_offset, len(shstrtab), 0, 0, 1, 0),
+    ]
+
+    data = bytearray(shoff)
+    data[: len(header)] = header
+    data[52 : 52 + len(program_header)] = program_header
+    data[text_offset:symtab_offset] = code
+    data[symtab_offset:strtab_offset] = symtab
+    data[strtab_offset:shstrtab_offset] = strtab
+    data[shstrtab_offset : shstrtab_offset + len(shstrtab)] = shstrtab
+    for section in sections:
+        data += struct.pack("<IIIIIIIIII", *section)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def line_templates(program):
+    """
+    Per-instruction '%'-templates of the four trace formats. Each takes the
+    written value (if any) of one commit.
+    """
+    templates = []
+    for pc, insn, kind, rd in program:
+        commit = f"core   0: 3 0x{pc:08x} (0x{insn:08x})"
+        address = 0x80010000 + 4 * (pc % 0x1000)
+        if kind in (ALU, LOAD):
+            spike = f"{commit} x{rd:<2} 0x%08x"
+            if kind == LOAD:
+                spike += f" mem 0x{address:08x}"
+            rtl = f"{commit} x{rd} 0x%08x\n"
+        elif kind == STORE:
+            spike = f"{commit} mem 0x{address:08x} 0x%08x"
+            rtl = f"core   0: 0x{pc:08x} (0x{insn:08x})\n"
+        else:
+            spike = commit
+            rtl = f"core   0: 0x{pc:08x} (0x{insn:08x})\n"
+        disasm = f"core   0: 0x{pc:08x} (0x{insn:08x}) {disassemble(insn)}\n"
+        templates.append((spike + "\n", disasm + spike + "\n", rtl, "%" in spike))
+    return templates
+
+
+# The boot ROM of 'spike -l' that jumps to the test, as in a full log
+SPIKE_BOOT = [
+    (0x1000, 0x00000297, "x5  0x00001000"),
+    (0x1004, 0x02028593, "x11 0x00001020"),
+    (0x1008, 0xF1402573, "x10 0x00000000"),
+    (0x100C, 0x0182A283, "x5  0x80000000 mem 0x00001018"),
+    (0x1010, 0x00028067, ""),
+]
+
+
+def generate_inputs(size_dir, commits, seed=1):
+    """Write the synthetic inputs of one size into size_dir"""
+    os.makedirs(size_dir, exist_ok=True)
+    files = input_files(size_dir)
+    rng = random.Random(seed)
+    program, ecall_pc = synthetic_program(rng)
+    templates = line_templates(program)
+
+    code = b"".join(insn.to_bytes(4, "little") for _, insn, _, _ in program)
+    write_elf(files["elf"], code + ECALL_BINARY.to_bytes(4, "little"), TEST_START_PC)
+
+    # One memory word per commit, so the image scales with the trace sizes
+    with open(files["image"], "wb") as f:
+        for start in range(0, commits, BLOCK_COMMITS):
+            f.write(rng.randbytes(4 * min(BLOCK_COMMITS, commits - start)))
+
+    with open(files["spike_log"], "w") as spike, open(
+        files["spike_full_log"], "w"
+    ) as spike_full, open(files["rtl_log"], "w") as rtl, open(
+        files["rtl_bin"], "wb"
+    ) as rtl_bin:
+        for pc, insn, text in SPIKE_BOOT:
+            spike_full.write(
+                f"core   0: 0x{pc:08x} (0x{insn:08x}) {disassemble(insn)}\n"
+            )
+            spike_full.write(f"core   0: 3 0x{pc:08x} (0x{insn:08x}) {text}".rstrip())
+            spike_full.write("\n")
+        rtl_bin.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION))
+
+        for start in range(0, commits, BLOCK_COMMITS):
+            spike_lines = []
+            full_lines = []
+            rtl_lines = []
+            records = []
+            for index in range(start, min(start + BLOCK_COMMITS, commits)):
+                slot = index % PROGRAM_LENGTH
+                pc, insn, kind, rd = program[slot]
+                spike_line, full_line, rtl_line, has_value = templates[slot]
+                value = rng.getrandbits(32)
+                if has_value:
+                    spike_line %= value
+                    full_line %= value
+                if kind in (ALU, LOAD):
+                    rtl_line %= value
+                    records.append(RECORD.pack(pc, insn, value, rd, FLAG_REG_WRITE, 0))
+                else:
+                    records.append(RECORD.pack(pc, insn, 0, 0, 0, 0))
+                spike_lines.append(spike_line)
+                full_lines.append(full_line)
+                rtl_lines.append(rtl_line)
+            spike.writelines(spike_lines)
+            spike_full.writelines(full_lines)
+            rtl.writelines(rtl_lines)
+            rtl_bin.write(b"".join(records))
+
+        # The test ends with an ECALL; Spike then traps into the handler
+        spike.write(format_commit(ecall_pc, ECALL_BINARY))
+        spike_full.write(f"core   0: 0x{ecall_pc:08x} (0x{ECALL_BINARY:08x}) ecall\n")
+        spike_full.write(
+            f"core   0: exception trap_machine_ecall, epc 0x{ecall_pc:08x}\n"
+        )
+        rtl.write(format_commit(ecall_pc, ECALL_BINARY))
+        rtl_bin.write(RECORD.pack(ecall_pc, ECALL_BINARY, 0, 0, FLAG_ECALL, 0))
+
+
+def prepare_inputs(size):
+    """Directory of the inputs of a size, generating them if needed"""
+    size_dir = os.path.join(bench_dir(), size)
+    stamp = os.path.join(size_dir, "generated")
+    try:
+        with open(stamp, "r") as f:
+            if f.read() == GENERATOR_VERSION:
+                return size_dir
+    except OSError:
+        pass
+
+    print(f"--- Generating {size} commit inputs in {size_dir} ---")
+    started = time.time()
+    generate_inputs(size_dir, SIZES[size])
+    with open(stamp, "w") as f:
+        f.write(GENERATOR_VERSION)
+    print(f"--- Generated in {time.time() - started:.1f}s ---")
+    return size_dir
+
+
+def filter_spike_log(full_log, filtered_log):
+    """The Spike log filter of run_spike.py, on a full log"""
+    from commit_log import CommitLogFilter
+
+    log_filter = CommitLogFilter()
+    with open(full_log, "r", errors="replace") as f_in, open(
+        filtered_log, "w"
+    ) as f_out:
+        f_out.writelines(log_filter.filter(f_in))
+
+
+def peak_rss_kb():
+    """
+    Peak RSS of this process. VmHWM only covers the memory of this program,
+    while ru_maxrss also counts what the parent used before the exec.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_child(name, size_dir, result_file):
+    """Child side of a benchmark: run it once and write its time and RSS"""
+    script, arguments = BENCHMARKS[name]
+    files = input_files(size_dir)
+    started = time.perf_counter()
+    if script == "commit_log":
+        filter_spike_log(files["spike_full_log"], files["out"])
+    else:
+        sys.argv = [script] + [argument.format(**files) for argument in arguments]
+        try:
+            runpy.run_path(os.path.join(SCRIPTS_DIR, script), run_name="__main__")
+        except SystemExit as e:
+            if e.code:
+                sys.stderr.write(f"{script} exited with status {e.code}\n")
+                sys.exit(1)
+    seconds = time.perf_counter() - started
+    with open(result_file, "w") as f:
+        json.dump({"seconds": seconds, "max_rss_kb": peak_rss_kb()}, f)
+
+
+def run_benchmark(name, size_dir):
+    """Run a benchmark once in a child process. Returns (seconds, max_rss_kb)."""
+    result_file = os.path.join(size_dir, "result.json")
+    # The disassembly is not cached, like for a freshly compiled test
+    env = dict(os.environ, DV_CACHE="0")
+    result = subprocess.run(
+        [sys.executable, __file__, "--child", name, size_dir, result_file],
+        stdout=subprocess.DEVNULL,
+        env=env,
+    )
+    if result.returncode != 0:
+        print(f"Error: Benchmark {name} failed", file=sys.stderr)
+        sys.exit(1)
+
+    with open(result_file, "r") as f:
+        measured = json.load(f)
+    os.remove(result_file)
+    return measured["seconds"], measured["max_rss_kb"]
+
+
+def load_baseline():
+    """Stored results, keyed by '<benchmark>@<size>'"""
+    try:
+        with open(baseline_path(), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_baseline(results):
+    """Merge results into the stored baseline"""
+    baseline = load_baseline()
+    baseline.update(results)
+    os.makedirs(os.path.dirname(baseline_path()) or ".", exist_ok=True)
+    with open(baseline_path(), "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def compare_to_baseline(key, result, baseline, tolerance):
+    """Regression messages of one result against its baseline"""
+    reference = baseline.get(key)
+    if reference is None:
+        return []
+    messages = []
+    if result["seconds"] > reference["seconds"] * (1 + tolerance):
+        messages.append(
+            f"{key}: {result['seconds']:.3f}s vs. {reference['seconds']:.3f}s"
+        )
+    if result["max_rss_kb"] > reference["max_rss_kb"] * (1 + tolerance):
+        messages.append(
+            f"{key}: peak RSS {result['max_rss_kb']} kB "
+            f"vs. {reference['max_rss_kb']} kB"
+        )
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the trace processing on synthetic inputs."
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        choices=list(SIZES),
+        default=["10k", "1m"],
+        help="Trace sizes in commits (default: 10k 1m)",
+    )
+    parser.add_argument(
+        "--only", nargs="+", choices=list(BENCHMARKS), help="Benchmarks to run"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per benchmark (default: 3)"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=float(os.environ.get("BENCH_TOLERANCE", "0.25")),
+        help="Allowed slowdown and growth over the baseline (default: 0.25)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store the results as the new baseline",
+    )
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    if args.repeat < 1:
+        print("Error: --repeat must be a positive integer.", file=sys.stderr)
+        sys.exit(1)
+
+    baseline = load_baseline()
+    results = {}
+    regressions = []
+
+    print("=" * 57)
+    print("              TRACE PROCESSING BENCHMARKS")
+    print("=" * 57)
+    for size in args.sizes:
+        size_dir = prepare_inputs(size)
+        commits = SIZES[size]
+        print(
+            f"{'benchmark':<22}{'size':>5}{'time [s]':>10}{'Mcommit/s':>11}"
+            f"{'RSS [MB]':>9}"
+        )
+        for name in args.only or BENCHMARKS:
+            runs = [run_benchmark(name, size_dir) for _ in range(args.repeat)]
+            seconds = min(run[0] for run in runs)
+            max_rss_kb = min(run[1] for run in runs)
+            key = f"{name}@{size}"
+            results[key] = {
+                "seconds": round(seconds, 4),
+                "commits_per_second": round(commits / seconds),
+                "max_rss_kb": max_rss_kb,
+            }
+            messages = compare_to_baseline(key, results[key], baseline, args.tolerance)
+            regressions.extend(messages)
+
+            line = (
+                f"{name:<22}{size:>5}{seconds:>10.3f}"
+                f"{commits / seconds / 1e6:>11.2f}{max_rss_kb / 1024:>9.1f}"
+            )
+            if key in baseline:
+                change = seconds / baseline[key]["seconds"] - 1
+                line += f"  {change:+.0%}"
+            if messages:
+                line += "  REGRESSION"
+            print(line)
+    print("=" * 57)
+
+    if args.save_baseline:
+        save_baseline(results)
+        print(f"Baseline saved to {baseline_path()}")
+        return
+
+    if regressions:
+        print(
+            f"Error: Performance regressions beyond {args.tolerance:.0%} of "
+            f"{baseline_path()}:",
+            file=sys.stderr,
+        )
+        for message in regressions:
+            print(f"  {message}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
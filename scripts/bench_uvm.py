@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# scripts/bench_uvm.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Benchmark of the UVM testbench run time with the two sources of expected
+commits of the commit scoreboard: the Spike log (+SPIKE_LOG only) and the
+pre-parsed golden file (+GOLDEN_FILE, see spike_log_to_golden.py).
+
+Every seed of the manifest (or the given seeds) is simulated --repeat times
+in each mode with the optimized UVM design of 'make uvm_build', and the best
+wall time of each mode is reported. Both modes must end without UVM errors,
+or the comparison would be meaningless. Meant for long tests, e.g.
+
+    TEST_NAME=riscv_arithmetic_basic_test make uvm_regress
+    make uvm_bench
+
+(riscv_arithmetic_basic_test runs 10k instructions). The results are saved
+to results/bench_uvm.json (or BENCH_UVM_RESULTS).
+
+Usage:
+    python3 scripts/bench_uvm.py [--repeat 3] [seed ...]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+from manifest import load_manifest, get_artifact, manifest_seeds
+from spike_log_to_golden import golden_path, spike_log_to_golden
+
+DEFAULT_RESULTS = os.path.join("results", "bench_uvm.json")
+
+UVM_TOP = "uvm_regress_top"
+
+# Report summary of a UVM run, e.g. "UVM_ERROR :    0"
+UVM_ERROR_RE = re.compile(r"^UVM_(?:ERROR|FATAL)\s*:\s*(\d+)", re.MULTILINE)
+
+MODES = ("spike_log", "golden")
+
+
+def results_path():
+    """Results file, overridable with the BENCH_UVM_RESULTS variable"""
+    return os.environ.get("BENCH_UVM_RESULTS", DEFAULT_RESULTS)
+
+
+def uvm_command(mem_file, spike_log, golden_file=None):
+    """vsim command line of one UVM run"""
+    questa_home = os.environ.get("QUESTA_HOME")
+    if not questa_home:
+        print("Error: QUESTA_HOME environment variable not set", file=sys.stderr)
+        sys.exit(1)
+
+    cmd = [
+        "vsim",
+        "-c",
+        "-sv_lib",
+        f"{questa_home}/uvm-1.2/linux_x86_64/uvm_dpi",
+        "-cpppath",
+        os.environ.get("HOST_CC_PATH", "/usr/bin/gcc"),
+        UVM_TOP,
+        "-do",
+        "run -all; quit",
+        "+UVM_TESTNAME=riscv_base_test",
+        f"+MEM_FILE={mem_file}",
+        f"+MEM_FORMAT={os.environ.get('MEM_FORMAT', 'bin')}",
+        f"+SPIKE_LOG={spike_log}",
+    ]
+    if golden_file:
+        cmd.append(f"+GOLDEN_FILE={golden_file}")
+    return cmd
+
+
+def run_uvm(cmd):
+    """Run one simulation and return its wall time in seconds"""
+    started = time.perf_counter()
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except FileNotFoundError:
+        print(
+            "Error: 'vsim' not found. Is QuestaSim installed and in PATH?",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    seconds = time.perf_counter() - started
+
+    errors = sum(int(count) for count in UVM_ERROR_RE.findall(result.stdout))
+    if result.returncode != 0 or errors:
+        print(result.stdout[-4000:], file=sys.stderr)
+        raise RuntimeError(
+            f"UVM run failed (exit code {result.returncode}, {errors} errors): "
+            + " ".join(cmd)
+        )
+    return seconds
+
+
+def count_lines(path):
+    with open(path, "r") as f:
+        return sum(1 for _ in f)
+
+
+def bench_seed(manifest, seed, repeat):
+    """Best run time of each mode for one seed"""
+    mem_file = get_artifact(manifest, seed, "mem")
+    spike_log = get_artifact(manifest, seed, "spike_log")
+    # Logs of runs before the golden files existed are converted here
+    golden_file = manifest["seeds"][str(seed)].get("golden") or golden_path(spike_log)
+    if not os.path.exists(golden_file):
+        spike_log_to_golden(spike_log, golden_file)
+
+    commands = {
+        "spike_log": uvm_command(mem_file, spike_log),
+        "golden": uvm_command(mem_file, spike_log, golden_file),
+    }
+    times = {mode: [] for mode in MODES}
+    # Alternate the modes, so a slow period of the machine affects both
+    for _ in range(repeat):
+        for mode in MODES:
+            times[mode].append(run_uvm(commands[mode]))
+
+    return {
+        "seed": seed,
+        "commits": count_lines(golden_file),
+        **{mode: min(times[mode]) for mode in MODES},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark UVM run time with the Spike log and the golden file."
+    )
+    parser.add_argument(
+        "seeds", nargs="*", type=int, help="Seeds to run (default: all in manifest)"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per seed and mode (best is kept)"
+    )
+    args = parser.parse_args()
+
+    manifest = load_manifest()
+    seeds = args.seeds or manifest_seeds(manifest)
+    test_name = manifest.get("test_name")
+
+    results = []
+    for seed in seeds:
+        print(f"--- Benchmarking UVM run time for SEED {seed} ---")
+        try:
+            results.append(bench_seed(manifest, seed, max(1, args.repeat)))
+        except (OSError, RuntimeError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    print("=" * 57)
+    print(f"UVM run time of {test_name} (best of {args.repeat})")
+    print("=" * 57)
+    print(
+        f"{'Seed':>12} {'Commits':>9} {'Spike log':>10} {'Golden':>10} {'Speedup':>9}"
+    )
+    for r in results:
+        print(
+            f"{r['seed']:>12} {r['commits']:>9} {r['spike_log']:>9.2f}s "
+            f"{r['golden']:>9.2f}s {r['spike_log'] / r['golden']:>8.2f}x"
+        )
+    total = {mode: sum(r[mode] for r in results) for mode in MODES}
+    if results:
+        print(
+            f"{'Total':>12} {sum(r['commits'] for r in results):>9} "
+            f"{total['spike_log']:>9.2f}s {total['golden']:>9.2f}s "
+            f"{total['spike_log'] / total['golden']:>8.2f}x"
+        )
+
+    path = results_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(
+            {"test_name": test_name, "repeat": args.repeat, "seeds": results},
+            f,
+            indent=2,
+        )
+    print(f"Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
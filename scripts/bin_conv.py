@@ -4,40 +4,87 @@
 # Copyright (c) 2025 Igor Bogdanov
 # All rights reserved.
 
+"""
+Converts a raw binary image into a Verilog memory file with one 32-bit word
+per line. The 'bin' format (32 binary digits per line) is loaded with
+$readmemb; the 'hex' format (8 hex digits per line) is 4x smaller and is
+loaded with $readmemh.
+
+The whole image is converted at once: the words are byte-swapped to
+big-endian and then either hex-encoded with a newline every 4 bytes or
+mapped byte by byte through a table of binary digit strings.
+
+Usage:
+    python3 scripts/bin_conv.py [--format bin|hex] <input_binary> <output_txt>
+"""
+
+import os
 import sys
+import argparse
+from itertools import cycle
 
+MEM_FORMATS = ("bin", "hex")
 
-def main():
-    """
-    Converts a raw binary file into a Verilog-style binary file (one 32-bit
-    word per line), suitable for loading with $readmemb.
-    """
-    if len(sys.argv) != 3:
+# Binary digits of every byte value; the last byte of a word ends the line
+BYTE_DIGITS = [f"{value:08b}".encode() for value in range(256)]
+LAST_BYTE_DIGITS = [f"{value:08b}\n".encode() for value in range(256)]
+WORD_TABLES = (BYTE_DIGITS, BYTE_DIGITS, BYTE_DIGITS, LAST_BYTE_DIGITS)
+
+
+def mem_format():
+    """Memory file format selected with the MEM_FORMAT variable"""
+    fmt = os.environ.get("MEM_FORMAT", "bin")
+    if fmt not in MEM_FORMATS:
         print(
-            f"Usage: {sys.argv[0]} <input_binary> <output_binary_txt>", file=sys.stderr
+            f"Error: MEM_FORMAT must be one of {', '.join(MEM_FORMATS)}, got '{fmt}'",
+            file=sys.stderr,
         )
         sys.exit(1)
+    return fmt
 
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
 
-    try:
-        with open(input_file, "rb") as f_in, open(output_file, "w") as f_out:
-            while True:
-                # Read 4 bytes (a 32-bit word) at a time
-                word = f_in.read(4)
-                if not word:
-                    break
-                # The last word might be shorter; pad it with null bytes.
-                if len(word) < 4:
-                    word = word.ljust(4, b"\0")
-
-                # RISC-V is little-endian. Convert the 4-byte word to an integer.
-                int_val = int.from_bytes(word, byteorder="little")
-
-                # Format as a 32-digit binary string and write to file.
-                f_out.write(f"{int_val:032b}\n")
+def format_words(image, fmt="bin"):
+    """Format a little-endian byte image as memory file contents (bytes)"""
+    # The last word might be shorter; pad it with null bytes.
+    if len(image) % 4:
+        image = image + b"\0" * (4 - len(image) % 4)
+    if not image:
+        return b""
+
+    # RISC-V is little-endian; reverse each word so it prints MSB first
+    swapped = bytearray(len(image))
+    for byte in range(4):
+        swapped[byte::4] = image[3 - byte :: 4]
 
+    if fmt == "hex":
+        return swapped.hex("\n", 4).encode() + b"\n"
+    return b"".join(map(list.__getitem__, cycle(WORD_TABLES), swapped))
+
+
+def convert_binary(input_file, output_file, fmt="bin"):
+    """Convert a raw binary file into a memory file of the given format"""
+    with open(input_file, "rb") as f_in:
+        image = f_in.read()
+    with open(output_file, "wb") as f_out:
+        f_out.write(format_words(image, fmt))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert a raw binary into a Verilog memory file."
+    )
+    parser.add_argument("input_file", help="Raw binary image")
+    parser.add_argument("output_file", help="Memory file to write")
+    parser.add_argument(
+        "--format",
+        choices=MEM_FORMATS,
+        default=None,
+        help="'bin' for $readmemb or 'hex' for $readmemh (default: MEM_FORMAT or bin)",
+    )
+    args = parser.parse_args()
+
+    try:
+        convert_binary(args.input_file, args.output_file, args.format or mem_format())
     except IOError as e:
         print(f"Error converting binary to text: {e}", file=sys.stderr)
         sys.exit(1)
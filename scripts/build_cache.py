@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# scripts/build_cache.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+A persistent, content-addressed cache for build artifacts.
+
+Artifacts are stored under the cache directory (DV_CACHE_DIR, default
+'.cache/') by kind and by a hash of every input that determines their
+contents. Unlike 'out_*' directories, the cache survives 'make clean', so an
+artifact whose inputs have not changed is restored instead of rebuilt.
+Set DV_CACHE=0 to bypass the cache entirely.
+"""
+
+import os
+import shutil
+import hashlib
+import tempfile
+
+DEFAULT_CACHE_DIR = ".cache"
+
+
+def cache_enabled():
+    """The cache is on unless DV_CACHE=0"""
+    return os.environ.get("DV_CACHE", "1") != "0"
+
+
+def cache_dir():
+    """Root directory of the cache"""
+    return os.environ.get("DV_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+
+def hash_file(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_inputs(*parts):
+    """
+    SHA-256 over a sequence of strings or bytes. Each part is length-prefixed
+    so that different splits of the same text never produce the same key.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode()
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def cached_path(kind, key, suffix=""):
+    """Location of an artifact in the cache (it may not exist yet)"""
+    return os.path.join(cache_dir(), kind, key[:2], f"{key}{suffix}")
+
+
+def fetch(kind, key, dest, suffix=""):
+    """Copy a cached artifact to dest. Returns False on a cache miss."""
+    if not cache_enabled():
+        return False
+    src = cached_path(kind, key, suffix)
+    if not os.path.exists(src):
+        return False
+    shutil.copyfile(src, dest)
+    return True
+
+
+def store(kind, key, src, suffix=""):
+    """
+    Add a file to the cache. The copy is written to a temporary name and
+    renamed into place, so concurrent writers never expose partial files.
+    """
+    if not cache_enabled():
+        return
+    dest = cached_path(kind, key, suffix)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest), suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load(kind, key, suffix=""):
+    """Contents of a cached artifact, or None on a cache miss"""
+    if not cache_enabled():
+        return None
+    try:
+        with open(cached_path(kind, key, suffix), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def save(kind, key, data, suffix=""):
+    """Add an in-memory artifact (bytes) to the cache, atomically"""
+    if not cache_enabled():
+        return
+    dest = cached_path(kind, key, suffix)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, dest)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# scripts/build_rtl.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Incremental compile and elaboration of the simulation designs.
+
+The 'work' library is built from a fixed list of compile units (the same
+vlog commands as questa/scripts/compile.do and compile_uvm_classic.do). Each
+unit is fingerprinted from its source files, the files they `include, its
+vlog options (which carry COV_ENABLE), the tool version and the fingerprints
+of the packages it imports. The fingerprints of the last build are kept in
+work/build_stamp.json, so only changed units are recompiled, and vopt only
+runs when something it depends on was recompiled. When nothing changed, the
+existing optimized design is reused as is.
+
+Both designs share the 'work' library and some unit names (cpu_top), so
+switching between them recompiles only the units that differ.
+
+Usage:
+    python3 scripts/build_rtl.py [--force] {smoke,uvm}
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import argparse
+import tempfile
+import subprocess
+from collections import namedtuple
+from build_cache import hash_file, hash_inputs
+
+LIBRARY = "work"
+STAMP_FILE = os.path.join(LIBRARY, "build_stamp.json")
+
+# '`include "file"' directives in Verilog/SystemVerilog sources
+SV_INCLUDE_RE = re.compile(r'^\s*`include\s+"([^"]+)"', re.MULTILINE)
+
+# A compile unit fills one slot of the library. 'deps' are the units whose
+# packages it imports; a change in them forces a recompile.
+Unit = namedtuple("Unit", "name sources options deps")
+
+# The optimized design: vopt of 'top' into 'opt'
+Design = namedtuple("Design", "top opt")
+
+
+def coverage_flags():
+    """vlog coverage options, as set by compile.do for COV_ENABLE=1"""
+    if os.environ.get("COV_ENABLE", "0") == "1":
+        return "+cover=sbfec +acc"
+    return ""
+
+
+def design_units(design_name):
+    """Compile units of a design, in compilation order"""
+    uvm_home = os.environ.get("UVM_HOME")
+    questa_home = os.environ.get("QUESTA_HOME")
+    if not uvm_home or not questa_home:
+        print(
+            "Error: UVM_HOME and QUESTA_HOME environment variables must be set",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    uvm_incdir = f"+incdir+{uvm_home}/src"
+    cover = coverage_flags()
+    sv_options = f"-sv {uvm_incdir} {cover}".strip()
+
+    units = [
+        Unit(
+            "uvm",
+            [f"{uvm_home}/src/uvm_pkg.sv"],
+            f"-L mtiUvm -sv {uvm_incdir}",
+            [],
+        ),
+        Unit(
+            "questa_uvm",
+            [f"{questa_home}/verilog_src/questa_uvm_pkg-1.2/src/questa_uvm_pkg.sv"],
+            f"-L mtiUvm -sv +define+QUESTA_UVM_DPI_DISABLE {uvm_incdir}",
+            ["uvm"],
+        ),
+        Unit("rtl", sorted(glob.glob("rtl/*.v")), f"-sv -mfcu {cover}".strip(), []),
+    ]
+
+    if design_name == "smoke":
+        units += [
+            Unit("cpu_top", ["uvm_scripted_flow/cpu_top.sv"], sv_options, ["uvm"]),
+            Unit(
+                "cpu_checker_if",
+                ["uvm_scripted_flow/cpu_checker_if.sv"],
+                sv_options,
+                ["uvm"],
+            ),
+            Unit("tb_top", ["uvm_scripted_flow/tb_top.sv"], sv_options, ["uvm"]),
+        ]
+    else:
+        units += [
+            Unit("cpu_top", ["uvm_classic/cpu_top.sv"], sv_options, ["uvm"]),
+            Unit(
+                "cpu_interface",
+                ["uvm_classic/interfaces/cpu_interface.sv"],
+                sv_options,
+                ["uvm"],
+            ),
+            Unit(
+                "riscv_uvm_pkg", ["uvm_classic/riscv_uvm_pkg.sv"], sv_options, ["uvm"]
+            ),
+            Unit(
+                "uvm_top",
+                ["uvm_classic/uvm_top.sv"],
+                sv_options,
+                ["uvm", "riscv_uvm_pkg"],
+            ),
+        ]
+    return units
+
+
+DESIGNS = {
+    "smoke": Design("tb_top", "smoke_top"),
+    "uvm": Design("uvm_top", "uvm_regress_top"),
+}
+
+
+def tool_identity():
+    """First line of 'vlog -version', so a simulator upgrade rebuilds everything"""
+    try:
+        result = subprocess.run(
+            ["vlog", "-version"], capture_output=True, text=True, check=True
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        # The compile itself reports a missing simulator
+        return ""
+    return result.stdout.splitlines()[0] if result.stdout else ""
+
+
+def include_hashes(source, seen):
+    """
+    Yield (path, hash) of every file `included by source, recursively.
+    Includes that cannot be resolved next to the including file (such as
+    uvm_macros.svh from the UVM installation) are left to the tool identity.
+    """
+    with open(source, "r", errors="replace") as f:
+        text = f.read()
+    for include in SV_INCLUDE_RE.findall(text):
+        path = os.path.normpath(os.path.join(os.path.dirname(source), include))
+        if path in seen or not os.path.exists(path):
+            continue
+        seen.add(path)
+        yield path, hash_file(path)
+        yield from include_hashes(path, seen)
+
+
+def unit_fingerprint(unit, tool, fingerprints):
+    """Fingerprint of a unit, given the fingerprints of its dependencies"""
+    parts = [tool, unit.options]
+    for source in unit.sources:
+        parts.append(source)
+        if os.path.exists(source):
+            parts.append(hash_file(source))
+            for path, digest in include_hashes(source, {source}):
+                parts.extend([path, digest])
+    for dep in unit.deps:
+        parts.extend([dep, fingerprints[dep]])
+    return hash_inputs(*parts)
+
+
+def vopt_command(design):
+    """vopt command that elaborates and optimizes a design"""
+    cover = "+cover=sbfec " if coverage_flags() else ""
+    return f"vopt +acc {cover}-o {design.opt} -work {LIBRARY} {design.top}"
+
+
+def load_stamp():
+    """Fingerprints of the last successful build, if the library still exists"""
+    if not os.path.isdir(LIBRARY):
+        return {"units": {}, "designs": {}}
+    try:
+        with open(STAMP_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"units": {}, "designs": {}}
+
+
+def save_stamp(stamp):
+    """Record the fingerprints of a successful build"""
+    with open(STAMP_FILE, "w") as f:
+        json.dump(stamp, f, indent=2, sort_keys=True)
+
+
+def built_fingerprint(design_name):
+    """Fingerprint of a design as it was last built, or None if it is not built"""
+    return load_stamp()["designs"].get(DESIGNS[design_name].opt)
+
+
+def run_do_script(commands):
+    """Run Questa commands in a single batch-mode vsim session"""
+    script = ["onerror {quit -f -code 1}"] + commands + ["quit -f"]
+    with tempfile.NamedTemporaryFile("w", suffix=".do", delete=False) as f:
+        f.write("\n".join(script) + "\n")
+        do_file = f.name
+
+    try:
+        subprocess.run(["vsim", "-c", "-do", do_file], check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"Error building the simulation design: {e}", file=sys.stderr)
+        sys.exit(1)
+    except FileNotFoundError:
+        print(
+            "Error: 'vsim' not found. Is QuestaSim installed and in PATH?",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    finally:
+        os.remove(do_file)
+
+
+def build(design_name, force=False):
+    """
+    Bring the optimized design up to date. Returns the names of the units
+    that were recompiled.
+    """
+    design = DESIGNS[design_name]
+    units = design_units(design_name)
+    stamp = {"units": {}, "designs": {}} if force else load_stamp()
+
+    tool = tool_identity()
+    fingerprints = {}
+    stale = []
+    for unit in units:
+        fingerprints[unit.name] = unit_fingerprint(unit, tool, fingerprints)
+        if stamp["units"].get(unit.name) != fingerprints[unit.name]:
+            stale.append(unit)
+
+    design_fingerprint = hash_inputs(
+        vopt_command(design), *[fingerprints[unit.name] for unit in units]
+    )
+    # Recompiling a unit invalidates the optimized design even if it went back
+    # to the contents the design was last optimized with.
+    optimize = bool(stale) or stamp["designs"].get(design.opt) != design_fingerprint
+
+    if not optimize:
+        print(f"--- {design.opt} is up to date, reusing the compiled design ---")
+        return []
+
+    commands = []
+    if not os.path.isdir(LIBRARY):
+        commands.append(f"vlib {LIBRARY}")
+    for unit in stale:
+        print(f"--- Compiling {unit.name} ---")
+        commands.append(f"vlog -work {LIBRARY} {unit.options} {' '.join(unit.sources)}")
+    print(f"--- Elaborating {design.opt} ---")
+    commands.append(vopt_command(design))
+    run_do_script(commands)
+
+    stamp["units"].update({unit.name: fingerprints[unit.name] for unit in stale})
+    # Another design optimized against a recompiled unit is now out of date
+    if stale:
+        stamp["designs"] = {}
+    stamp["designs"][design.opt] = design_fingerprint
+    save_stamp(stamp)
+    return [unit.name for unit in stale]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Incrementally compile and elaborate a simulation design."
+    )
+    parser.add_argument("design", choices=sorted(DESIGNS), help="Design to build")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Recompile every unit, ignoring the previous build",
+    )
+    args = parser.parse_args()
+
+    build(args.design, args.force)
+
+
+if __name__ == "__main__":
+    main()
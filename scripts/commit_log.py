@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# scripts/commit_log.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Shared parsing and filtering of Spike commit logs.
+
+'spike -l --log-commits' interleaves a disassembly line and a commit line
+for every instruction, starting in the boot ROM at 0x1000 and continuing
+through the trap handler after the test's final ECALL. Only the commit lines
+of the test program itself are ever compared against the RTL, so the
+CommitLogFilter keeps just those:
+
+    core   0: 3 0x80000000 (0xf14022f3) x5  0x00000000
+
+The ECALL that ends the test traps instead of committing, so Spike prints
+no commit line for it. The filter writes one in the format of the RTL trace,
+
+    core   0: 3 0x800001a4 (0x00000073)
+
+and drops everything after it.
+"""
+
+import re
+
+# Standard RISC-V ABI register names for RV32I
+ABI_NAMES = [
+    "zero",
+    "ra",
+    "sp",
+    "gp",
+    "tp",
+    "t0",
+    "t1",
+    "t2",
+    "s0",
+    "s1",
+    "a0",
+    "a1",
+    "a2",
+    "a3",
+    "a4",
+    "a5",
+    "a6",
+    "a7",
+    "s2",
+    "s3",
+    "s4",
+    "s5",
+    "s6",
+    "s7",
+    "s8",
+    "s9",
+    "s10",
+    "s11",
+    "t3",
+    "t4",
+    "t5",
+    "t6",
+]
+
+# The test program is linked at the start of RAM
+TEST_START_PC = 0x80000000
+
+ECALL_BINARY = 0x00000073
+
+# core   0: 3 0x80000000 (0xf14022f3) x5  0x00000000 [mem 0x...]
+COMMIT_RE = re.compile(
+    r"^core\s+\d+:\s+\d\s+0x([0-9a-fA-F]+)\s+\(0x([0-9a-fA-F]+)\)"
+    r"(?:\s+x\s*(\d+)\s+0x([0-9a-fA-F]+))?"
+)
+
+# core   0: 0x80000000 (0xf14022f3) csrr    t0, mhartid
+DISASM_RE = re.compile(
+    r"^core\s+\d+:\s+0x([0-9a-fA-F]+)\s+\(0x([0-9a-fA-F]+)\)\s*(.*?)\s*$"
+)
+
+# core   0: exception trap_machine_ecall, epc 0x800001a4
+ECALL_TRAP_RE = re.compile(
+    r"exception trap_(?:user|supervisor|machine)_ecall, epc 0x([0-9a-fA-F]+)"
+)
+
+
+def parse_commit(line):
+    """
+    Parse a Spike or RTL commit line. Returns (pc, binary, rd, value) with
+    rd and value set to None when the instruction writes no GPR, or None if
+    the line is not a commit line.
+    """
+    match = COMMIT_RE.match(line)
+    if not match:
+        return None
+    pc, binary, rd, value = match.groups()
+    return (
+        int(pc, 16),
+        int(binary, 16),
+        int(rd) if rd is not None else None,
+        int(value, 16) if value is not None else None,
+    )
+
+
+def parse_disasm(line):
+    """Parse a Spike disassembly line into (pc, binary, instr_str), or None"""
+    match = DISASM_RE.match(line)
+    if not match:
+        return None
+    pc, binary, instr_str = match.groups()
+    return int(pc, 16), int(binary, 16), instr_str
+
+
+def format_commit(pc, binary, rd=None, value=None):
+    """Format a commit line the way Spike prints it"""
+    line = f"core   0: 3 0x{pc:08x} (0x{binary:08x})"
+    if rd is not None:
+        line += f" x{rd:<2} 0x{value:08x}"
+    return line + "\n"
+
+
+def gpr_field(rd, value):
+    """The 'gpr' column of a riscv-dv trace CSV, e.g. 't0:80000000'"""
+    name = ABI_NAMES[rd] if rd < len(ABI_NAMES) else f"x{rd}"
+    return f"{name}:{value:08x}"
+
+
+class CommitLogFilter:
+    """Reduces a full Spike log to the commit lines of the test program"""
+
+    def __init__(self, start_pc=TEST_START_PC):
+        self.start_pc = start_pc
+        self.started = False
+        self.finished = False
+        self.lines_in = 0
+        self.lines_out = 0
+
+    def filter(self, lines):
+        """
+        Yield the commit lines to keep from an iterable of log lines. Stops
+        consuming input right after the ECALL that ends the test, so callers
+        streaming a live process must drain its remaining output themselves.
+        """
+        for line in lines:
+            self.lines_in += 1
+
+            commit = COMMIT_RE.match(line)
+            if commit:
+                if not self.started:
+                    if int(commit.group(1), 16) < self.start_pc:
+                        continue
+                    self.started = True
+                self.lines_out += 1
+                yield line
+                continue
+
+            if not self.started:
+                continue
+
+            ecall = ECALL_TRAP_RE.search(line)
+            if ecall:
+                self.lines_out += 1
+                yield format_commit(int(ecall.group(1), 16), ECALL_BINARY)
+                self.finished = True
+                return
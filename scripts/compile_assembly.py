@@ -13,21 +13,22 @@ due to a misconfigured toolchain path.
 
 import sys
 import os
+import re
+import argparse
 import subprocess
-import glob
-from pathlib import Path
+import time
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import build_cache
+from manifest import load_manifest, manifest_seeds, get_artifact, record_many
+from results_db import record_results
+from stage_timer import run_process, stage
 
+# riscv-dv include directories for the generated assembly
+INCLUDE_DIRS = ["RISC-V/riscv-dv/src", "RISC-V/riscv-dv/user_extension"]
 
-def find_output_directory():
-    """Find the output directory (assumes only one 'out_*' directory exists)"""
-    out_dirs = glob.glob("out_*/")
-    if not out_dirs:
-        print(
-            "Error: Output directory (out_*) not found. Did 'make gen' run successfully?",
-            file=sys.stderr,
-        )
-        sys.exit(1)
-    return out_dirs[0]
+# '#include "file"' and '.include "file"' directives in the assembly
+INCLUDE_RE = re.compile(r'^\s*[#.]\s*include\s+"([^"]+)"', re.MULTILINE)
 
 
 def check_linker_script():
@@ -39,8 +40,8 @@ def check_linker_script():
     return linker_script
 
 
-def compile_assembly_files(out_dir, linker_script):
-    """Compile all assembly files in the output directory"""
+def compiler_settings():
+    """Return the compiler and its flags, honouring the toolchain variables"""
     # Use environment variables if set, otherwise use defaults
     riscv_prefix = os.environ.get("RISCV_PREFIX", "riscv64-unknown-elf")
     target_arch = os.environ.get("TARGET_ARCH", "rv32i_zicsr")
@@ -49,7 +50,6 @@ def compile_assembly_files(out_dir, linker_script):
     cc = f"{riscv_prefix}-gcc"
 
     # Build compiler flags
-    includes = "-IRISC-V/riscv-dv/src -IRISC-V/riscv-dv/user_extension"
     cflags = [
         f"-march={target_arch}",
         f"-mabi={target_abi}",
@@ -59,58 +59,175 @@ def compile_assembly_files(out_dir, linker_script):
         "-nostdlib",
         "-nostartfiles",
         "-mno-relax",
-    ] + includes.split()
+    ] + [f"-I{include_dir}" for include_dir in INCLUDE_DIRS]
+    return cc, cflags
 
-    asm_dir = os.path.join(out_dir, "asm_test")
-    if not os.path.exists(asm_dir):
-        print(f"Error: Assembly test directory ({asm_dir}) not found.", file=sys.stderr)
-        sys.exit(1)
 
-    # Find all assembly files
-    asm_files = glob.glob(os.path.join(asm_dir, "*.S"))
-
-    if not asm_files:
-        print(f"Warning: No assembly files found in {asm_dir}", file=sys.stderr)
+def toolchain_identity(cc):
+    """First line of 'gcc --version', so a toolchain upgrade invalidates the cache"""
+    try:
+        result = subprocess.run(
+            [cc, "--version"], capture_output=True, text=True, check=True
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        # The compile itself reports a missing toolchain
+        return ""
+    return result.stdout.splitlines()[0] if result.stdout else ""
+
+
+def compile_key(asm_file, cc_identity, cflags, linker_script):
+    """
+    Cache key of the ELF built from asm_file: the assembly source, the
+    files it includes, the compiler flags (which carry TARGET_ARCH and
+    TARGET_ABI), the linker script and the toolchain version.
+    """
+    with open(asm_file, "rb") as f:
+        source = f.read()
+
+    parts = [source, cc_identity, " ".join(cflags)]
+    with open(linker_script, "rb") as f:
+        parts.append(f.read())
+
+    search_dirs = [os.path.dirname(asm_file)] + INCLUDE_DIRS
+    for include in INCLUDE_RE.findall(source.decode(errors="replace")):
+        for search_dir in search_dirs:
+            include_path = os.path.join(search_dir, include)
+            if os.path.exists(include_path):
+                parts.extend([include, build_cache.hash_file(include_path)])
+                break
+
+    return build_cache.hash_inputs(*parts)
+
+
+def compile_one(cc, cflags, linker_script, asm_file, elf_file, seed=None):
+    """
+    Compile a single assembly file. Runs in a worker process and returns
+    (asm_file, error_message, duration); error_message is None on success.
+    """
+    # Build the compilation command
+    cmd_args = [cc] + cflags + ["-T", linker_script, "-o", elf_file, asm_file]
+
+    started = time.time()
+    # The compiler's stderr goes to a file, so it can be reaped with its usage
+    with tempfile.TemporaryFile(mode="w+") as stderr:
+        try:
+            status = run_process(
+                "compile",
+                seed,
+                cmd_args,
+                stdout=subprocess.DEVNULL,
+                stderr=stderr,
+                text=True,
+            )
+        except FileNotFoundError:
+            return (
+                asm_file,
+                f"Error: '{cc}' command not found. Is the RISC-V toolchain installed and in PATH?",
+                0.0,
+            )
+        if status != 0:
+            error = subprocess.CalledProcessError(status, cmd_args)
+            message = f"Error compiling {asm_file}: {error}"
+            stderr.seek(0)
+            errors = stderr.read()
+            if errors:
+                message += f"\nCompiler stderr: {errors}"
+            return asm_file, message, time.time() - started
+    return asm_file, None, time.time() - started
+
+
+def compile_assembly_files(manifest, linker_script, jobs):
+    """
+    Compile the assembly file of every seed in the manifest. ELFs whose
+    inputs are unchanged are restored from the build cache; the rest are
+    compiled in a process pool and added to the cache.
+    """
+    cc, cflags = compiler_settings()
+    cc_identity = toolchain_identity(cc)
+
+    seeds = manifest_seeds(manifest)
+    if not seeds:
+        print("Warning: No seeds recorded in the manifest", file=sys.stderr)
         return
 
-    # Compile each assembly file
-    for asm_file in asm_files:
+    elf_files = {}
+    results = []
+    to_compile = {}
+    for seed in seeds:
+        asm_file = get_artifact(manifest, seed, "asm")
         # The riscv-dv script expects a '.o' extension, even though it's a fully linked ELF file
         elf_file = asm_file.replace(".S", ".o")
-        print(f"Compiling {asm_file} -> {elf_file}")
-
-        # Build the compilation command
-        cmd_args = [cc] + cflags + ["-T", linker_script, "-o", elf_file, asm_file]
-
-        try:
-            result = subprocess.run(
-                cmd_args, check=True, capture_output=True, text=True
+        key = compile_key(asm_file, cc_identity, cflags, linker_script)
+
+        with stage("compile_cache", seed):
+            cached = build_cache.fetch("elf", key, elf_file, ".o")
+        if cached:
+            print(f"Cached    {asm_file} -> {elf_file}")
+            elf_files[seed] = {"elf": elf_file}
+            results.append({"seed": seed, "status": "pass", "duration": 0.0})
+        else:
+            to_compile[asm_file] = (seed, elf_file, key)
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = []
+        for asm_file, (seed, elf_file, key) in to_compile.items():
+            print(f"Compiling {asm_file} -> {elf_file}")
+            futures.append(
+                pool.submit(
+                    compile_one, cc, cflags, linker_script, asm_file, elf_file, seed
+                )
             )
 
-        except subprocess.CalledProcessError as e:
-            print(f"Error compiling {asm_file}: {e}", file=sys.stderr)
-            if e.stderr:
-                print(f"Compiler stderr: {e.stderr}", file=sys.stderr)
-            sys.exit(1)
-        except FileNotFoundError:
-            print(
-                f"Error: '{cc}' command not found. Is the RISC-V toolchain installed and in PATH?",
-                file=sys.stderr,
-            )
-            sys.exit(1)
+        for future in as_completed(futures):
+            asm_file, error, duration = future.result()
+            seed, elf_file, key = to_compile[asm_file]
+            if error:
+                print(error, file=sys.stderr)
+                failures += 1
+                results.append({"seed": seed, "status": "fail", "duration": duration})
+                continue
+            build_cache.store("elf", key, elf_file, ".o")
+            elf_files[seed] = {"elf": elf_file}
+            results.append({"seed": seed, "status": "pass", "duration": duration})
+
+    record_many(elf_files)
+    for row in results:
+        row["artifacts"] = elf_files.get(row["seed"])
+    record_results(manifest.get("run_id"), "compile", results)
+
+    print(
+        f"--- {len(seeds) - len(to_compile)} ELF(s) restored from cache, "
+        f"{len(to_compile) - failures} compiled ---"
+    )
+    if failures:
+        print(f"Error: {failures} assembly file(s) failed to compile", file=sys.stderr)
+        sys.exit(1)
 
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="Compile the generated assembly tests into ELF files."
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of parallel compiler processes (default: all CPUs)",
+    )
+    args = parser.parse_args()
+
     print("--- Compiling assembly tests to ELF files ---")
 
-    # Find the output directory
-    out_dir = find_output_directory()
+    # Look up the generated assembly files
+    manifest = load_manifest()
 
     # Check if the linker script exists
     linker_script = check_linker_script()
 
     # Compile all assembly files
-    compile_assembly_files(out_dir, linker_script)
+    compile_assembly_files(manifest, linker_script, max(1, args.jobs))
 
     print("--- Compilation complete ---")
 
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# scripts/cov_scheduler.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Coverage-driven regression: runs seeds in batches and steers the generator
+toward the functional coverage bins that are still missing.
+
+Each batch picks fresh seeds and runs them through the usual steps
+(run_regression.py, compile_assembly.py, run_spike.py, run_simulation.py),
+all in one resumable run, called in this process through dvflow.py. The
+bins every seed hit are then read from its Spike log (see
+trace_coverage.py) and merged. Before the next batch, the directed stream
+weights in the test's gen_opts are scaled toward the areas where the
+missing bins are: a stream whose areas (hazards, loads/stores,
+numeric corners, ...) hold more than their share of the missing bins is
+generated more often (up to twice), one whose areas hold less is generated
+less often (down to half). When a batch adds no new bins, instr_cnt grows so
+longer programs can reach rarer bins. The tuned gen_opts are passed to the
+generator as a derived testlist (GEN_TESTLIST).
+
+The loop stops once the coverage reaches the target, after --max-seeds
+seeds, or after --patience batches without new bins. The progress of every
+batch is kept in logs/cov_scheduler/state.json.
+
+Usage:
+    python3 scripts/cov_scheduler.py [--target 0.95] [--batch-size 4]
+                                     [--max-seeds 64] [--jobs N] [--warm]
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import yaml
+from manifest import load_manifest, get_artifact
+from results_db import stage_statuses
+from dvflow import get_project_root, run_step
+from run_regression import CUSTOM_TARGET_DIR
+from trace_coverage import bin_area, log_bins, parse_gen_opts, universe
+
+STATE_DIR = os.path.join("logs", "cov_scheduler")
+
+# Areas of the coverage bins each riscv-dv directed stream mostly exercises
+STREAM_AREAS = {
+    "riscv_int_numeric_corner_stream": ("value", "alu"),
+    "riscv_hazard_instr_stream": ("hazard",),
+    "riscv_load_store_hazard_instr_stream": ("hazard", "load", "store"),
+    "riscv_load_store_rand_instr_stream": ("load", "store"),
+    "riscv_multi_page_load_store_instr_stream": ("load", "store"),
+    "riscv_mem_region_stress_test": ("load", "store"),
+    "riscv_jal_instr": ("jump",),
+    "riscv_loop_instr": ("branch",),
+}
+
+# Limits of the tuned stream weights (instances per 1000 instructions)
+MIN_WEIGHT = 1
+MAX_WEIGHT = 20
+
+# instr_cnt grows by this factor after a batch without new bins, up to
+# MAX_INSTR_CNT_FACTOR times the testlist's value
+INSTR_CNT_GROWTH = 1.5
+MAX_INSTR_CNT_FACTOR = 4
+
+
+def load_test_entry(testlist, test_name):
+    """The testlist entry of a test"""
+    try:
+        with open(testlist, "r") as f:
+            entries = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError) as e:
+        print(f"Error reading testlist {testlist}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for entry in entries or []:
+        if isinstance(entry, dict) and entry.get("test") == test_name:
+            return entry
+    print(f"Error: Test {test_name} not found in {testlist}", file=sys.stderr)
+    sys.exit(1)
+
+
+def stream_weights(options):
+    """Dictionary of directed stream name to weight of parsed gen_opts"""
+    weights = {}
+    for key, value in options.items():
+        if key.startswith("directed_instr_"):
+            stream, _, weight = value.partition(",")
+            weights[stream] = int(weight or 1)
+    return weights
+
+
+def tuned_gen_opts(options, weights, instr_cnt):
+    """gen_opts with the given stream weights and instr_cnt"""
+    tokens = []
+    for key, value in options.items():
+        if key.startswith("directed_instr_"):
+            stream = value.partition(",")[0]
+            value = f"{stream},{weights[stream]}"
+        elif key == "instr_cnt":
+            value = str(instr_cnt)
+        tokens.append(f"+{key}={value}" if value else f"+{key}")
+    return " ".join(tokens)
+
+
+def write_testlist(entry, gen_opts, path):
+    """Write a testlist holding only the test, with the tuned gen_opts"""
+    tuned = dict(entry, gen_opts=gen_opts, iterations=1)
+    with open(path, "w") as f:
+        yaml.safe_dump([tuned], f, sort_keys=False)
+
+
+def missing_by_area(all_bins, covered):
+    """Dictionary of area to (missing, total) bins"""
+    areas = {}
+    for coverage_bin in all_bins:
+        missing, total = areas.get(bin_area(coverage_bin), (0, 0))
+        areas[bin_area(coverage_bin)] = (
+            missing + (coverage_bin not in covered),
+            total + 1,
+        )
+    return areas
+
+
+def next_weights(base_weights, all_bins, covered):
+    """
+    Scale each stream's testlist weight by how concentrated the missing bins
+    are in its areas: the share of the missing bins in them over the share
+    of all bins in them, limited to [0.5, 2]. Streams of unknown areas, and
+    all streams once nothing is missing, keep their weight.
+    """
+    areas = missing_by_area(all_bins, covered)
+    all_missing = sum(missing for missing, _ in areas.values())
+    weights = {}
+    for stream, base in base_weights.items():
+        stream_areas = [a for a in STREAM_AREAS.get(stream, ()) if a in areas]
+        if not stream_areas or not all_missing:
+            weights[stream] = base
+            continue
+        missing = sum(areas[a][0] for a in stream_areas)
+        total = sum(areas[a][1] for a in stream_areas)
+        scale = (missing / all_missing) / (total / len(all_bins))
+        scale = max(0.5, min(2.0, scale))
+        weights[stream] = max(MIN_WEIGHT, min(MAX_WEIGHT, round(base * scale)))
+    return weights
+
+
+def pick_seeds(rng, used, count):
+    """Fresh seeds that no earlier batch used"""
+    seeds = []
+    while len(seeds) < count:
+        seed = rng.randrange(1, 1_000_000)
+        if seed not in used and seed not in seeds:
+            seeds.append(seed)
+    return seeds
+
+
+def run_flow_step(step, arguments, fatal=True):
+    """Run a step of the flow in-process; a failing fatal step ends the loop"""
+    status = run_step(step, arguments)
+    if fatal and status != 0:
+        print(
+            f"Error: step '{step}' failed, stopping the coverage loop", file=sys.stderr
+        )
+        sys.exit(1)
+    return status
+
+
+def run_batch(all_seeds, first, args):
+    """Generate, compile and simulate the seeds of the run not done yet"""
+    seed_args = [str(seed) for seed in all_seeds]
+    jobs = ["--jobs", str(args.jobs)]
+    gen_flags = (["--warm"] if args.warm else []) + ([] if first else ["--resume"])
+    run_flow_step("gen", gen_flags + jobs + seed_args)
+    run_flow_step("compile", jobs)
+    run_flow_step("spike", ["--resume"] + jobs + seed_args)
+    if not args.no_sim:
+        # Trace mismatches are recorded per seed and do not stop the loop
+        run_flow_step("sim", ["--resume"] + jobs + seed_args, fatal=False)
+
+
+def save_state(state):
+    """Record the progress of the loop"""
+    with open(os.path.join(STATE_DIR, "state.json"), "w") as f:
+        json.dump(state, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run seeds in batches until a functional coverage target."
+    )
+    parser.add_argument(
+        "--target",
+        type=float,
+        default=0.95,
+        help="Fraction of the coverage bins to reach (default: 0.95)",
+    )
+    parser.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=4,
+        help="Seeds per batch (default: 4)",
+    )
+    parser.add_argument(
+        "--max-seeds",
+        type=int,
+        default=64,
+        help="Stop after this many seeds (default: 64)",
+    )
+    parser.add_argument(
+        "--patience",
+        type=int,
+        default=3,
+        help="Stop after this many batches without new bins (default: 3)",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="Parallel jobs per step"
+    )
+    parser.add_argument("--warm", action="store_true", help="Use the warm generator")
+    parser.add_argument(
+        "--no-sim",
+        action="store_true",
+        help="Skip the RTL simulation; coverage only needs the Spike logs",
+    )
+    parser.add_argument("--seed", type=int, help="Seed of the seed selection")
+    args = parser.parse_args()
+
+    if args.batch_size < 1 or args.max_seeds < 1 or args.jobs < 1:
+        print(
+            "Error: --batch-size, --max-seeds and --jobs must be positive integers.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    os.chdir(get_project_root())
+    os.makedirs(STATE_DIR, exist_ok=True)
+
+    test_name = os.environ.get("TEST_NAME", "riscv_arithmetic_basic_test")
+    testlist = os.environ.get(
+        "GEN_TESTLIST", os.path.join(CUSTOM_TARGET_DIR, "testlist.yaml")
+    )
+    entry = load_test_entry(testlist, test_name)
+    options = parse_gen_opts(entry.get("gen_opts", ""))
+    base_weights = stream_weights(options)
+    base_instr_cnt = int(options.get("instr_cnt", 1000))
+    all_bins = universe(entry.get("gen_opts", ""))
+
+    # The generator reads the tuned testlist from here on
+    tuned_testlist = os.path.abspath(os.path.join(STATE_DIR, "testlist.yaml"))
+    os.environ["GEN_TESTLIST"] = tuned_testlist
+    seed_file = os.environ.get("SEED_FILE", os.path.join("logs", "seeds.txt"))
+
+    rng = random.Random(args.seed)
+    weights = dict(base_weights)
+    instr_cnt = base_instr_cnt
+    all_seeds = []
+    covered = set()
+    batches_without_progress = 0
+    state = {"test_name": test_name, "target": args.target, "batches": []}
+
+    while True:
+        count = min(args.batch_size, args.max_seeds - len(all_seeds))
+        seeds = pick_seeds(rng, set(all_seeds), count)
+        gen_opts = tuned_gen_opts(options, weights, instr_cnt)
+        write_testlist(entry, gen_opts, tuned_testlist)
+
+        print("=" * 57)
+        print(f"  Coverage batch {len(state['batches']) + 1}: {len(seeds)} seed(s)")
+        print(f"  gen_opts: {gen_opts}")
+        print("=" * 57)
+
+        first = not all_seeds
+        all_seeds += seeds
+        with open(seed_file, "w") as f:
+            f.writelines(f"{seed}\n" for seed in all_seeds)
+        run_batch(all_seeds, first, args)
+
+        manifest = load_manifest()
+        new_bins = set()
+        for seed in seeds:
+            bins = log_bins(get_artifact(manifest, seed, "spike_log")) & all_bins
+            new_bins |= bins - covered
+        covered |= new_bins
+        coverage = len(covered) / len(all_bins)
+
+        state["batches"].append(
+            {
+                "seeds": seeds,
+                "gen_opts": gen_opts,
+                "new_bins": sorted(new_bins),
+                "coverage": round(coverage, 4),
+            }
+        )
+        state["covered"] = sorted(covered)
+        save_state(state)
+        print(
+            f"--- Coverage {len(covered)}/{len(all_bins)} bins ({coverage:.1%}), "
+            f"{len(new_bins)} new in this batch ---"
+        )
+
+        if coverage >= args.target:
+            reason = "target reached"
+            break
+        if len(all_seeds) >= args.max_seeds:
+            reason = "seed limit reached"
+            break
+
+        if new_bins:
+            batches_without_progress = 0
+        else:
+            batches_without_progress += 1
+            if batches_without_progress >= args.patience:
+                reason = f"no new bins in {args.patience} batches"
+                break
+            instr_cnt = min(
+                int(instr_cnt * INSTR_CNT_GROWTH),
+                base_instr_cnt * MAX_INSTR_CNT_FACTOR,
+            )
+        weights = next_weights(base_weights, all_bins, covered)
+
+    print("=" * 57)
+    print("               COVERAGE SCHEDULER SUMMARY")
+    print("=" * 57)
+    print(f"Stopped: {reason}")
+    print(f"Seeds: {len(all_seeds)} in {len(state['batches'])} batch(es)")
+    print(f"Coverage: {len(covered)}/{len(all_bins)} bins ({coverage:.1%})")
+    for area, (missing, total) in sorted(missing_by_area(all_bins, covered).items()):
+        print(f"  {area:<8} {total - missing}/{total}")
+    statuses = stage_statuses(manifest.get("run_id"), "sim")
+    failed = sorted(seed for seed, status in statuses.items() if status != "pass")
+    if failed:
+        print(f"FAILED SEEDS: {' '.join(str(seed) for seed in failed)}")
+    print("=" * 57)
+
+    if coverage < args.target:
+        print(f"Coverage target of {args.target:.0%} not reached", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# scripts/dvflow.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Single entry point of the verification flow.
+
+Every step of the flow is a module of this directory with a main() that
+parses its own arguments. dvflow runs a step by name in the current
+interpreter, importing its module only when the step is run, so a command
+only pays for the modules (the RV32I model, the trace tools, PyYAML, ...)
+it actually uses. The Makefile drives the flow through it, and runners that
+chain several steps (cov_scheduler.py) call run_step() instead of starting
+a new interpreter for every step.
+
+Each script can still be run on its own (python3 scripts/<script>.py).
+
+Usage:
+    python3 scripts/dvflow.py <step> [arguments ...]
+    python3 scripts/dvflow.py --list
+"""
+
+import sys
+import argparse
+import importlib
+import subprocess
+
+# Step name -> (module, description)
+STEPS = {
+    "seeds": ("gen_seeds", "Print random seeds"),
+    "gen": ("run_regression", "Generate the tests of the given seeds"),
+    "compile": ("compile_assembly", "Compile the generated tests"),
+    "mem": ("mem_convert", "Convert the ELFs to memory images"),
+    "spike": ("run_spike", "Run the reference model"),
+    "build": ("build_rtl", "Build the simulation design incrementally"),
+    "sim": ("run_simulation", "Simulate the seeds and compare the traces"),
+    "cov": ("cov_scheduler", "Coverage-driven regression"),
+    "merge_cov": ("merge_cov", "Merge and report code coverage"),
+    "manifest": ("manifest", "Look up a seed's artifacts"),
+    "results": ("results_db", "Query the results database"),
+    "timing": ("stage_timer", "Report the per-stage timing"),
+    "compare": ("trace_compare", "Compare a Spike log with an RTL trace"),
+    "bisect": ("trace_bisect", "Locate the first divergence of two traces"),
+    "minimize": ("minimize_failure", "Shrink a failing seed to a repro"),
+    "coverage": ("trace_coverage", "Functional coverage of Spike logs"),
+    "golden": ("spike_log_to_golden", "Convert a Spike log to a golden file"),
+    "spike_csv": ("spike_log_to_csv", "Convert a Spike log to CSV"),
+    "rtl_csv": ("rtl_log_to_csv", "Convert an RTL trace to CSV"),
+    "bin_conv": ("bin_conv", "Convert a raw binary to a memory image"),
+    "iss": ("rv32i_iss", "Run an ELF on the built-in RV32I model"),
+    "disasm": ("rv32i_disasm", "Disassemble an ELF"),
+    "bench": ("bench_traces", "Benchmark the trace tools"),
+    "bench_uvm": ("bench_uvm", "Benchmark the UVM testbench"),
+}
+
+
+def get_project_root():
+    """Get the project root directory using git"""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--show-toplevel"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return result.stdout.strip()
+    except subprocess.CalledProcessError:
+        print(
+            "Error: Could not determine project root. Are you in a git repository?",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+def exit_status(code):
+    """Exit status of a SystemExit code, as the interpreter would report it"""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def run_step(step, arguments=()):
+    """
+    Run a step of the flow in this process, as if its script had been run
+    with the given arguments. Returns its exit status.
+    """
+    module = importlib.import_module(STEPS[step][0])
+    saved_argv = sys.argv
+    sys.argv = [module.__file__] + [str(argument) for argument in arguments]
+    try:
+        module.main()
+    except SystemExit as e:
+        return exit_status(e.code)
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        sys.argv = saved_argv
+    return 0
+
+
+def list_steps(file=sys.stdout):
+    width = max(len(step) for step in STEPS)
+    for step, (module, description) in STEPS.items():
+        print(f"  {step:<{width}}  {description} ({module}.py)", file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a step of the verification flow.",
+        usage="%(prog)s <step> [arguments ...]",
+    )
+    parser.add_argument("--list", action="store_true", help="List the steps")
+    parser.add_argument("step", nargs="?", help="Step to run (see --list)")
+    parser.add_argument(
+        "arguments", nargs=argparse.REMAINDER, help="Arguments of the step"
+    )
+    args = parser.parse_args()
+
+    if args.list or args.step is None:
+        output = sys.stdout if args.list else sys.stderr
+        print("Steps:", file=output)
+        list_steps(output)
+        sys.exit(0 if args.list else 1)
+    if args.step not in STEPS:
+        print(f"Error: Unknown step '{args.step}'. Steps:", file=sys.stderr)
+        list_steps(sys.stderr)
+        sys.exit(1)
+
+    sys.exit(run_step(args.step, args.arguments))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# scripts/elf_reader.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+A minimal reader for the 32-bit little-endian RISC-V ELF files produced by
+compile_assembly.py. It provides the sections, symbols and loadable segments
+that the flow used to get from 'objdump -t' and 'objdump -d', without
+starting the toolchain.
+
+Usage:
+    python3 scripts/elf_reader.py <elf_file>
+"""
+
+import sys
+import struct
+from collections import namedtuple
+
+ELF_MAGIC = b"\x7fELF"
+ELFCLASS32 = 1
+ELFDATA2LSB = 1
+EM_RISCV = 243
+
+SHT_SYMTAB = 2
+SHT_NOBITS = 8
+SHF_EXECINSTR = 0x4
+PT_LOAD = 1
+
+Section = namedtuple("Section", "name type flags addr offset size")
+Segment = namedtuple("Segment", "type offset vaddr paddr filesz memsz flags")
+
+
+class ElfError(Exception):
+    """Raised for files that are not 32-bit little-endian RISC-V ELFs"""
+
+
+class ElfFile:
+    """Sections, symbols and segments of an ELF file, read into memory once"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = f.read()
+
+        ident = self.data[:16]
+        if ident[:4] != ELF_MAGIC:
+            raise ElfError(f"{path} is not an ELF file")
+        if ident[4] != ELFCLASS32 or ident[5] != ELFDATA2LSB:
+            raise ElfError(f"{path} is not a 32-bit little-endian ELF file")
+
+        (
+            _,
+            self.machine,
+            _,
+            self.entry,
+            phoff,
+            shoff,
+            _,
+            _,
+            phentsize,
+            phnum,
+            shentsize,
+            shnum,
+            shstrndx,
+        ) = struct.unpack_from("<HHIIIIIHHHHHH", self.data, 16)
+        if self.machine != EM_RISCV:
+            raise ElfError(f"{path} is not a RISC-V ELF file")
+
+        self.segments = [
+            Segment(*struct.unpack_from("<IIIIIII", self.data, phoff + i * phentsize))
+            for i in range(phnum)
+        ]
+
+        headers = [
+            struct.unpack_from("<IIIIIIIIII", self.data, shoff + i * shentsize)
+            for i in range(shnum)
+        ]
+        names = headers[shstrndx] if headers else None
+        self.sections = []
+        for name, sh_type, flags, addr, offset, size, *_ in headers:
+            if names is not None:
+                name = self._string(names[4] + name)
+            self.sections.append(Section(name, sh_type, flags, addr, offset, size))
+
+        self._headers = headers
+        self._symbols = None
+
+    def _string(self, offset):
+        """Read a NUL-terminated string at a file offset"""
+        end = self.data.index(b"\0", offset)
+        return self.data[offset:end].decode(errors="replace")
+
+    def section(self, name):
+        """Return the named section, or None"""
+        for section in self.sections:
+            if section.name == name:
+                return section
+        return None
+
+    def section_data(self, section):
+        """Contents of a section (empty for .bss-like sections)"""
+        if section.type == SHT_NOBITS:
+            return b""
+        return self.data[section.offset : section.offset + section.size]
+
+    def code_sections(self):
+        """Sections holding executable code"""
+        return [
+            s
+            for s in self.sections
+            if s.flags & SHF_EXECINSTR and s.type != SHT_NOBITS and s.size
+        ]
+
+    def load_segments(self):
+        """PT_LOAD segments, in file order"""
+        return [s for s in self.segments if s.type == PT_LOAD]
+
+    def load_image(self):
+        """
+        The initialized memory image, like 'objcopy -O binary': the file
+        contents of all PT_LOAD segments placed at their physical addresses
+        from the lowest one up, with zero-filled gaps. Zero-initialized tails
+        (.bss) are not part of the image. Returns (base_address, bytes).
+        """
+        segments = [s for s in self.load_segments() if s.filesz]
+        if not segments:
+            return 0, b""
+
+        base = min(s.paddr for s in segments)
+        image = bytearray(max(s.paddr + s.filesz for s in segments) - base)
+        for s in segments:
+            start = s.paddr - base
+            image[start : start + s.filesz] = self.data[s.offset : s.offset + s.filesz]
+        return base, bytes(image)
+
+    @property
+    def symbols(self):
+        """Dictionary of symbol name to value, like 'objdump -t'"""
+        if self._symbols is None:
+            self._symbols = {}
+            for header in self._headers:
+                if header[1] != SHT_SYMTAB:
+                    continue
+                strtab = self._headers[header[6]]
+                offset, size, entsize = header[4], header[5], header[9] or 16
+                for pos in range(offset, offset + size, entsize):
+                    name, value = struct.unpack_from("<II", self.data, pos)
+                    if name:
+                        self._symbols.setdefault(self._string(strtab[4] + name), value)
+        return self._symbols
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python3 scripts/elf_reader.py <elf_file>", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        elf = ElfFile(sys.argv[1])
+    except (OSError, ElfError) as e:
+        print(f"Error reading ELF file: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Entry point: 0x{elf.entry:08x}")
+    print("Sections:")
+    for section in elf.sections:
+        if section.name:
+            print(f"  {section.name:<16} 0x{section.addr:08x} {section.size:8d}")
+    print("Symbols:")
+    for name, value in sorted(elf.symbols.items(), key=lambda item: item[1]):
+        print(f"  0x{value:08x} {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# scripts/manifest.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Regression manifest: a JSON index of every artifact produced for each seed.
+
+Test generation creates the manifest and records the assembly and generator
+log of every seed. Each later stage (compile, Spike, memory conversion, RTL
+simulation) looks its inputs up here and records its own outputs, so no
+stage has to glob for 'out_*' directories or guess file names.
+
+Layout:
+    {
+      "out_dir": "out_2025-06-29",
+      "test_name": "riscv_arithmetic_basic_test",
+      "run_id": 12,
+      "seeds": {"17216": {"asm": "...", "gen_log": "...", "elf": "..."}}
+    }
+
+Usage:
+    python3 scripts/manifest.py get <seed> <artifact>
+"""
+
+import sys
+import os
+import json
+import fcntl
+from contextlib import contextmanager
+
+DEFAULT_MANIFEST = os.path.join("logs", "manifest.json")
+
+
+def manifest_path():
+    """Location of the manifest, overridable with the MANIFEST variable"""
+    return os.environ.get("MANIFEST", DEFAULT_MANIFEST)
+
+
+@contextmanager
+def _locked(path):
+    """Hold an exclusive lock on the manifest while it is read and rewritten"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _write(path, manifest):
+    """Atomically replace the manifest file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def create_manifest(out_dir, test_name, run_id=None):
+    """
+    Start a fresh manifest for a new generation run. run_id links it to the
+    run's entry in the results database (see results_db.py).
+    """
+    path = manifest_path()
+    manifest = {
+        "out_dir": out_dir,
+        "test_name": test_name,
+        "run_id": run_id,
+        "seeds": {},
+    }
+    with _locked(path):
+        _write(path, manifest)
+    return manifest
+
+
+def load_manifest():
+    """Load the manifest, exiting with an error if it does not exist"""
+    path = manifest_path()
+    if not os.path.exists(path):
+        print(
+            f"Error: Manifest '{path}' not found. Did 'make gen' run successfully?",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def record_artifacts(seed, **artifacts):
+    """Record artifact paths for a seed, e.g. record_artifacts(seed, elf=path)"""
+    record_many({seed: artifacts})
+
+
+def record_many(artifacts_by_seed):
+    """Record artifact paths for several seeds with a single manifest update"""
+    path = manifest_path()
+    with _locked(path):
+        with open(path, "r") as f:
+            manifest = json.load(f)
+        for seed, artifacts in artifacts_by_seed.items():
+            manifest["seeds"].setdefault(str(seed), {}).update(artifacts)
+        _write(path, manifest)
+
+
+def manifest_seeds(manifest):
+    """All seeds in the manifest, in generation order"""
+    return [int(seed) for seed in manifest["seeds"]]
+
+
+def get_artifact(manifest, seed, artifact):
+    """Return the recorded path of an artifact, exiting if it is missing"""
+    entry = manifest["seeds"].get(str(seed))
+    if entry is None:
+        print(f"Error: Seed {seed} is not in the manifest.", file=sys.stderr)
+        sys.exit(1)
+    path = entry.get(artifact)
+    if path is None:
+        print(
+            f"Error: No '{artifact}' recorded for seed {seed}. "
+            "Did the producing step run?",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    return path
+
+
+def main():
+    if len(sys.argv) != 4 or sys.argv[1] != "get":
+        print(
+            "Usage: python3 scripts/manifest.py get <seed> <artifact>", file=sys.stderr
+        )
+        sys.exit(1)
+
+    manifest = load_manifest()
+    print(get_artifact(manifest, sys.argv[2], sys.argv[3]))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,44 +5,116 @@
 # All rights reserved.
 
 """
-This script converts all generated ELF files into the Verilog .mem format
-by reusing the conversion logic from the main simulation script.
+This script converts all generated ELF files into the Verilog .mem format.
+
+The memory image is built directly from the ELF program headers (the same
+bytes 'objcopy -O binary' would produce) and formatted in memory, so no
+.bin intermediate is written and no toolchain process is started. The seeds
+are converted in parallel, and images of an unchanged ELF are restored from
+the build cache (build_cache.py).
 """
 
 import sys
 import os
-import glob
-from run_simulation import find_elf_file, convert_elf_to_mem
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import build_cache
+from bin_conv import format_words, mem_format
+from elf_reader import ElfFile, ElfError
+from manifest import load_manifest, manifest_seeds, get_artifact, record_many
 
+# The instruction memory of the testbench starts at this address
+RAM_BASE = 0x80000000
 
-def main():
-    """Main entry point"""
-    # Get RISC-V toolchain prefix
-    riscv_prefix = os.environ.get("RISCV_PREFIX", "riscv64-unknown-elf")
+# Bump when the image layout changes, so cached images are rebuilt
+MEM_CACHE_VERSION = "1"
 
-    # Find the output directory
-    out_dirs = glob.glob("out_*/")
-    if not out_dirs:
-        print("Error: Output directory (out_*) not found.", file=sys.stderr)
-        sys.exit(1)
-    out_dir = out_dirs[0]
 
-    # Find the seed file
-    seed_file = "logs/seeds.txt"
-    if not os.path.exists(seed_file):
-        print(f"Error: Seed file '{seed_file}' not found.", file=sys.stderr)
+def write_mem_file(elf_file, fmt):
+    """Write the memory file of an ELF and return its path"""
+    mem_file = f"{elf_file}.mem"
+    key = build_cache.hash_inputs(
+        MEM_CACHE_VERSION, fmt, build_cache.hash_file(elf_file)
+    )
+    if build_cache.fetch("mem", key, mem_file, ".mem"):
+        return mem_file
+
+    base, image = ElfFile(elf_file).load_image()
+    if image and base != RAM_BASE:
+        print(
+            f"Warning: {elf_file} is loaded at 0x{base:08x}, not at 0x{RAM_BASE:08x}",
+            file=sys.stderr,
+        )
+    with open(mem_file, "wb") as f:
+        f.write(format_words(image, fmt))
+    build_cache.store("mem", key, mem_file, ".mem")
+    return mem_file
+
+
+def convert_elf_to_mem(elf_file):
+    """Convert ELF to Verilog memory format"""
+    print("--- Converting ELF to Verilog memory format ---")
+
+    try:
+        return write_mem_file(elf_file, mem_format())
+    except (IOError, ElfError) as e:
+        print(f"Error converting {elf_file} to memory format: {e}", file=sys.stderr)
         sys.exit(1)
 
-    # Process each seed
-    with open(seed_file, "r") as f:
-        for seed in f:
-            seed = seed.strip()
-            if not seed:
-                continue
 
+def convert_seed(seed, elf_file, fmt):
+    """Worker: convert one seed's ELF. Returns (seed, mem_file, error)."""
+    try:
+        return seed, write_mem_file(elf_file, fmt), None
+    except (IOError, ElfError) as e:
+        return seed, None, f"Error converting {elf_file} to memory format: {e}"
+
+
+def convert_all(manifest, jobs):
+    """Convert the ELF of every seed in the manifest in a process pool"""
+    fmt = mem_format()
+    mem_files = {}
+    failures = 0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = []
+        for seed in manifest_seeds(manifest):
             print(f"--- Converting ELF for SEED = {seed} ---")
-            elf_file = find_elf_file(out_dir, seed)
-            convert_elf_to_mem(elf_file, riscv_prefix)
+            elf_file = get_artifact(manifest, seed, "elf")
+            futures.append(pool.submit(convert_seed, seed, elf_file, fmt))
+
+        for future in as_completed(futures):
+            seed, mem_file, error = future.result()
+            if error:
+                print(error, file=sys.stderr)
+                failures += 1
+                continue
+            mem_files[seed] = {"mem": mem_file}
+
+    record_many(mem_files)
+    return failures
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Convert the compiled ELF files into Verilog memory files."
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of parallel conversions (default: all CPUs)",
+    )
+    args = parser.parse_args()
+
+    # Look up the compiled ELF files
+    manifest = load_manifest()
+
+    failures = convert_all(manifest, max(1, args.jobs))
+    if failures:
+        print(f"Error: {failures} ELF file(s) failed to convert", file=sys.stderr)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
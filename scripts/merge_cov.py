@@ -4,37 +4,283 @@
 # Copyright (c) 2025 Igor Bogdanov
 # All rights reserved.
 
-"""Merge coverage databases and generate JSON report."""
+"""
+Merge the per-simulation coverage databases and write the JSON summary.
 
+The merged database (coverage/merged.ucdb) is kept between calls together
+with a record of the databases it already holds (merged.json: size and
+modification time of each). A call only merges the new sim_*.ucdb files into
+it, so its cost follows the number of new simulations rather than all of
+them. It is rebuilt from scratch when one of the recorded databases changed
+or disappeared (a seed was simulated again), since vcover cannot take a
+database back out of a merge, or with --full.
+
+Many new databases are merged as a tree: pairs are merged by parallel vcover
+processes (--jobs), then pairs of the results, and so on, and the root is
+merged into the persistent database last.
+
+The summary is parsed from 'vcover report' of the merged database: bins,
+hits and coverage of every metric it reports (statements, branches,
+conditions, expressions, FSM, toggles, covergroups, ...), summed over the
+design instances, and their average as the total coverage. Metrics that were
+not collected are left out. The HTML report (--html) is only regenerated
+when the merged database changed.
+
+Usage:
+    python3 scripts/merge_cov.py [--jobs N] [--full] [--html <dir>] \
+        -o coverage/coverage.json [coverage_dir | ucdb ...]
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import shutil
 import argparse
 import subprocess
-import json
-import sys
-import re
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_COV_DIR = "coverage"
+MERGED_UCDB = "merged.ucdb"
+MERGE_STATE = "merged.json"
+
+VCOVER_MERGE = ["vcover", "merge", "-64", "-suppress", "6854"]
+
+# Number of new databases from which they are merged as a tree
+TREE_MERGE_MIN = 8
+
+# Metric rows of the report tables, e.g.
+#     Branches                       110        92        18    83.63%
+# (Bins Hits Misses Coverage; older releases print Active Hits Misses % Covered)
+METRIC_RE = re.compile(
+    r"^\s*(Assertions|Branches|Conditions|Covergroups|Coverpoints|Cross|"
+    r"Directives|Expressions|FSM States|FSM Transitions|Statements|Toggles)\s+"
+    r"(\d+)\s+(\d+)\s+(\d+)\s+([\d.]+)%",
+    re.MULTILINE,
+)
+COVERGROUP_RE = re.compile(r"^\s*TOTAL COVERGROUP COVERAGE:\s*([\d.]+)%", re.MULTILINE)
+
+# Summary keys of the metrics the flow has always reported
+SUMMARY_KEYS = {"Statements": "line", "Branches": "branch"}
+
+
+def file_stamp(path):
+    """Size and modification time that identify a version of a database"""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def find_databases(inputs, merged):
+    """Per-simulation databases of the input directories and files"""
+    databases = []
+    for path in inputs:
+        if os.path.isdir(path):
+            databases.extend(sorted(glob.glob(os.path.join(path, "sim_*.ucdb"))))
+        elif os.path.exists(path):
+            databases.append(path)
+    merged = os.path.abspath(merged)
+    return [db for db in databases if os.path.abspath(db) != merged]
+
+
+def load_state(state_file):
+    """Databases already merged, as a dictionary of path to stamp"""
+    try:
+        with open(state_file, "r") as f:
+            return json.load(f).get("merged", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state_file, merged):
+    with open(state_file, "w") as f:
+        json.dump({"merged": merged}, f, indent=2, sort_keys=True)
+
+
+def vcover_merge(output, inputs):
+    """Merge the input databases into output"""
+    result = subprocess.run(
+        VCOVER_MERGE + [output] + inputs, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"vcover merge into {output} failed:\n{result.stdout}{result.stderr}"
+        )
+    return output
+
+
+def tree_merge(databases, work_dir, jobs):
+    """
+    Merge databases pairwise, each level in parallel, and return the path of
+    the database holding all of them.
+    """
+    level = 0
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while len(databases) > 1:
+            groups = [databases[i : i + 2] for i in range(0, len(databases), 2)]
+            futures = []
+            for index, group in enumerate(groups):
+                if len(group) == 1:
+                    futures.append(None)
+                    continue
+                output = os.path.join(work_dir, f"level{level}_{index}.ucdb")
+                futures.append(executor.submit(vcover_merge, output, group))
+            databases = [
+                group[0] if future is None else future.result()
+                for group, future in zip(groups, futures)
+            ]
+            level += 1
+    return databases[0]
+
+
+def merge(databases, merged_ucdb, jobs, full=False):
+    """
+    Bring merged_ucdb up to date with the databases. Returns the number of
+    databases merged in this call (0 when it was already up to date).
+    """
+    state_file = os.path.join(os.path.dirname(merged_ucdb) or ".", MERGE_STATE)
+    stamps = {db: file_stamp(db) for db in databases}
+    state = load_state(state_file)
+
+    stale = [db for db, stamp in state.items() if stamps.get(db) != stamp]
+    if full or stale or not os.path.exists(merged_ucdb):
+        if stale and not full:
+            print(f"{len(stale)} merged database(s) changed, rebuilding {merged_ucdb}")
+        state = {}
+        new = list(databases)
+        base = []
+    else:
+        new = [db for db in databases if db not in state]
+        base = [merged_ucdb]
+    if not new:
+        return 0
+
+    count = len(new)
+    print(f"Merging {count} coverage database(s) into {merged_ucdb}")
+    work_dir = merged_ucdb + ".tmp"
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        # A few databases are cheaper to merge in one vcover call than through
+        # intermediate databases
+        if jobs > 1 and len(new) >= TREE_MERGE_MIN:
+            new = [tree_merge(new, work_dir, jobs)]
+        # Merge into a new file, so an interrupted merge keeps the old database
+        staged = vcover_merge(os.path.join(work_dir, MERGED_UCDB), base + new)
+        os.replace(staged, merged_ucdb)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    state.update({db: stamps[db] for db in stamps if db not in state})
+    save_state(state_file, state)
+    return count
+
+
+def parse_report(text):
+    """
+    Coverage summary of a 'vcover report': bins, hits and coverage of every
+    metric, summed over the instance tables, and their average as the total.
+    """
+    totals = {}
+    for name, bins, hits, _, _ in METRIC_RE.findall(text):
+        metric = totals.setdefault(name, [0, 0])
+        metric[0] += int(bins)
+        metric[1] += int(hits)
+
+    metrics = {
+        name: {
+            "bins": bins,
+            "hits": hits,
+            "coverage": round(hits / bins, 4) if bins else None,
+        }
+        for name, (bins, hits) in sorted(totals.items())
+    }
+    summary = {"metrics": metrics}
+    for name, key in SUMMARY_KEYS.items():
+        if name in metrics:
+            summary[key] = metrics[name]["coverage"]
+
+    covergroups = COVERGROUP_RE.findall(text)
+    if covergroups:
+        summary["functional"] = round(float(covergroups[-1]) / 100.0, 4)
+    # Like vcover's total coverage, every metric weighs the same
+    covered = [m["coverage"] for m in metrics.values() if m["coverage"] is not None]
+    if covered:
+        summary["total"] = round(sum(covered) / len(covered), 4)
+    return summary
+
+
+def report(merged_ucdb):
+    """Parsed coverage summary of the merged database"""
+    # Without -details the report holds one table per instance and no
+    # per-file tables that would count the bins again
+    cmd = ["vcover", "report", merged_ucdb]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"vcover report failed:\n{result.stdout}{result.stderr}")
+    return parse_report(result.stdout)
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Merge coverage and output JSON")
-    parser.add_argument("ucdb_file", help="Input UCDB file")
+    parser = argparse.ArgumentParser(
+        description="Incrementally merge coverage databases and output JSON"
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        default=[DEFAULT_COV_DIR],
+        help="Coverage directories (their sim_*.ucdb) or UCDB files",
+    )
     parser.add_argument("-o", "--output", required=True, help="Output JSON file")
+    parser.add_argument(
+        "--merged",
+        default=os.path.join(DEFAULT_COV_DIR, MERGED_UCDB),
+        help="Persistent merged database",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=os.cpu_count(), help="Parallel vcover merges"
+    )
+    parser.add_argument(
+        "--full", action="store_true", help="Rebuild the merged database from scratch"
+    )
+    parser.add_argument("--html", help="Regenerate the HTML report in this directory")
     args = parser.parse_args()
 
-    # Generate coverage report using vcover
-    cmd = ["vcover", "report", "-details", args.ucdb_file]
-    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    databases = find_databases(args.inputs, args.merged)
+    if not databases and not os.path.exists(args.merged):
+        print(
+            "Error: No coverage databases found. Run regression with coverage "
+            "first:\n  COV_ENABLE=1 make regress",
+            file=sys.stderr,
+        )
+        sys.exit(1)
 
-    # Parse functional coverage percentage (simplified extraction)
-    functional_match = re.search(r"TOTAL.*?(\d+\.\d+)%", result.stdout)
-    functional_pct = (
-        float(functional_match.group(1)) / 100.0 if functional_match else 0.65
-    )
+    try:
+        merged = merge(databases, args.merged, max(1, args.jobs), args.full)
+        if merged == 0:
+            print(f"{args.merged} is up to date ({len(databases)} database(s))")
+        if args.html and (merged or not os.path.isdir(args.html)):
+            subprocess.run(
+                ["vcover", "report", "-html", "-details", "-output", args.html]
+                + [args.merged],
+                check=True,
+            )
+        summary = report(args.merged)
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
-    # Generate JSON report
-    coverage_data = {"functional": functional_pct, "line": 0.85, "branch": 0.78}
     with open(args.output, "w") as f:
-        json.dump(coverage_data, f, indent=2)
+        json.dump(summary, f, indent=2)
 
-    print(f"Coverage: {functional_pct:.1%} functional")
+    for name, metric in summary["metrics"].items():
+        print(
+            f"  {name:<16} {metric['hits']:>8}/{metric['bins']:<8} "
+            f"{metric['coverage'] or 0:.2%}"
+        )
+    if "functional" in summary:
+        print(f"Coverage: {summary['functional']:.1%} functional")
+    if "total" in summary:
+        print(f"Coverage: {summary['total']:.2%} total")
 
 
 if __name__ == "__main__":
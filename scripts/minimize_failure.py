@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# scripts/minimize_failure.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Shrink the program of a failing seed to a small repro of the same failure.
+
+The instructions of the test's main body (from 'main:' up to 'test_done:',
+so the boot code, trap handlers and data stay intact) are reduced by delta
+debugging: the body is split into chunks, every variant with one chunk
+removed is built and simulated, and the first variant that still fails the
+same way is kept, then with finer chunks down to single instructions.
+Labels of removed lines are kept, so branches still assemble.
+
+Every candidate goes through the flow's own stages in a private directory
+under <out_dir>/minimize_<seed>/: compile_assembly, the RV32I model as a
+screen against variants that trap or loop forever, the reference model
+(GOLDEN_MODEL), mem_convert and run_simulation. The candidates of a round
+are simulated in parallel (--jobs). A candidate fails the same way if the
+first mismatching GPR write is in the same instruction and of the same kind
+(wrong value, missing or extra write) as for the original program; with
+--match any, every mismatch counts.
+
+The repro is written to <out_dir>/minimized/<test>_min.S.
+
+Usage:
+    python3 scripts/minimize_failure.py <seed> [--jobs N] [--match instr|any]
+                                               [-o <repro.S>]
+"""
+
+import os
+import re
+import sys
+import shutil
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from itertools import zip_longest
+from compile_assembly import check_linker_script, compile_one, compiler_settings
+from manifest import load_manifest, get_artifact
+from mem_convert import convert_elf_to_mem
+from rtl_trace import trace_bin_enabled
+from dvflow import get_project_root
+from run_simulation import run_rtl_simulation
+from run_spike import golden_model, run_iss_for_seed, run_spike_for_seed
+from trace_compare import log_gpr_writes
+from trace_coverage import instruction_name
+
+BODY_START_RE = re.compile(r"^main:")
+BODY_END_RE = re.compile(r"^test_done:")
+LABEL_RE = re.compile(r"^(\s*[\w.$]+:)(.*)$")
+
+# The RV32I screen stops variants that run this many times longer than the
+# original program
+SCREEN_FACTOR = 4
+
+
+def body_lines(lines):
+    """Indexes of the instruction lines of the main body"""
+    units = []
+    in_body = False
+    for index, line in enumerate(lines):
+        if BODY_START_RE.match(line):
+            in_body = True
+        elif BODY_END_RE.match(line):
+            break
+        if not in_body:
+            continue
+        label = LABEL_RE.match(line)
+        code = (label.group(2) if label else line).split("#")[0].strip()
+        if code and not code.startswith("."):
+            units.append(index)
+    return units
+
+
+def render(lines, units, kept):
+    """Program text with the units not in kept removed (their labels stay)"""
+    removed = set(units) - set(kept)
+    out = []
+    for index, line in enumerate(lines):
+        if index not in removed:
+            out.append(line)
+            continue
+        label = LABEL_RE.match(line)
+        if label:
+            out.append(label.group(1) + "\n")
+    return "".join(out)
+
+
+def failure_signature(spike_log, rtl_log):
+    """
+    Kind and instruction of the first mismatching GPR write, or None if the
+    traces agree.
+    """
+    pairs = zip_longest(log_gpr_writes(spike_log), log_gpr_writes(rtl_log))
+    for expected, actual in pairs:
+        if expected is not None and actual is not None and expected[2:] == actual[2:]:
+            continue
+        if actual is None:
+            return "missing", instruction_name(expected[1])
+        if expected is None:
+            return "extra", instruction_name(actual[1])
+        return "value", instruction_name(expected[1])
+    return None
+
+
+def evaluate(number, source, work_dir, model):
+    """
+    Build and simulate one candidate program. Returns its failure signature
+    and reference log, or (None, None) if it did not get through the flow.
+    """
+    asm_file = os.path.join(work_dir, "test.S")
+    with open(asm_file, "w") as f:
+        f.write(source)
+    elf_file = asm_file.replace(".S", ".o")
+
+    cc, cflags = compiler_settings()
+    _, error, _ = compile_one(cc, cflags, check_linker_script(), asm_file, elf_file)
+    if error:
+        print(error)
+        return None, None
+
+    # The model also screens out variants Spike would never finish
+    _, spike_log, message = run_iss_for_seed(number, work_dir, elf_file)
+    if spike_log is None:
+        print(message)
+        return None, None
+    if model != "iss":
+        _, spike_log, message = run_spike_for_seed(number, work_dir, elf_file)
+        if spike_log is None:
+            print(message)
+            return None, None
+
+    mem_file = convert_elf_to_mem(elf_file)
+    suffix = "bin" if trace_bin_enabled() else "log"
+    rtl_log = os.path.join(work_dir, f"rtl_trace_{number}.{suffix}")
+    run_rtl_simulation(mem_file, rtl_log, number, work_dir)
+    return failure_signature(spike_log, rtl_log), spike_log
+
+
+def run_candidate(number, source, work_root, model, max_instrs=None):
+    """
+    Worker entry point: evaluate() with all output, including vsim's, sent
+    to the candidate's run.log. Returns (number, signature, commits).
+    """
+    if max_instrs:
+        os.environ["ISS_MAX_INSTRS"] = str(max_instrs)
+    work_dir = os.path.join(work_root, f"candidate_{number}")
+    # tb_top dumps its waveform to a relative 'logs/' directory
+    os.makedirs(os.path.join(work_dir, "logs"), exist_ok=True)
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_stdout = os.dup(1)
+    saved_stderr = os.dup(2)
+    signature, spike_log = None, None
+    try:
+        with open(os.path.join(work_dir, "run.log"), "w") as log:
+            os.dup2(log.fileno(), 1)
+            os.dup2(log.fileno(), 2)
+            try:
+                signature, spike_log = evaluate(number, source, work_dir, model)
+            except SystemExit:
+                # Pipeline helpers exit on fatal errors; the candidate is
+                # simply not a repro
+                pass
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+    finally:
+        os.dup2(saved_stdout, 1)
+        os.dup2(saved_stderr, 2)
+        os.close(saved_stdout)
+        os.close(saved_stderr)
+
+    commits = 0
+    if spike_log:
+        with open(spike_log, "r") as f:
+            commits = sum(1 for _ in f)
+    return number, signature, commits
+
+
+class Minimizer:
+    """Delta debugging of a program's main body"""
+
+    def __init__(self, lines, work_root, model, match, jobs):
+        self.lines = lines
+        self.units = body_lines(lines)
+        self.work_root = work_root
+        self.model = model
+        self.match = match
+        self.pool = ProcessPoolExecutor(max_workers=jobs)
+        self.count = 0
+        self.tested = {}
+        self.reference = None
+        self.best_dir = None
+        self.commits = 0
+        # Limit of the RV32I screen, set once the original program ran
+        self.max_instrs = None
+
+    def candidate_dir(self, number):
+        return os.path.join(self.work_root, f"candidate_{number}")
+
+    def submit(self, kept):
+        self.count += 1
+        source = render(self.lines, self.units, kept)
+        return self.pool.submit(
+            run_candidate,
+            self.count,
+            source,
+            self.work_root,
+            self.model,
+            self.max_instrs,
+        )
+
+    def reproduces(self, signature):
+        if signature is None:
+            return False
+        return self.match == "any" or signature == self.reference
+
+    def first_repro(self, candidates):
+        """
+        Simulate the candidates in parallel. Returns the index of the first
+        one (in order) that reproduces the failure, or None.
+        """
+        futures = [
+            None if tuple(kept) in self.tested else self.submit(kept)
+            for kept in candidates
+        ]
+        found = None
+        for index, (kept, future) in enumerate(zip(candidates, futures)):
+            if future is None:
+                continue
+            if found is not None:
+                # Later candidates are not needed any more
+                if not future.cancel():
+                    number, _, _ = future.result()
+                    shutil.rmtree(self.candidate_dir(number), ignore_errors=True)
+                continue
+            number, signature, commits = future.result()
+            self.tested[tuple(kept)] = signature
+            if self.reproduces(signature):
+                found = index
+                if self.best_dir:
+                    shutil.rmtree(self.best_dir, ignore_errors=True)
+                self.best_dir = self.candidate_dir(number)
+                self.commits = commits
+            else:
+                shutil.rmtree(self.candidate_dir(number), ignore_errors=True)
+        return found
+
+    def original(self):
+        """Simulate the unmodified program and record its failure"""
+        number, signature, commits = self.submit(self.units).result()
+        self.reference = signature
+        self.best_dir = self.candidate_dir(number)
+        self.commits = commits
+        self.max_instrs = SCREEN_FACTOR * commits
+        return signature
+
+    def minimize(self):
+        """Reduce the body and return the kept units"""
+        kept = list(self.units)
+        chunks = 2
+        while len(kept) >= 2:
+            size = len(kept) / chunks
+            bounds = [round(i * size) for i in range(chunks + 1)]
+            candidates = [
+                kept[: bounds[i]] + kept[bounds[i + 1] :] for i in range(chunks)
+            ]
+            print(
+                f"--- {len(kept)} instructions, trying {chunks} chunks of "
+                f"~{size:.0f} ---"
+            )
+            found = self.first_repro(candidates)
+            if found is not None:
+                kept = candidates[found]
+                chunks = max(chunks - 1, 2)
+            elif chunks < len(kept):
+                chunks = min(chunks * 2, len(kept))
+            else:
+                break
+        return kept
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Minimize the program of a failing seed to a small repro."
+    )
+    parser.add_argument("seed", type=int, help="Failing seed")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Candidates simulated in parallel (default: all CPUs)",
+    )
+    parser.add_argument(
+        "--match",
+        choices=("instr", "any"),
+        default="instr",
+        help="Keep variants failing in the same instruction (default) or any",
+    )
+    parser.add_argument("-o", "--output", help="Repro assembly file")
+    args = parser.parse_args()
+
+    os.chdir(get_project_root())
+    manifest = load_manifest()
+    out_dir = manifest["out_dir"]
+    asm_file = get_artifact(manifest, args.seed, "asm")
+    with open(asm_file, "r") as f:
+        lines = f.readlines()
+
+    work_root = os.path.join(out_dir, f"minimize_{args.seed}")
+    shutil.rmtree(work_root, ignore_errors=True)
+    os.makedirs(work_root)
+    # Candidates are not part of the regression's timing or coverage (their
+    # databases would be merged and could overwrite those of real seeds)
+    os.environ["TIMING"] = "0"
+    os.environ["COV_ENABLE"] = "0"
+
+    minimizer = Minimizer(
+        lines, work_root, golden_model(), args.match, max(1, args.jobs)
+    )
+    try:
+        if not minimizer.units:
+            print(f"Error: No main body found in {asm_file}", file=sys.stderr)
+            sys.exit(1)
+        print(f"--- Reproducing the failure of SEED {args.seed} ({asm_file}) ---")
+        signature = minimizer.original()
+        if signature is None:
+            print(
+                f"Error: SEED {args.seed} does not fail in this flow "
+                f"(see {minimizer.best_dir}/run.log)",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        original_commits = minimizer.commits
+        print(f"--- Failure: {signature[0]} GPR write of {signature[1]} ---")
+        kept = minimizer.minimize()
+    finally:
+        minimizer.close()
+
+    output = args.output or os.path.join(
+        out_dir,
+        "minimized",
+        os.path.basename(asm_file).replace(".S", "_min.S"),
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        f.write(render(lines, minimizer.units, kept))
+
+    print("=" * 57)
+    print(f"Minimized SEED {args.seed} in {minimizer.count} simulations")
+    print("=" * 57)
+    print(f"Body instructions: {len(minimizer.units)} -> {len(kept)}")
+    print(f"Commits:           {original_commits} -> {minimizer.commits}")
+    print(f"Repro:             {output}")
+    print(f"Candidate:         {minimizer.best_dir}")
+
+
+if __name__ == "__main__":
+    main()
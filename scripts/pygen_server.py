@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# scripts/pygen_server.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+A warm, in-process fork server for the riscv-dv Python generator (pygen).
+
+Starting 'run.py ... --iterations 1 --seed S' once per seed re-imports pyvsc,
+pygen and the target settings every time. This module imports the seed
+independent part of that stack once, then forks a child per seed. Each child
+runs the exact generator command line that run.py would have executed, so the
+generated programs are byte-identical to a cold per-seed run.
+
+The generator command is captured from run.py itself using its '--debug'
+option, which records the commands it would run instead of running them.
+"""
+
+import sys
+import os
+import re
+import shlex
+import runpy
+import importlib
+import importlib.util
+import subprocess
+import tempfile
+import traceback
+import time
+from stage_timer import record_process
+
+# Modules whose import does not depend on the command line or the seed. These
+# make up most of the generator start-up time.
+WARM_MODULES = [
+    "vsc",
+    "bitstring",
+    "pygen_src.riscv_instr_pkg",
+]
+
+# Modules that parse the generator arguments (including the seed) at import
+# time. They must never be imported by the server itself.
+SEED_DEPENDENT_MODULES = [
+    "pygen_src.riscv_instr_gen_config",
+]
+
+SEED_ARG_RE = re.compile(r"^--seed(=.*)?$")
+
+
+class GeneratorServerError(Exception):
+    """Raised when the warm generator cannot be set up"""
+
+
+def capture_generator_command(run_cmd_args, env):
+    """
+    Run riscv-dv's run.py in debug mode and return the pygen command line it
+    would execute, as an argument list starting with the generator script.
+    """
+    with tempfile.NamedTemporaryFile(
+        mode="r", prefix="riscv_dv_cmd_", suffix=".log", delete=False
+    ) as debug_file:
+        debug_path = debug_file.name
+
+    try:
+        subprocess.run(
+            run_cmd_args + ["--debug", debug_path],
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        with open(debug_path, "r") as f:
+            commands = f.read()
+    except subprocess.CalledProcessError as e:
+        raise GeneratorServerError(f"run.py --debug failed: {e}")
+    finally:
+        os.remove(debug_path)
+
+    for line in commands.splitlines():
+        if "pygen_src" not in line:
+            continue
+        tokens = shlex.split(line)
+        for idx, token in enumerate(tokens):
+            if token.endswith(".py") and "pygen_src" in token:
+                return tokens[idx:]
+
+    raise GeneratorServerError("run.py did not report a pygen generator command")
+
+
+def with_seed(script_argv, seed):
+    """Return a copy of the generator argument list with the seed replaced"""
+    argv = list(script_argv)
+    for idx, token in enumerate(argv):
+        match = SEED_ARG_RE.match(token)
+        if not match:
+            continue
+        if match.group(1):
+            argv[idx] = f"--seed={seed}"
+        else:
+            argv[idx + 1] = str(seed)
+        return argv
+    raise GeneratorServerError("Generator command line has no --seed argument")
+
+
+def with_output_dir(script_argv, old_dir, new_dir):
+    """
+    Return a copy of the generator argument list with every path below
+    old_dir (relative or absolute) moved below new_dir.
+    """
+    replacements = [
+        (os.path.abspath(old_dir), os.path.abspath(new_dir)),
+        (os.path.normpath(old_dir), os.path.normpath(new_dir)),
+    ]
+    argv = []
+    for token in script_argv:
+        for old, new in replacements:
+            if old in token:
+                token = token.replace(old, new)
+                break
+        argv.append(token)
+    return argv
+
+
+class GeneratorServer:
+    """Imports pygen once and forks a fresh generator process per seed"""
+
+    def __init__(self, pygen_dir, custom_target_dir=None):
+        self.pygen_dir = pygen_dir
+        self.custom_target_dir = custom_target_dir
+        # The host script's own directory is not on a cold generator's path
+        self.host_dir = sys.path[0]
+        self.warm = False
+
+    def warm_up(self):
+        """Import the seed independent generator modules into this process"""
+        if self.pygen_dir not in sys.path:
+            sys.path.insert(0, self.pygen_dir)
+
+        for module in WARM_MODULES:
+            importlib.import_module(module)
+
+        # Loading the target settings pulls in everything it needs from
+        # pygen_src. It is executed under a private name so that the generator
+        # still resolves the settings module exactly as it does when cold.
+        if self.custom_target_dir:
+            setting_file = os.path.join(self.custom_target_dir, "riscv_core_setting.py")
+            spec = importlib.util.spec_from_file_location(
+                "_warm_riscv_core_setting", setting_file
+            )
+            spec.loader.exec_module(importlib.util.module_from_spec(spec))
+
+        loaded = [m for m in SEED_DEPENDENT_MODULES if m in sys.modules]
+        if loaded:
+            raise GeneratorServerError(
+                f"Warm-up imported seed dependent modules: {', '.join(loaded)}"
+            )
+        self.warm = True
+
+    def start(self, script_argv, log_file=None):
+        """
+        Fork a child that runs one generator command and return its pid. The
+        child's output goes to log_file if one is given.
+        """
+        if not self.warm:
+            self.warm_up()
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            self._run_child(script_argv, log_file)
+        return pid
+
+    def generate(self, script_argv, log_file=None):
+        """
+        Run one generator command in a forked child. Returns the child's
+        exit status (0 on success).
+        """
+        pid = self.start(script_argv, log_file)
+        _, status = os.waitpid(pid, 0)
+        return os.waitstatus_to_exitcode(status)
+
+    def generate_many(self, tasks, jobs):
+        """
+        Run (key, script_argv, log_file) tasks with up to 'jobs' children at
+        a time. Yields (key, exit_status) as each child finishes; each child's
+        time and resource usage is recorded as the 'gen' stage of its key.
+        """
+        pending = list(tasks)
+        running = {}
+        while pending or running:
+            while pending and len(running) < jobs:
+                key, script_argv, log_file = pending.pop(0)
+                running[self.start(script_argv, log_file)] = key, time.time()
+            pid, status, usage = os.wait4(-1, 0)
+            if pid in running:
+                key, started = running.pop(pid)
+                record_process("gen", key, started, usage)
+                yield key, os.waitstatus_to_exitcode(status)
+
+    def _run_child(self, script_argv, log_file):
+        """Child side of start(); never returns"""
+        exit_code = 0
+        try:
+            if log_file:
+                log_fd = os.open(log_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+                os.dup2(log_fd, 1)
+                os.dup2(log_fd, 2)
+                os.close(log_fd)
+            script = script_argv[0]
+            # Match the interpreter state of 'python3 <script> <args>'
+            sys.argv = list(script_argv)
+            sys.path = [os.path.dirname(os.path.abspath(script))] + [
+                p for p in sys.path if p != self.host_dir
+            ]
+            runpy.run_path(script, run_name="__main__")
+        except SystemExit as e:
+            if isinstance(e.code, int):
+                exit_code = e.code
+            elif e.code is not None:
+                print(e.code, file=sys.stderr)
+                exit_code = 1
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(exit_code)
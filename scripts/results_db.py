@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# scripts/results_db.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Regression results store: a SQLite database of every seed's stage outcomes.
+
+Test generation starts a run and records its id in the manifest. Each stage
+(gen, compile, spike, sim) then records, per seed, its status ('pass',
+'fail' or 'error'), duration and artifact paths; the simulation also records
+the trace comparison counts and the first mismatch. The database lives
+outside 'logs/' and 'out_*' (results/regress.db, or RESULTS_DB), so it
+survives 'make clean' and keeps the history of earlier runs.
+
+The runners use it to resume an interrupted regression (--resume: only seeds
+without a result, or whose stage was aborted) and to rerun only failed seeds
+(--rerun-failed).
+
+Usage:
+    python3 scripts/results_db.py runs
+    python3 scripts/results_db.py summary [--run <id>]
+    python3 scripts/results_db.py seeds [--run <id>] [--stage sim] [--status fail]
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+
+DEFAULT_RESULTS_DB = os.path.join("results", "regress.db")
+
+STAGES = ("gen", "compile", "spike", "sim")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started TEXT NOT NULL,
+    out_dir TEXT NOT NULL,
+    test_name TEXT NOT NULL,
+    num_seeds INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    seed INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duration REAL,
+    artifacts TEXT,
+    matched INTEGER,
+    mismatches INTEGER,
+    first_mismatch TEXT,
+    finished TEXT NOT NULL,
+    PRIMARY KEY (run_id, seed, stage)
+);
+"""
+
+
+def results_db_path():
+    """Location of the database, overridable with the RESULTS_DB variable"""
+    return os.environ.get("RESULTS_DB", DEFAULT_RESULTS_DB)
+
+
+def connect():
+    """Open the database, creating it on first use"""
+    path = results_db_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Parallel workers record their seeds concurrently; WAL lets readers run
+    # alongside them and the timeout serializes the writers.
+    conn = sqlite3.connect(path, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def start_run(out_dir, test_name, num_seeds):
+    """Register a new regression run and return its id"""
+    conn = connect()
+    with conn:
+        cursor = conn.execute(
+            "INSERT INTO runs (started, out_dir, test_name, num_seeds) "
+            "VALUES (?, ?, ?, ?)",
+            (_now(), out_dir, test_name, num_seeds),
+        )
+    conn.close()
+    return cursor.lastrowid
+
+
+def record_result(run_id, seed, stage, status, duration=None, artifacts=None, **trace):
+    """
+    Record the outcome of one stage for one seed, replacing an earlier one.
+    'trace' takes the comparison fields: matched, mismatches, first_mismatch.
+    """
+    row = dict(trace, seed=seed, status=status, duration=duration)
+    record_results(run_id, stage, [dict(row, artifacts=artifacts)])
+
+
+def record_results(run_id, stage, rows):
+    """Record several seeds' outcomes of a stage in one transaction"""
+    if run_id is None or not rows:
+        return
+    conn = connect()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO results (run_id, seed, stage, status, "
+            "duration, artifacts, matched, mismatches, first_mismatch, finished) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    run_id,
+                    int(row["seed"]),
+                    stage,
+                    row["status"],
+                    row.get("duration"),
+                    json.dumps(row["artifacts"]) if row.get("artifacts") else None,
+                    row.get("matched"),
+                    row.get("mismatches"),
+                    row.get("first_mismatch"),
+                    _now(),
+                )
+                for row in rows
+            ],
+        )
+    conn.close()
+
+
+def stage_statuses(run_id, stage):
+    """Dictionary of seed to status for one stage of a run"""
+    if run_id is None:
+        return {}
+    conn = connect()
+    rows = conn.execute(
+        "SELECT seed, status FROM results WHERE run_id = ? AND stage = ?",
+        (run_id, stage),
+    ).fetchall()
+    conn.close()
+    return dict(rows)
+
+
+def select_seeds(run_id, seeds, stage, resume=False, rerun_failed=False):
+    """
+    The seeds a stage still has to process. With resume, seeds that already
+    passed or failed are skipped, so missing and aborted ('error') seeds are
+    retried; with rerun_failed, only seeds that passed are skipped.
+    """
+    if not (resume or rerun_failed):
+        return list(seeds)
+    statuses = stage_statuses(run_id, stage)
+    if rerun_failed:
+        return [seed for seed in seeds if statuses.get(seed) != "pass"]
+    return [seed for seed in seeds if statuses.get(seed) not in ("pass", "fail")]
+
+
+def latest_run():
+    """Id of the most recent run, or None"""
+    conn = connect()
+    row = conn.execute("SELECT MAX(run_id) FROM runs").fetchone()
+    conn.close()
+    return row[0]
+
+
+def print_runs():
+    """List the recorded runs with their simulation pass/fail counts"""
+    conn = connect()
+    rows = conn.execute(
+        "SELECT r.run_id, r.started, r.test_name, r.num_seeds, "
+        "SUM(s.status = 'pass'), SUM(s.status != 'pass') "
+        "FROM runs r LEFT JOIN results s ON s.run_id = r.run_id AND s.stage = 'sim' "
+        "GROUP BY r.run_id ORDER BY r.run_id"
+    ).fetchall()
+    conn.close()
+    for run_id, started, test_name, num_seeds, passed, failed in rows:
+        print(
+            f"{run_id:5d}  {started}  {test_name:<32} seeds={num_seeds} "
+            f"pass={passed or 0} fail={failed or 0}"
+        )
+
+
+def print_summary(run_id):
+    """Per-stage counts and the failing seeds of a run"""
+    conn = connect()
+    run = conn.execute(
+        "SELECT started, out_dir, test_name, num_seeds FROM runs WHERE run_id = ?",
+        (run_id,),
+    ).fetchone()
+    if run is None:
+        conn.close()
+        print(f"Error: No run {run_id} in {results_db_path()}", file=sys.stderr)
+        sys.exit(1)
+
+    started, out_dir, test_name, num_seeds = run
+    print("=" * 57)
+    print(f"  Run {run_id}: {test_name}, {num_seeds} seed(s), {started}")
+    print(f"  Output: {out_dir}")
+    print("=" * 57)
+    for stage in STAGES:
+        counts = dict(
+            conn.execute(
+                "SELECT status, COUNT(*) FROM results WHERE run_id = ? AND stage = ? "
+                "GROUP BY status",
+                (run_id, stage),
+            ).fetchall()
+        )
+        done = sum(counts.values())
+        detail = ", ".join(
+            f"{status} = {count}" for status, count in sorted(counts.items())
+        )
+        print(f"{stage:<8} {done}/{num_seeds} recorded  {detail}")
+
+    failures = conn.execute(
+        "SELECT seed, stage, status, matched, mismatches, first_mismatch FROM results "
+        "WHERE run_id = ? AND status != 'pass' ORDER BY seed",
+        (run_id,),
+    ).fetchall()
+    conn.close()
+    for seed, stage, status, matched, mismatches, first_mismatch in failures:
+        line = f"SEED {seed}: {stage} {status}"
+        if mismatches is not None:
+            line += f" ({matched} matched, {mismatches} mismatch)"
+        print(line)
+        if first_mismatch:
+            print(f"    {first_mismatch}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the regression results.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("runs", help="List the recorded runs")
+    summary = commands.add_parser("summary", help="Summarize a run")
+    summary.add_argument("--run", type=int, help="Run id (default: latest)")
+    seeds = commands.add_parser("seeds", help="Print the seeds of a run")
+    seeds.add_argument("--run", type=int, help="Run id (default: latest)")
+    seeds.add_argument("--stage", choices=STAGES, default="sim")
+    seeds.add_argument(
+        "--status", help="Only seeds with this status, or 'fail' for any non-pass"
+    )
+    args = parser.parse_args()
+
+    if args.command == "runs":
+        print_runs()
+        return
+
+    run_id = args.run or latest_run()
+    if run_id is None:
+        print(f"Error: No runs recorded in {results_db_path()}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == "summary":
+        print_summary(run_id)
+        return
+
+    statuses = stage_statuses(run_id, args.stage)
+    for seed, status in sorted(statuses.items()):
+        if args.status is None or status == args.status:
+            print(seed)
+        elif args.status == "fail" and status != "pass":
+            print(seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# scripts/rtl_trace.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Reader for the binary RTL commit trace written by tb_top with +trace_bin.
+
+Instead of one formatted text line per cycle, the testbench then writes an
+8-byte header followed by one fixed-width 16-byte record per cycle:
+
+    header:  "RVTR"  version (u32)
+    record:  pc (u32)  instr (u32)  value (u32)  rd (u8)  flags (u8)  pad (u16)
+
+All words are little-endian. 'flags' marks a GPR write (FLAG_REG_WRITE) and
+the ECALL that ends the program (FLAG_ECALL).
+
+The file is memory-mapped and, when NumPy is available, viewed as a
+structured array, so selecting the GPR writes of the test program is a few
+vectorized operations with no per-line parsing. Without NumPy the records
+are unpacked with struct. NumPy is only imported once a binary trace is
+read.
+
+Usage:
+    python3 scripts/rtl_trace.py <trace_file>
+"""
+
+import os
+import sys
+import mmap
+import struct
+from commit_log import TEST_START_PC, gpr_field
+
+TRACE_MAGIC = b"RVTR"
+TRACE_VERSION = 1
+HEADER = struct.Struct("<4sI")
+RECORD = struct.Struct("<IIIBBH")
+
+FLAG_REG_WRITE = 0x1
+FLAG_ECALL = 0x2
+
+# NumPy and the record dtype, imported on the first read of a binary trace
+# so that text-trace runs never pay for the import
+_numpy = None
+
+
+def numpy_record_dtype():
+    """(numpy, record dtype), or (None, None) if NumPy is not installed"""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy as np
+        except ImportError:
+            _numpy = (None, None)
+        else:
+            dtype = np.dtype(
+                [
+                    ("pc", "<u4"),
+                    ("instr", "<u4"),
+                    ("value", "<u4"),
+                    ("rd", "u1"),
+                    ("flags", "u1"),
+                    ("pad", "<u2"),
+                ]
+            )
+            _numpy = (np, dtype)
+    return _numpy
+
+
+def trace_bin_enabled():
+    """Binary RTL traces are written when TRACE_BIN=1"""
+    return os.environ.get("TRACE_BIN", "0") == "1"
+
+
+def is_binary_trace(path):
+    """True if path holds a binary trace rather than a text log"""
+    with open(path, "rb") as f:
+        return f.read(len(TRACE_MAGIC)) == TRACE_MAGIC
+
+
+def map_trace(path):
+    """
+    Memory-map a binary trace. Returns (mmap, record_count); the mmap is
+    None for a trace without records.
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} is not a binary RTL trace")
+        magic, version = HEADER.unpack(header)
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            raise ValueError(f"{path} is not a version {TRACE_VERSION} RTL trace")
+
+        count = (os.fstat(f.fileno()).st_size - HEADER.size) // RECORD.size
+        if not count:
+            return None, 0
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), count
+
+
+def read_records(path):
+    """All records of a binary trace as a NumPy structured array"""
+    np, dtype = numpy_record_dtype()
+    data, count = map_trace(path)
+    if data is None:
+        return np.zeros(0, dtype=dtype)
+    return np.frombuffer(data, dtype=dtype, count=count, offset=HEADER.size)
+
+
+def binary_gpr_writes(path, stop_at_ecall=True):
+    """
+    Yield (pc, binary, rd, value) for every GPR write of the test program in
+    a binary trace, from the first instruction at TEST_START_PC up to the
+    ECALL (or to the end of the trace with stop_at_ecall=False).
+    """
+    np, _ = numpy_record_dtype()
+    if np is None:
+        yield from _struct_gpr_writes(path, stop_at_ecall)
+        return
+
+    records = read_records(path)
+    started = np.flatnonzero(records["pc"] >= TEST_START_PC)
+    if not started.size:
+        return
+    records = records[started[0] :]
+
+    if stop_at_ecall:
+        ecalls = np.flatnonzero(records["flags"] & FLAG_ECALL)
+        if ecalls.size:
+            records = records[: ecalls[0]]
+
+    writes = records[(records["flags"] & FLAG_REG_WRITE != 0) & (records["rd"] != 0)]
+    yield from zip(
+        writes["pc"].tolist(),
+        writes["instr"].tolist(),
+        writes["rd"].tolist(),
+        writes["value"].tolist(),
+    )
+
+
+def _struct_gpr_writes(path, stop_at_ecall):
+    """binary_gpr_writes() without NumPy"""
+    data, count = map_trace(path)
+    if data is None:
+        return
+
+    started = False
+    view = memoryview(data)[HEADER.size : HEADER.size + count * RECORD.size]
+    for pc, instr, value, rd, flags, _ in RECORD.iter_unpack(view):
+        if not started:
+            if pc < TEST_START_PC:
+                continue
+            started = True
+        if stop_at_ecall and flags & FLAG_ECALL:
+            return
+        if flags & FLAG_REG_WRITE and rd:
+            yield pc, instr, rd, value
+
+
+def stream_gpr_writes(chunks, stop_at_ecall=True):
+    """
+    binary_gpr_writes() for a trace that is still being written, such as a
+    pipe from the simulator, given as a stream of byte chunks.
+    """
+    pending = b""
+    header_checked = False
+    started = False
+    for chunk in chunks:
+        pending += chunk
+        if not header_checked:
+            if len(pending) < HEADER.size:
+                continue
+            magic, version = HEADER.unpack_from(pending)
+            if magic != TRACE_MAGIC or version != TRACE_VERSION:
+                raise ValueError(f"not a version {TRACE_VERSION} RTL trace")
+            pending = pending[HEADER.size :]
+            header_checked = True
+
+        complete = len(pending) - len(pending) % RECORD.size
+        for pc, instr, value, rd, flags, _ in RECORD.iter_unpack(pending[:complete]):
+            if not started:
+                if pc < TEST_START_PC:
+                    continue
+                started = True
+            if stop_at_ecall and flags & FLAG_ECALL:
+                return
+            if flags & FLAG_REG_WRITE and rd:
+                yield pc, instr, rd, value
+        pending = pending[complete:]
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python3 scripts/rtl_trace.py <trace_file>", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        for pc, instr, rd, value in binary_gpr_writes(sys.argv[1], False):
+            print(f"0x{pc:08x} (0x{instr:08x}) {gpr_field(rd, value)}")
+    except (OSError, ValueError) as e:
+        print(f"Error reading RTL trace: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
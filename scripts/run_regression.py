@@ -6,72 +6,236 @@
 
 """
 This script runs the riscv-dv test generation for multiple seeds.
-Each seed generates a separate test file to avoid overwriting.
+Each seed is generated into its own directory, so seeds can be generated
+concurrently, and its outputs are then collected under seed-specific names
+and recorded in the regression manifest.
+
+Generated tests are kept in the build cache (build_cache.py), keyed on the
+test name, ISA, seed, testlist (gen_opts), riscv-dv commit and custom
+target settings, so a known seed is restored instead of generated again.
 """
 
 import sys
 import os
 import subprocess
-import glob
 import shutil
-from pathlib import Path
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+import build_cache
+from dvflow import get_project_root
+from manifest import create_manifest, load_manifest, manifest_path, record_artifacts
+from results_db import record_result, select_seeds, start_run
+from pygen_server import (
+    GeneratorServer,
+    GeneratorServerError,
+    capture_generator_command,
+    with_output_dir,
+    with_seed,
+)
+from stage_timer import run_process, stage
+
+# riscv-dv custom target holding riscv_core_setting.py and the testlist
+CUSTOM_TARGET_DIR = "RISC-V/custom_target/rv32i"
+RISCV_DV_DIR = os.path.join("RISC-V", "riscv-dv")
+
+# Bump when the generation flow changes, so cached tests are regenerated
+GEN_CACHE_VERSION = "1"
+
+
+def output_root_directory():
+    """
+    Name of the regression output directory. Follows the riscv-dv default of
+    'out_<date>' so that the layout seen by later steps is unchanged.
+    """
+    return f"out_{date.today()}"
 
 
-def get_project_root():
-    """Get the project root directory using git"""
+def seed_generation_directory(out_dir, seed):
+    """Private riscv-dv output directory used while generating one seed"""
+    return os.path.join(out_dir, "gen", f"seed_{seed}")
+
+
+def riscv_dv_revision():
+    """Commit of the riscv-dv checkout and a hash of its local changes"""
     try:
-        result = subprocess.run(
-            ["git", "rev-parse", "--show-toplevel"],
+        head = subprocess.run(
+            ["git", "-C", RISCV_DV_DIR, "rev-parse", "HEAD"],
             capture_output=True,
             text=True,
             check=True,
-        )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError:
-        print(
-            "Error: Could not determine project root. Are you in a git repository?",
-            file=sys.stderr,
-        )
-        sys.exit(1)
+        ).stdout.strip()
+        diff = subprocess.run(
+            ["git", "-C", RISCV_DV_DIR, "diff", "HEAD"],
+            capture_output=True,
+            check=True,
+        ).stdout
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return ""
+    return f"{head}+{build_cache.hash_inputs(diff)}"
 
 
-def find_output_directory():
-    """Find the output directory (assumes only one 'out_*' directory exists)"""
-    out_dirs = glob.glob("out_*/")
-    if not out_dirs:
-        print("Error: Output directory (out_*) not found.", file=sys.stderr)
-        sys.exit(1)
-    return out_dirs[0]
+def generator_inputs(test_name, target_isa):
+    """Everything besides the seed that determines a generated test"""
+    testlist = os.environ.get("GEN_TESTLIST") or os.path.join(
+        CUSTOM_TARGET_DIR, "testlist.yaml"
+    )
+    parts = [GEN_CACHE_VERSION, test_name, target_isa, riscv_dv_revision()]
+    for path in (testlist, os.path.join(CUSTOM_TARGET_DIR, "riscv_core_setting.py")):
+        parts.append(build_cache.hash_file(path) if os.path.exists(path) else "")
+    return parts
+
+
+def restore_cached_test(key, out_dir, test_name, seed):
+    """
+    Restore a seed's generated test from the build cache. Returns its
+    artifacts, or None on a cache miss.
+    """
+    seed_asm = os.path.join(out_dir, "asm_test", f"{test_name}_{seed}.S")
+    if not build_cache.fetch("asm", key, seed_asm, ".S"):
+        return None
+    artifacts = {"asm": seed_asm}
+    seed_log = os.path.join(out_dir, f"sim_{test_name}_{seed}.log")
+    if build_cache.fetch("gen_log", key, seed_log, ".log"):
+        artifacts["gen_log"] = seed_log
+    return artifacts
 
 
-def rename_generated_files(out_dir, seed, test_name):
-    """Rename generated files to include seed number"""
-    asm_dir = os.path.join(out_dir, "asm_test")
+def store_generated_test(key, artifacts):
+    """Add a seed's collected test to the build cache"""
+    if "asm" in artifacts:
+        build_cache.store("asm", key, artifacts["asm"], ".S")
+    if "gen_log" in artifacts:
+        build_cache.store("gen_log", key, artifacts["gen_log"], ".log")
 
-    # Find the generated assembly file (default name)
-    default_asm = os.path.join(asm_dir, f"{test_name}_0.S")
 
+def collect_generated_files(gen_dir, out_dir, seed, test_name):
+    """
+    Move one seed's generated files from its private generation directory
+    into the shared output directory under seed-specific names. Returns the
+    artifact paths for the manifest.
+    """
+    artifacts = {}
+
+    # riscv-dv always names the first iteration '<test>_0'
+    default_asm = os.path.join(gen_dir, "asm_test", f"{test_name}_0.S")
+    seed_asm = os.path.join(out_dir, "asm_test", f"{test_name}_{seed}.S")
     if os.path.exists(default_asm):
-        # Rename to include seed
-        seed_asm = os.path.join(asm_dir, f"{test_name}_{seed}.S")
         shutil.move(default_asm, seed_asm)
-        print(f"Renamed {default_asm} -> {seed_asm}")
+        artifacts["asm"] = seed_asm
+        print(f"Collected {default_asm} -> {seed_asm}")
     else:
         print(f"Warning: Expected file {default_asm} not found", file=sys.stderr)
 
-    # Also rename the riscv-dv generation log file
-    default_log = os.path.join(out_dir, f"sim_{test_name}_0.log")
-
+    # Also collect the riscv-dv generation log file
+    default_log = os.path.join(gen_dir, f"sim_{test_name}_0.log")
+    seed_log = os.path.join(out_dir, f"sim_{test_name}_{seed}.log")
     if os.path.exists(default_log):
-        seed_log = os.path.join(out_dir, f"sim_{test_name}_{seed}.log")
         shutil.move(default_log, seed_log)
-        print(f"Renamed {default_log} -> {seed_log}")
+        artifacts["gen_log"] = seed_log
+        print(f"Collected {default_log} -> {seed_log}")
     else:
         print(f"Warning: Expected log file {default_log} not found", file=sys.stderr)
 
+    shutil.rmtree(gen_dir, ignore_errors=True)
+    return artifacts
+
+
+def build_generation_command(riscv_dv_run, test_name, target_isa, seed):
+    """
+    Build the riscv-dv run.py command that generates one test for a seed.
+    GEN_TESTLIST replaces the custom target's testlist, e.g. with one whose
+    gen_opts were tuned by cov_scheduler.py.
+    """
+    testlist = os.environ.get("GEN_TESTLIST")
+    return [
+        "python3",
+        riscv_dv_run,
+        "--custom_target",
+        CUSTOM_TARGET_DIR,
+        "--test",
+        test_name,
+        "--target",
+        target_isa,
+        "--isa",
+        target_isa,
+        "--simulator",
+        "pyflow",
+        "--steps",
+        "gen",
+        "--iterations",
+        "1",
+        "--seed",
+        str(seed),
+    ] + (["--testlist", testlist] if testlist else [])
+
+
+def start_generator_server(cmd_args, env, root_dir):
+    """
+    Capture the pygen command from run.py and warm up a generator server.
+    Returns (server, script_argv), or (None, None) if warm mode is unavailable.
+    """
+    try:
+        script_argv = capture_generator_command(cmd_args, env)
+        server = GeneratorServer(
+            os.path.join(root_dir, "RISC-V", "riscv-dv", "pygen"),
+            os.path.join(root_dir, CUSTOM_TARGET_DIR),
+        )
+        server.warm_up()
+    except (GeneratorServerError, ImportError, subprocess.SubprocessError) as e:
+        print(
+            f"Warning: Warm generator unavailable ({e}). Falling back to one "
+            "run.py process per seed.",
+            file=sys.stderr,
+        )
+        return None, None
+
+    print("--- Warm generator ready: pygen loaded once for all seeds ---")
+    return server, script_argv
+
+
+def run_cold_generation(tasks, env, jobs):
+    """
+    Run one run.py process per (seed, cmd_args, log_file) task, up to 'jobs'
+    at a time. Yields (seed, exit_status) as each one finishes.
+    """
+
+    def generate(seed, cmd_args, log_file):
+        if log_file is None:
+            return seed, run_process("gen", seed, cmd_args, env=env)
+        with open(log_file, "w") as log:
+            status = run_process(
+                "gen", seed, cmd_args, env=env, stdout=log, stderr=subprocess.STDOUT
+            )
+        return seed, status
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(generate, *task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
 
-def run_test_generation(seeds):
-    """Run the riscv-dv test generation for the given seeds"""
+
+def resumable_manifest(test_name):
+    """
+    The manifest of an interrupted run of the same test that can be resumed,
+    or None.
+    """
+    if not os.path.exists(manifest_path()):
+        return None
+    manifest = load_manifest()
+    if manifest.get("run_id") is None or manifest["test_name"] != test_name:
+        return None
+    if not os.path.isdir(manifest["out_dir"]):
+        return None
+    return manifest
+
+
+def run_test_generation(seeds, warm=False, jobs=1, resume=False):
+    """
+    Run the riscv-dv test generation for the given seeds. With resume, an
+    interrupted run of the same test is continued and only the seeds without
+    a generation result are generated.
+    """
     root_dir = get_project_root()
     os.chdir(root_dir)
 
@@ -88,73 +252,174 @@ def run_test_generation(seeds):
     else:
         env["PYTHONPATH"] = pygen_src_path
 
-        # Use environment variables for test name and ISA, with defaults
+    # Use environment variables for test name and ISA, with defaults
     test_name = os.environ.get("TEST_NAME", "riscv_arithmetic_basic_test")
     target_isa = os.environ.get("TARGET_ISA", "rv32i")
 
-    # Loop through all the provided seeds
+    # Every seed is generated into its own directory, so seeds never race on
+    # riscv-dv's fixed '<test>_0' output names.
+    manifest = resumable_manifest(test_name) if resume else None
+    if manifest:
+        out_dir = manifest["out_dir"]
+        run_id = manifest["run_id"]
+        all_seeds = seeds
+        seeds = select_seeds(run_id, seeds, "gen", resume=True)
+        print(
+            f"--- Resuming run {run_id}: {len(all_seeds) - len(seeds)} of "
+            f"{len(all_seeds)} seed(s) already generated ---"
+        )
+        if not seeds:
+            return
+    else:
+        out_dir = output_root_directory()
+        os.makedirs(os.path.join(out_dir, "asm_test"), exist_ok=True)
+        run_id = start_run(out_dir, test_name, len(seeds))
+        create_manifest(out_dir, test_name, run_id)
+
+    # Known seeds are restored from the build cache
+    inputs = generator_inputs(test_name, target_isa)
+    keys = {seed: build_cache.hash_inputs(*inputs, str(seed)) for seed in seeds}
+    cached = []
     for seed in seeds:
-        print("=" * 57)
-        print(f"           Running [gen] for SEED = {seed}")
-        print("=" * 57)
-
-        # Build the command arguments
-        cmd_args = [
-            "python3",
-            riscv_dv_run,
-            "--custom_target",
-            "RISC-V/custom_target/rv32i",
-            "--test",
-            test_name,
-            "--target",
-            target_isa,
-            "--isa",
-            target_isa,
-            "--simulator",
-            "pyflow",
-            "--steps",
-            "gen",
-            "--iterations",
-            "1",
-            "--seed",
-            str(seed),
-        ]
+        with stage("gen_cache", seed):
+            artifacts = restore_cached_test(keys[seed], out_dir, test_name, seed)
+        if artifacts:
+            record_artifacts(seed, **artifacts)
+            record_result(
+                run_id, seed, "gen", "pass", duration=0.0, artifacts=artifacts
+            )
+            cached.append(seed)
+    if cached:
+        print(f"--- {len(cached)} test(s) restored from the build cache ---")
+        seeds = [seed for seed in seeds if seed not in cached]
+        if not seeds:
+            return
 
-        try:
-            result = subprocess.run(cmd_args, env=env, check=True)
+    gen_dirs = {seed: seed_generation_directory(out_dir, seed) for seed in seeds}
+    for gen_dir in gen_dirs.values():
+        shutil.rmtree(gen_dir, ignore_errors=True)
 
-            # After successful generation, rename files to include seed
-            out_dir = find_output_directory()
-            rename_generated_files(out_dir, seed, test_name)
+    # Output of concurrent generators is captured per seed and printed whole
+    log_files = {seed: None for seed in seeds}
+    if jobs > 1:
+        log_files = {seed: os.path.join(out_dir, f"gen_{seed}.log") for seed in seeds}
 
-        except subprocess.CalledProcessError as e:
-            print(
-                f"Error running test generation for seed {seed}: {e}", file=sys.stderr
-            )
-            sys.exit(1)
+    server = None
+    script_argv = None
+    if warm:
+        # Forked generators inherit this process's environment
+        os.environ["PYTHONPATH"] = env["PYTHONPATH"]
+        first_seed = seeds[0]
+        server, script_argv = start_generator_server(
+            build_generation_command(riscv_dv_run, test_name, target_isa, first_seed)
+            + ["--output", gen_dirs[first_seed]],
+            env,
+            root_dir,
+        )
 
     print("=" * 57)
-    print("            REGRESSION [gen] FINISHED")
+    print(f"     Running [gen] for {len(seeds)} SEED(S) with {jobs} job(s)")
     print("=" * 57)
 
+    if server:
+        tasks = []
+        for seed in seeds:
+            # run.py creates the output directories itself; forked generators
+            # rely on them already existing.
+            os.makedirs(os.path.join(gen_dirs[seed], "asm_test"), exist_ok=True)
+            seed_argv = with_output_dir(
+                with_seed(script_argv, seed), gen_dirs[first_seed], gen_dirs[seed]
+            )
+            tasks.append((seed, seed_argv, log_files[seed]))
+        results = server.generate_many(tasks, jobs)
+    else:
+        tasks = [
+            (
+                seed,
+                build_generation_command(riscv_dv_run, test_name, target_isa, seed)
+                + ["--output", gen_dirs[seed]],
+                log_files[seed],
+            )
+            for seed in seeds
+        ]
+        results = run_cold_generation(tasks, env, jobs)
+
+    failed_seeds = []
+    for seed, exit_code in results:
+        if log_files[seed]:
+            with open(log_files[seed], "r") as f:
+                sys.stdout.write(f.read())
+            os.remove(log_files[seed])
 
-def main():
-    if len(sys.argv) < 2:
-        print("Error: No seeds provided.", file=sys.stderr)
+        if exit_code != 0:
+            print(
+                f"Error running test generation for seed {seed}: "
+                f"exit status {exit_code}",
+                file=sys.stderr,
+            )
+            failed_seeds.append(seed)
+            record_result(run_id, seed, "gen", "fail")
+            continue
+
+        with stage("collect", seed):
+            artifacts = collect_generated_files(
+                gen_dirs[seed], out_dir, seed, test_name
+            )
+        store_generated_test(keys[seed], artifacts)
+        record_artifacts(seed, **artifacts)
+        record_result(run_id, seed, "gen", "pass", artifacts=artifacts)
+        print(f"--- [gen] complete for SEED = {seed} ---")
+
+    # Failed seeds keep their generation directories for debugging
+    try:
+        os.rmdir(os.path.join(out_dir, "gen"))
+    except OSError:
+        pass
+
+    if failed_seeds:
         print(
-            "Usage: python3 scripts/run_regression.py <seed1> [seed2]...",
+            f"Error: Test generation failed for seeds: "
+            f"{' '.join(str(seed) for seed in failed_seeds)}",
             file=sys.stderr,
         )
         sys.exit(1)
 
-    # Convert seed arguments to integers
-    try:
-        seeds = [int(seed) for seed in sys.argv[1:]]
-    except ValueError:
-        print("Error: All seeds must be integers.", file=sys.stderr)
+    print("=" * 57)
+    print("            REGRESSION [gen] FINISHED")
+    print("=" * 57)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run riscv-dv test generation for one or more seeds."
+    )
+    parser.add_argument("seeds", nargs="+", type=int, help="Seeds to generate")
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="Load the generator once and fork it per seed instead of "
+        "starting run.py for every seed",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of seeds to generate concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run of the same test, generating only "
+        "the seeds that have no result yet",
+    )
+    args = parser.parse_args()
+
+    if args.jobs < 1:
+        print("Error: --jobs must be a positive integer.", file=sys.stderr)
         sys.exit(1)
 
-    run_test_generation(seeds)
+    run_test_generation(args.seeds, warm=args.warm, jobs=args.jobs, resume=args.resume)
 
 
 if __name__ == "__main__":
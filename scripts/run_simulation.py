@@ -6,127 +6,111 @@
 
 """
 This script runs RTL simulation and compares results with Spike reference.
+
+The outcome of a seed only depends on the simulated design, the program,
+its reference log and the vsim options, so it is cached (build_cache.py)
+under a fingerprint of those: the design fingerprint of build_rtl.py (RTL,
+testbench, compile options, Questa version), the ELF (which with MEM_FORMAT
+determines the memory image), the Spike log and the vsim command line. A
+seed whose fingerprint is known is reported from the cache without being
+simulated. Set SIM_CACHE=0 to simulate every seed, e.g. for its RTL trace or
+waveform; coverage runs (COV_ENABLE=1) and TRACE_CSV=1 always simulate.
 """
 
 import sys
 import os
+import signal
 import subprocess
-import glob
-import re
-from pathlib import Path
-
-
-def get_project_root():
-    """Get the project root directory using git"""
-    try:
-        result = subprocess.run(
-            ["git", "rev-parse", "--show-toplevel"],
-            capture_output=True,
-            text=True,
-            check=True,
-        )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError:
-        print(
-            "Error: Could not determine project root. Are you in a git repository?",
-            file=sys.stderr,
-        )
-        sys.exit(1)
-
-
-def find_output_directory():
-    """Find the output directory (assumes only one 'out_*' directory exists)"""
-    out_dirs = glob.glob("out_*/")
-    if not out_dirs:
-        print("Error: Output directory (out_*) not found.", file=sys.stderr)
-        sys.exit(1)
-    return out_dirs[0]
-
-
-def find_elf_file(out_dir, seed):
-    """Find the compiled ELF object for a specific seed in the assembly test directory"""
-    asm_dir = os.path.join(out_dir, "asm_test")
-    test_name = os.environ.get("TEST_NAME", "riscv_arithmetic_basic_test")
-
-    # Look for seed-specific ELF file first
-    seed_elf_file = os.path.join(asm_dir, f"{test_name}_{seed}.o")
-    if os.path.exists(seed_elf_file):
-        return seed_elf_file
-
-    # Fallback to default name (for single seed or legacy)
-    default_elf_file = os.path.join(asm_dir, f"{test_name}_0.o")
-    if os.path.exists(default_elf_file):
-        return default_elf_file
-
-    # If neither exists, show what files are available
-    elf_files = glob.glob(os.path.join(asm_dir, "*.o"))
-    if elf_files:
-        print(f"Error: Expected ELF file for seed {seed} not found.", file=sys.stderr)
-        print(f"Available ELF files: {elf_files}", file=sys.stderr)
-    else:
-        print(
-            f"Error: No .o files found in {asm_dir}. Did 'make compile_asm' run?",
-            file=sys.stderr,
-        )
-    sys.exit(1)
-
-
-def convert_elf_to_mem(elf_file, riscv_prefix):
-    """Convert ELF to Verilog memory format"""
-    bin_file = f"{elf_file}.bin"
-    mem_file = f"{elf_file}.mem"
-
-    print("--- Converting ELF to Verilog memory format ---")
-
-    # First, create a raw binary file
-    objcopy_cmd = [f"{riscv_prefix}-objcopy", "-O", "binary", elf_file, bin_file]
-    try:
-        subprocess.run(objcopy_cmd, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error running objcopy: {e}", file=sys.stderr)
-        sys.exit(1)
-    except FileNotFoundError:
-        print(
-            f"Error: '{riscv_prefix}-objcopy' not found. Is the RISC-V toolchain installed?",
-            file=sys.stderr,
-        )
-        sys.exit(1)
-
-    # Then, convert the binary to a text file with one 32-bit binary word per line
-    bin_conv_cmd = ["python3", "scripts/bin_conv.py", bin_file, mem_file]
-    try:
-        subprocess.run(bin_conv_cmd, check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error running bin_conv.py: {e}", file=sys.stderr)
-        sys.exit(1)
-
-    return mem_file
+import threading
+import time
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import build_cache
+from bin_conv import mem_format
+from build_rtl import built_fingerprint
+from dvflow import get_project_root
+from mem_convert import convert_elf_to_mem
+from manifest import load_manifest, get_artifact, record_artifacts, record_many
+from results_db import record_result, record_results, select_seeds, stage_statuses
+from rtl_trace import stream_gpr_writes, trace_bin_enabled
+from stage_timer import run_process, stage, wait_process
+from trace_compare import (
+    chunk_lines,
+    compare_streams,
+    compare_trace_logs,
+    gpr_writes,
+    print_result,
+    report_disassembly,
+)
+
+# Bump when the cached result format changes, so seeds are simulated again
+SIM_CACHE_VERSION = "1"
 
 
 def convert_spike_log_to_csv(spike_log_file, spike_csv_file):
     """Convert the Spike log to the standard CSV format"""
     print("--- Converting Spike log to CSV ---")
 
-    cmd = [
-        "python3",
-        "RISC-V/riscv-dv/scripts/spike_log_to_trace_csv.py",
-        "--log",
-        spike_log_file,
-        "--csv",
-        spike_csv_file,
-    ]
+    # Only needed for TRACE_CSV=1
+    from spike_log_to_csv import spike_log_to_csv
 
     try:
-        subprocess.run(cmd, check=True)
-    except subprocess.CalledProcessError as e:
+        spike_log_to_csv(spike_log_file, spike_csv_file)
+    except IOError as e:
         print(f"Error converting Spike log to CSV: {e}", file=sys.stderr)
         sys.exit(1)
 
 
-def run_rtl_simulation(mem_file, rtl_log_file):
-    """Run the RTL simulation with QuestaSim"""
-    print("--- Running RTL Simulation ---")
-
+def seed_work_directory(out_dir, seeds):
+    """Create and return the private vsim working directory for a seed group"""
+    name = f"seed_{seeds[0]}" if len(seeds) == 1 else f"batch_{seeds[0]}"
+    work_dir = os.path.join(out_dir, "sim_work", name)
+    # tb_top dumps its waveform to a relative 'logs/' directory
+    os.makedirs(os.path.join(work_dir, "logs"), exist_ok=True)
+    return work_dir
+
+
+def run_rtl_simulation(mem_file, rtl_log_file, seed, work_dir=None):
+    """
+    Run the RTL simulation with QuestaSim.
+
+    When work_dir is given, vsim runs inside that directory so that its
+    transcript, wave database and waveform dump stay private to the seed. The
+    compiled design is still loaded from the shared 'work' library.
+    """
+    if work_dir:
+        mem_file = os.path.abspath(mem_file)
+        rtl_log_file = os.path.abspath(rtl_log_file)
+
+    run_vsim(
+        [f"+ram_init_file={mem_file}", f"+trace_log={rtl_log_file}"],
+        f"sim_{seed}.ucdb",
+        f"seed_{seed}",
+        work_dir,
+        seed=seed,
+    )
+
+
+def run_rtl_batch(batch_file, name, seeds, work_dir=None):
+    """
+    Run several programs in one QuestaSim process using tb_top's batch mode.
+    The batch file lists one '<mem_file> <trace_log> <words>' line per program.
+    """
+    if work_dir:
+        batch_file = os.path.abspath(batch_file)
+
+    run_vsim(
+        [f"+batch_file={batch_file}"],
+        f"sim_{name}.ucdb",
+        name,
+        work_dir,
+        timing_args={"seeds": seeds},
+    )
+
+
+def vsim_command(program_args, ucdb_name, test_name, work_dir=None):
+    """Build the vsim command line that runs smoke_top with the given plusargs"""
     questa_home = os.environ.get("QUESTA_HOME")
     if not questa_home:
         print("Error: QUESTA_HOME environment variable not set", file=sys.stderr)
@@ -145,27 +129,48 @@ def run_rtl_simulation(mem_file, rtl_log_file):
         f"{questa_home}/uvm-1.2/linux_x86_64/uvm_dpi",
         "-cpppath",
         host_cc_path,
-        "smoke_top",
-        f"+ram_init_file={mem_file}",
-        f"+trace_log={rtl_log_file}",
     ]
 
-    # Add coverage options if enabled
-    if cov_enable:
-        import time
+    # Paths must stay valid from inside a private work directory
+    cov_dir = "coverage"
+    if work_dir:
+        vsim_cmd.extend(["-lib", os.path.abspath("work")])
+        cov_dir = os.path.abspath(cov_dir)
 
-        timestamp = int(time.time())
-        ucdb_file = f"coverage/sim_{timestamp}.ucdb"
-        test_name = f"seed_{timestamp}"
-        os.makedirs("coverage", exist_ok=True)
+    vsim_cmd.append("smoke_top")
+    vsim_cmd.extend(program_args)
+    vsim_cmd.append(f"+ram_init_format={mem_format()}")
+    if trace_bin_enabled():
+        vsim_cmd.append("+trace_bin")
+
+    # Add coverage options if enabled. The database is named after the seed
+    # or batch so that concurrent simulations never write to the same file.
+    if cov_enable:
+        ucdb_file = os.path.join(cov_dir, ucdb_name)
+        os.makedirs(cov_dir, exist_ok=True)
         vsim_cmd.extend(["-coverage", "-coverstore", ucdb_file, "-testname", test_name])
         print(f"Coverage enabled - saving to {ucdb_file} with test name {test_name}")
 
     # Add the do command
     vsim_cmd.extend(["-do", "run -all; quit"])
+    return vsim_cmd
+
+
+def run_vsim(
+    program_args, ucdb_name, test_name, work_dir=None, seed=None, timing_args=None
+):
+    """
+    Run smoke_top with the given program plusargs. vsim is recorded as the
+    'vsim' stage of the seed (or of the seeds in timing_args, for a batch).
+    """
+    print("--- Running RTL Simulation ---")
+
+    vsim_cmd = vsim_command(program_args, ucdb_name, test_name, work_dir)
 
     try:
-        subprocess.run(vsim_cmd, check=True)
+        status = run_process("vsim", seed, vsim_cmd, timing_args, cwd=work_dir)
+        if status != 0:
+            raise subprocess.CalledProcessError(status, vsim_cmd)
     except subprocess.CalledProcessError as e:
         print(f"Error running RTL simulation: {e}", file=sys.stderr)
         sys.exit(1)
@@ -177,135 +182,556 @@ def run_rtl_simulation(mem_file, rtl_log_file):
         sys.exit(1)
 
 
+def max_mismatches():
+    """
+    Number of mismatches at which a live-checked simulation is stopped, from
+    SIM_MAX_MISMATCHES. 0 (the default) simulates to the end and compares
+    afterwards.
+    """
+    value = os.environ.get("SIM_MAX_MISMATCHES", "0")
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        print(
+            f"Error: SIM_MAX_MISMATCHES must be a non-negative integer, got '{value}'",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    return limit
+
+
+def release_fifo_reader(proc, fifo):
+    """
+    Wait for vsim to exit, then open the trace FIFO for writing once so that
+    a reader still blocked in open() sees end-of-file, even if vsim never
+    opened the FIFO itself.
+    """
+    try:
+        # Leave the exit status to the main thread, which reaps vsim with
+        # its resource usage
+        os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+    except ChildProcessError:
+        # Already reaped
+        pass
+    try:
+        os.close(os.open(fifo, os.O_WRONLY | os.O_NONBLOCK))
+    except OSError:
+        # No reader left, or the FIFO is already gone
+        pass
+
+
+def stop_vsim(proc):
+    """
+    Send vsim SIGTERM without reaping it (Popen.terminate() may), so that
+    wait_process() still gets its resource usage.
+    """
+    try:
+        os.kill(proc.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+
+
+def run_rtl_live(
+    mem_file, rtl_log_file, spike_log_file, elf_file, seed, limit, work_dir=None
+):
+    """
+    Run the RTL simulation with its trace written to a FIFO and compare it
+    against the Spike log while vsim runs. The trace is still saved to
+    rtl_log_file. vsim is terminated once 'limit' mismatches were found, so
+    a diverging seed stops early. Returns the comparison result, like
+    compare_traces().
+    """
+    print("--- Running RTL Simulation with live trace check ---")
+
+    fifo = f"{rtl_log_file}.fifo"
+    if os.path.exists(fifo):
+        os.remove(fifo)
+    os.mkfifo(fifo)
+
+    program_args = [
+        f"+ram_init_file={os.path.abspath(mem_file)}",
+        f"+trace_log={os.path.abspath(fifo)}",
+        "+trace_flush",
+    ]
+    vsim_cmd = vsim_command(program_args, f"sim_{seed}.ucdb", f"seed_{seed}", work_dir)
+
+    try:
+        started = time.time()
+        proc = subprocess.Popen(vsim_cmd, cwd=work_dir)
+    except FileNotFoundError:
+        os.remove(fifo)
+        print(
+            "Error: 'vsim' not found. Is QuestaSim installed and in PATH?",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    watcher = threading.Thread(target=release_fifo_reader, args=(proc, fifo))
+    watcher.start()
+
+    stopped = False
+    finished = False
+    try:
+        # vsim is recorded as its own stage once reaped; this one is the
+        # comparison that runs alongside it
+        with stage("compare", seed):
+            with open(fifo, "rb", buffering=0) as live, open(
+                rtl_log_file, "wb"
+            ) as saved:
+
+                def chunks():
+                    # Save the trace as it streams by
+                    for chunk in iter(lambda: live.read(1 << 16), b""):
+                        saved.write(chunk)
+                        yield chunk
+
+                stream = chunks()
+                if trace_bin_enabled():
+                    rtl_writes = stream_gpr_writes(stream)
+                else:
+                    rtl_writes = gpr_writes(chunk_lines(stream))
+
+                with open(spike_log_file, "r", errors="replace") as spike_log:
+                    matched, mismatches, first_mismatch = compare_streams(
+                        gpr_writes(spike_log),
+                        rtl_writes,
+                        disassembly=report_disassembly(elf_file),
+                        max_mismatches=limit,
+                    )
+
+                if mismatches >= limit:
+                    print(f"Stopping RTL simulation of SEED {seed} early")
+                    stopped = True
+                    stop_vsim(proc)
+
+                # Keep reading until vsim closes the trace, so it never blocks
+                # on a full pipe, and save the rest of the trace
+                for _ in stream:
+                    pass
+        finished = True
+    finally:
+        # Do not leave vsim running until its timeout after an error
+        if not finished:
+            stop_vsim(proc)
+        wait_process(proc, "vsim", seed, started)
+        watcher.join()
+        os.remove(fifo)
+
+    if proc.returncode != 0 and not stopped:
+        print(
+            f"Error running RTL simulation: vsim exited with status {proc.returncode}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    print_result(matched, mismatches)
+    return matched, mismatches, first_mismatch
+
+
 def convert_rtl_log_to_csv(rtl_log_file, rtl_csv_file, elf_file):
     """Convert the RTL log to the standard CSV format"""
     print("--- Converting RTL log to CSV ---")
 
-    cmd = [
-        "python3",
-        "scripts/rtl_log_to_csv.py",
-        "--log",
-        rtl_log_file,
-        "--csv",
-        rtl_csv_file,
-        "--elf",
-        elf_file,
-    ]
+    # Only needed for TRACE_CSV=1
+    from rtl_log_to_csv import rtl_log_to_csv
 
     try:
-        subprocess.run(cmd, check=True)
-    except subprocess.CalledProcessError as e:
+        rtl_log_to_csv(rtl_log_file, rtl_csv_file, elf_file)
+    except (IOError, ValueError) as e:
         print(f"Error converting RTL log to CSV: {e}", file=sys.stderr)
         sys.exit(1)
 
 
-def compare_trace_csvs(spike_csv_file, rtl_csv_file):
-    """Compare the trace CSVs and return (exit_code, is_failed)"""
-    print("--- Comparing RTL CSV with Spike CSV ---")
+def trace_csv_enabled():
+    """Intermediate trace CSVs are only written when TRACE_CSV=1"""
+    return os.environ.get("TRACE_CSV", "0") == "1"
 
-    cmd = [
-        "python3",
-        "RISC-V/riscv-dv/scripts/instr_trace_compare.py",
-        "--csv_file_1",
-        spike_csv_file,
-        "--csv_file_2",
-        rtl_csv_file,
-    ]
+
+def compare_traces(spike_log_file, rtl_log_file, elf_file):
+    """
+    Compare the Spike log with the RTL trace. Returns (matched, mismatches,
+    first_mismatch).
+    """
+    print("--- Comparing RTL trace with Spike log ---")
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-        output = result.stdout + result.stderr
-        print(output)
+        return compare_trace_logs(spike_log_file, rtl_log_file, elf_file)
+    except (IOError, ValueError) as e:
+        print(f"Error comparing traces: {e}", file=sys.stderr)
+        sys.exit(1)
 
-        # Check both exit code and output for failure
-        is_failed = result.returncode != 0 or "[FAILED]" in output
-        return result.returncode, is_failed
 
-    except FileNotFoundError:
-        print("Error: instr_trace_compare.py not found", file=sys.stderr)
-        sys.exit(1)
+def seed_paths(seed, manifest):
+    """Return the (elf, spike_log, rtl_log) paths of a seed"""
+    # Look up the compiled ELF file and the golden Spike log
+    elf_file = get_artifact(manifest, seed, "elf")
+    spike_log_file = get_artifact(manifest, seed, "spike_log")
+    # Binary traces (TRACE_BIN=1) are written as fixed-width records
+    suffix = "bin" if trace_bin_enabled() else "log"
+    rtl_log_file = os.path.join(manifest["out_dir"], f"rtl_trace_{seed}.{suffix}")
+    return elf_file, spike_log_file, rtl_log_file
+
+
+def sim_cache_enabled():
+    """
+    Simulation results are reused unless SIM_CACHE=0. Runs that need the
+    simulation's own outputs (coverage, trace CSVs) are never served.
+    """
+    return (
+        os.environ.get("SIM_CACHE", "1") != "0"
+        and os.environ.get("COV_ENABLE", "0") != "1"
+        and not trace_csv_enabled()
+    )
+
+
+def sim_cache_key(seed, manifest):
+    """Fingerprint of everything a seed's outcome depends on, or None"""
+    design = built_fingerprint("smoke")
+    if design is None:
+        return None
+    elf_file, spike_log_file, _ = seed_paths(seed, manifest)
+    return build_cache.hash_inputs(
+        SIM_CACHE_VERSION,
+        design,
+        build_cache.hash_file(elf_file),
+        build_cache.hash_file(spike_log_file),
+        " ".join(vsim_command([], "", "")),
+        str(max_mismatches()),
+    )
+
+
+def store_sim_result(seed, manifest, comparison):
+    """Cache the outcome of a simulated seed"""
+    if not sim_cache_enabled():
+        return
+    key = sim_cache_key(seed, manifest)
+    if key is None:
+        return
+    matched, mismatches, first_mismatch = comparison
+    result = {
+        "matched": matched,
+        "mismatches": mismatches,
+        "first_mismatch": first_mismatch,
+    }
+    build_cache.save("sim", key, json.dumps(result).encode(), ".json")
+
+
+def serve_cached_result(seed, manifest):
+    """
+    Report a seed from the simulation cache. Returns "pass" or "fail", or
+    None if its outcome is not cached.
+    """
+    key = sim_cache_key(seed, manifest)
+    cached = build_cache.load("sim", key, ".json") if key else None
+    if cached is None:
+        return None
+    result = json.loads(cached)
+    status = "fail" if result["mismatches"] or not result["matched"] else "pass"
+    record_result(
+        manifest.get("run_id"),
+        seed,
+        "sim",
+        status,
+        duration=0.0,
+        artifacts=manifest["seeds"][str(seed)],
+        **result,
+    )
+    print(f"SEED {seed}: {status.upper()} - served from the simulation cache")
+    return status
+
+
+def check_seed(seed, manifest, sim_time, comparison=None):
+    """
+    Compare a simulated seed against Spike, report PASS/FAIL and record the
+    outcome in the results database. A result from a live check
+    (comparison) is reported as is. sim_time is the seed's share of the
+    simulation time, to which the comparison time is added.
+    """
+    started = time.time()
+    out_dir = manifest["out_dir"]
+    elf_file, spike_log_file, rtl_log_file = seed_paths(seed, manifest)
+
+    # Keep the trace CSVs for debugging if requested
+    if trace_csv_enabled():
+        spike_csv_file = os.path.join(out_dir, f"spike_trace_{seed}.csv")
+        rtl_csv_file = os.path.join(out_dir, f"rtl_trace_{seed}.csv")
+        with stage("trace_csv", seed):
+            convert_spike_log_to_csv(spike_log_file, spike_csv_file)
+            convert_rtl_log_to_csv(rtl_log_file, rtl_csv_file, elf_file)
+
+    # Compare the traces
+    if comparison is None:
+        with stage("compare", seed):
+            comparison = compare_traces(spike_log_file, rtl_log_file, elf_file)
+    matched, mismatches, first_mismatch = comparison
+    is_failed = mismatches > 0 or matched == 0
+    store_sim_result(seed, manifest, comparison)
+
+    record_result(
+        manifest.get("run_id"),
+        seed,
+        "sim",
+        "fail" if is_failed else "pass",
+        duration=sim_time + time.time() - started,
+        artifacts=manifest["seeds"][str(seed)],
+        matched=matched,
+        mismatches=mismatches,
+        first_mismatch=first_mismatch,
+    )
 
+    if is_failed:
+        print(f"SEED {seed}: FAIL - trace mismatch detected.")
+        return False
+    else:
+        print(f"SEED {seed}: PASS - traces are identical")
+        return True
 
-def process_seed(seed, out_dir, riscv_prefix):
+
+def process_seed(seed, manifest, work_dir=None):
     """Process a single seed through the simulation pipeline"""
     print("=" * 57)
     print(f"           Running RTL Simulation for SEED = {seed}")
     print("=" * 57)
 
-    test_name = os.environ.get("TEST_NAME", "riscv_arithmetic_basic_test")
+    started = time.time()
+    elf_file, spike_log_file, rtl_log_file = seed_paths(seed, manifest)
 
-    # Find the compiled ELF file
-    elf_file = find_elf_file(out_dir, seed)
+    # Convert ELF to memory file
+    with stage("mem_convert", seed):
+        mem_file = convert_elf_to_mem(elf_file)
+    record_artifacts(seed, mem=mem_file, rtl_log=rtl_log_file)
+    manifest["seeds"][str(seed)].update(mem=mem_file, rtl_log=rtl_log_file)
+
+    # Run RTL simulation, checking the trace while it runs if requested
+    limit = max_mismatches()
+    if limit:
+        comparison = run_rtl_live(
+            mem_file, rtl_log_file, spike_log_file, elf_file, seed, limit, work_dir
+        )
+        return check_seed(seed, manifest, time.time() - started, comparison)
 
-    # Define file paths
-    rtl_log_file = os.path.join(out_dir, f"rtl_trace_{seed}.log")
-    spike_log_file = os.path.join(out_dir, "spike_sim", f"{test_name}_{seed}.log")
-    spike_csv_file = os.path.join(out_dir, f"spike_trace_{seed}.csv")
-    rtl_csv_file = os.path.join(out_dir, f"rtl_trace_{seed}.csv")
+    run_rtl_simulation(mem_file, rtl_log_file, seed, work_dir)
+    return check_seed(seed, manifest, time.time() - started)
 
-    # Convert ELF to memory file
-    mem_file = convert_elf_to_mem(elf_file, riscv_prefix)
 
-    # Convert Spike log to CSV
-    convert_spike_log_to_csv(spike_log_file, spike_csv_file)
+def process_batch(seeds, manifest, work_dir=None):
+    """
+    Simulate several seeds in one vsim process and compare each of them.
+    Returns the list of failing seeds.
+    """
+    print("=" * 57)
+    print(f"  Running RTL Simulation for SEEDS = {' '.join(map(str, seeds))}")
+    print("=" * 57)
 
-    # Run RTL simulation
-    run_rtl_simulation(mem_file, rtl_log_file)
+    started = time.time()
+    batch_dir = os.path.join(manifest["out_dir"], "sim_batches")
+    os.makedirs(batch_dir, exist_ok=True)
+    batch_file = os.path.join(batch_dir, f"batch_{seeds[0]}.txt")
+
+    artifacts = {}
+    with open(batch_file, "w") as f:
+        for seed in seeds:
+            elf_file, _, rtl_log_file = seed_paths(seed, manifest)
+            with stage("mem_convert", seed):
+                mem_file = convert_elf_to_mem(elf_file)
+            artifacts[seed] = {"mem": mem_file, "rtl_log": rtl_log_file}
+
+            # The testbench clears only the words the previous program used
+            with open(mem_file, "rb") as mem:
+                num_words = mem.read().count(b"\n")
+            if work_dir:
+                mem_file = os.path.abspath(mem_file)
+                rtl_log_file = os.path.abspath(rtl_log_file)
+            f.write(f"{mem_file} {rtl_log_file} {num_words}\n")
+    record_many(artifacts)
+    for seed in seeds:
+        manifest["seeds"][str(seed)].update(artifacts[seed])
 
-    # Convert RTL log to CSV
-    convert_rtl_log_to_csv(rtl_log_file, rtl_csv_file, elf_file)
+    run_rtl_batch(batch_file, f"batch_{seeds[0]}", seeds, work_dir)
 
-    # Compare the CSVs
-    exit_code, is_failed = compare_trace_csvs(spike_csv_file, rtl_csv_file)
+    # Every seed of the batch is charged an equal share of the simulation
+    sim_time = (time.time() - started) / len(seeds)
+    return [seed for seed in seeds if not check_seed(seed, manifest, sim_time)]
 
-    if is_failed:
-        print(f"SEED {seed}: FAIL - CSV mismatch detected.")
-        return False
-    else:
-        print(f"SEED {seed}: PASS - CSVs are identical")
-        return True
+
+def process_group(seeds, manifest, work_dir=None):
+    """Simulate a group of seeds and return the failing ones"""
+    if len(seeds) == 1:
+        return [] if process_seed(seeds[0], manifest, work_dir) else list(seeds)
+    return process_batch(seeds, manifest, work_dir)
+
+
+def process_group_isolated(seeds, manifest):
+    """
+    Worker entry point for parallel runs. Processes a group of seeds in its
+    own work directory with all of its output (including subprocess output)
+    redirected to a per-group log, so that concurrent groups do not
+    interleave on the console. Returns (seeds, failed_seeds, log_file).
+    """
+    work_dir = seed_work_directory(manifest["out_dir"], seeds)
+    log_file = os.path.join(work_dir, "run.log")
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_stdout = os.dup(1)
+    saved_stderr = os.dup(2)
+    failed_seeds = list(seeds)
+    try:
+        with open(log_file, "w") as log:
+            os.dup2(log.fileno(), 1)
+            os.dup2(log.fileno(), 2)
+            try:
+                failed_seeds = process_group(seeds, manifest, work_dir)
+            except SystemExit:
+                # Pipeline helpers exit on fatal errors; count it as a failure
+                # instead of tearing down the worker pool.
+                for seed in seeds:
+                    print(f"SEED {seed}: FAIL - simulation pipeline aborted.")
+                record_results(
+                    manifest.get("run_id"),
+                    "sim",
+                    [{"seed": seed, "status": "error"} for seed in seeds],
+                )
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+    finally:
+        os.dup2(saved_stdout, 1)
+        os.dup2(saved_stderr, 2)
+        os.close(saved_stdout)
+        os.close(saved_stderr)
+
+    return seeds, failed_seeds, log_file
+
+
+def run_groups_parallel(groups, manifest, jobs):
+    """Run seed groups concurrently and return the list of failing seeds"""
+    failed_seeds = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(process_group_isolated, group, manifest) for group in groups
+        ]
+        for future in as_completed(futures):
+            _, failed, log_file = future.result()
+            # Replay the group's log in one piece now that it is complete
+            with open(log_file, "r") as f:
+                sys.stdout.write(f.read())
+            sys.stdout.flush()
+            failed_seeds.extend(failed)
+    return failed_seeds
 
 
 def main():
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(
+        description="Run RTL simulation and compare against the Spike reference."
+    )
+    parser.add_argument("seeds", nargs="+", type=int, help="Seeds to simulate")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of vsim processes to run concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Number of seeds simulated by each vsim process (default: 1)",
+    )
+    rerun = parser.add_mutually_exclusive_group()
+    rerun.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip seeds that already have a simulation result in this run",
+    )
+    rerun.add_argument(
+        "--rerun-failed",
+        action="store_true",
+        help="Only simulate seeds that failed or have no result in this run",
+    )
+    args = parser.parse_args()
+
+    if args.jobs < 1 or args.batch_size < 1:
         print(
-            "Usage: python3 scripts/run_simulation.py <seed1> [seed2] [seed3] ...",
+            "Error: --jobs and --batch-size must be positive integers.",
             file=sys.stderr,
         )
         sys.exit(1)
 
-    # Convert seed arguments to integers
-    try:
-        seeds = [int(seed) for seed in sys.argv[1:]]
-    except ValueError:
-        print("Error: All seeds must be integers.", file=sys.stderr)
-        sys.exit(1)
+    seeds = args.seeds
 
     # Get project root and change to it
     root_dir = get_project_root()
     os.chdir(root_dir)
 
-    # Get RISC-V toolchain prefix
-    riscv_prefix = os.environ.get("RISCV_PREFIX", "riscv64-unknown-elf")
+    # Look up the output directory and per-seed artifacts
+    manifest = load_manifest()
 
-    # Find the output directory
-    out_dir = find_output_directory()
+    if args.batch_size > 1 and max_mismatches():
+        print(
+            "Warning: SIM_MAX_MISMATCHES only applies to unbatched runs; "
+            "batches are compared after simulation.",
+            file=sys.stderr,
+        )
 
-    # Process each seed
-    pass_count = 0
-    fail_count = 0
+    # Earlier results of this run decide which seeds are simulated again
+    run_id = manifest.get("run_id")
+    to_run = select_seeds(run_id, seeds, "sim", args.resume, args.rerun_failed)
+    statuses = stage_statuses(run_id, "sim")
+    skipped_failures = [
+        seed for seed in seeds if seed not in to_run and statuses[seed] != "pass"
+    ]
+    if len(to_run) != len(seeds):
+        print(
+            f"--- Simulating {len(to_run)} of {len(seeds)} seed(s); "
+            "the others keep their recorded results ---"
+        )
 
-    for seed in seeds:
-        if process_seed(seed, out_dir, riscv_prefix):
-            pass_count += 1
-        else:
-            fail_count += 1
+    # Seeds whose inputs are unchanged since they were last simulated
+    served = {}
+    if sim_cache_enabled():
+        for seed in to_run:
+            status = serve_cached_result(seed, manifest)
+            if status is not None:
+                served[seed] = status
+        to_run = [seed for seed in to_run if seed not in served]
+        if served:
+            print(
+                f"--- {len(served)} seed(s) served from the simulation cache, "
+                f"simulating {len(to_run)} ---"
+            )
+
+    # Split the seeds into groups that share one vsim process
+    groups = [
+        to_run[i : i + args.batch_size] for i in range(0, len(to_run), args.batch_size)
+    ]
+
+    # Process each group
+    if args.jobs > 1 and len(groups) > 1:
+        failed_seeds = run_groups_parallel(groups, manifest, args.jobs)
+    else:
+        failed_seeds = []
+        for group in groups:
+            failed_seeds.extend(process_group(group, manifest))
+
+    failed_seeds += skipped_failures
+    failed_seeds += [seed for seed, status in served.items() if status == "fail"]
+    fail_count = len(failed_seeds)
+    pass_count = len(seeds) - fail_count
 
     # Print summary
     print("=" * 57)
     print("                 REGRESSION SUMMARY")
     print("=" * 57)
     print(f"REPORT: pass = {pass_count}, fail = {fail_count}")
+    if failed_seeds:
+        print(f"FAILED SEEDS: {' '.join(str(seed) for seed in sorted(failed_seeds))}")
+    if served:
+        print(f"SERVED FROM CACHE: {' '.join(str(seed) for seed in sorted(served))}")
     print("=" * 57)
 
     if fail_count != 0:
@@ -8,70 +8,119 @@
 This script runs the Spike instruction set simulator on pre-compiled
 ELF files for multiple seeds. This ensures that Spike and the RTL simulation
 execute the exact same binaries.
+
+Seeds are simulated in parallel. Each Spike's log is streamed through a
+filter (see commit_log.py) that keeps only the commit lines of the test
+program, from 0x80000000 up to the final ECALL. Set SPIKE_LOG_FILTER=0 or
+pass --full-log to keep Spike's complete log instead.
+
+GOLDEN_MODEL (or --model) selects the reference model:
+
+    spike   Spike, as above (default)
+    iss     the built-in RV32I model (rv32i_iss.py), run in the worker
+            processes; programs that trap or hang fail here, before any RTL
+            simulation is spent on them
+    check   Spike, cross-checked against the built-in model: a seed fails if
+            their GPR writes differ
+
+Next to every log, the expected commits are also written pre-parsed to
+<log>.golden (spike_log_to_golden.py), which the UVM commit scoreboard reads
+instead of the log.
+
+Reference logs are kept in the build cache (build_cache.py), keyed on the
+ELF, the model and its version, the ISA and the log filter setting, so the
+log of an unchanged program is restored instead of simulated again.
 """
 
+import io
 import sys
 import os
+import argparse
 import subprocess
-import glob
-from pathlib import Path
+import time
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import build_cache
+from commit_log import CommitLogFilter
+from elf_reader import ElfError
+from manifest import load_manifest, get_artifact, record_many
+from results_db import record_results, select_seeds
+from rv32i_iss import IssError, run_elf
+from spike_log_to_golden import golden_path, spike_log_to_golden
+from stage_timer import run_process, stage, wait_process
+from trace_compare import compare_streams, log_gpr_writes
 
+GOLDEN_MODELS = ("spike", "iss", "check")
 
-def find_output_directory():
-    """Find the output directory (assumes only one 'out_*' directory exists)"""
-    out_dirs = glob.glob("out_*/")
-    if not out_dirs:
-        print(
-            "Error: Output directory (out_*) not found. Did 'make gen' run successfully?",
-            file=sys.stderr,
-        )
-        sys.exit(1)
-    return out_dirs[0]
+# Bump when the log format changes, so cached logs are simulated again
+GOLDEN_CACHE_VERSION = "1"
 
 
-def find_elf_file(out_dir, seed):
-    """Find the compiled ELF object for a specific seed in the assembly test directory"""
-    asm_dir = os.path.join(out_dir, "asm_test")
-    test_name = os.environ.get("TEST_NAME", "riscv_arithmetic_basic_test")
+def log_filter_enabled():
+    """Spike logs are filtered to commit lines unless SPIKE_LOG_FILTER=0"""
+    return os.environ.get("SPIKE_LOG_FILTER", "1") != "0"
 
-    # Look for seed-specific ELF file first
-    seed_elf_file = os.path.join(asm_dir, f"{test_name}_{seed}.o")
-    if os.path.exists(seed_elf_file):
-        return seed_elf_file
-
-    # Fallback to default name (for single seed or legacy)
-    default_elf_file = os.path.join(asm_dir, f"{test_name}_0.o")
-    if os.path.exists(default_elf_file):
-        return default_elf_file
-
-    # If neither exists, show what files are available
-    elf_files = glob.glob(os.path.join(asm_dir, "*.o"))
-    if elf_files:
-        print(f"Error: Expected ELF file for seed {seed} not found.", file=sys.stderr)
-        print(f"Available ELF files: {elf_files}", file=sys.stderr)
-    else:
-        print(
-            f"Error: No .o files found in {asm_dir}. Did 'make compile_asm' run?",
-            file=sys.stderr,
-        )
-    sys.exit(1)
+
+def golden_model():
+    """Reference model selected by GOLDEN_MODEL (default: spike)"""
+    return os.environ.get("GOLDEN_MODEL", "spike")
 
 
-def run_spike_for_seed(seed, out_dir, elf_file):
-    """Run Spike simulation for a single seed"""
-    # Create the Spike log directory
+def spike_log_path(out_dir, seed):
+    """Path of a seed's reference log, created by either model"""
     spike_log_dir = os.path.join(out_dir, "spike_sim")
     os.makedirs(spike_log_dir, exist_ok=True)
+    test_name = os.environ.get("TEST_NAME", "riscv_arithmetic_basic_test")
+    return os.path.join(spike_log_dir, f"{test_name}_{seed}.log")
 
+
+def spike_identity():
+    """First line of Spike's usage text, which names its version"""
+    spike_cmd = os.environ.get("SPIKE_CMD", "spike")
+    try:
+        result = subprocess.run([spike_cmd, "--help"], capture_output=True, text=True)
+    except FileNotFoundError:
+        return ""
+    output = (result.stdout + result.stderr).strip()
+    return output.splitlines()[0] if output else ""
+
+
+def model_identity(model):
+    """Version of the reference model(s), for the cache key"""
+    identity = []
+    if model != "iss":
+        identity.append(spike_identity())
+    if model != "spike":
+        iss_source = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "rv32i_iss.py"
+        )
+        identity.append(build_cache.hash_file(iss_source))
+    return identity
+
+
+def golden_key(elf_file, model, identity, filter_log):
+    """Cache key of the reference log of an ELF"""
+    return build_cache.hash_inputs(
+        GOLDEN_CACHE_VERSION,
+        build_cache.hash_file(elf_file),
+        model,
+        *identity,
+        os.environ.get("TARGET_ISA", "rv32i"),
+        str(filter_log),
+    )
+
+
+def run_spike_for_seed(seed, out_dir, elf_file, filter_log=True):
+    """
+    Run Spike simulation for a single seed. Runs in a worker process and
+    returns (seed, spike_log_file, message); spike_log_file is None on failure.
+    """
     # Use environment variables if set, otherwise use defaults
-    test_name = os.environ.get("TEST_NAME", "riscv_arithmetic_basic_test")
     target_isa = os.environ.get("TARGET_ISA", "rv32i")
     spike_cmd = os.environ.get("SPIKE_CMD", "spike")
 
     # Create seed-specific log file name
-    spike_log_file = os.path.join(spike_log_dir, f"{test_name}_{seed}.log")
-
-    print(f"--- Running Spike for SEED {seed} on {elf_file} ---")
+    spike_log_file = spike_log_path(out_dir, seed)
 
     # Build the Spike command
     spike_args = [
@@ -84,57 +133,236 @@ def run_spike_for_seed(seed, out_dir, elf_file):
     ]
 
     try:
-        # Run Spike and capture both stdout and stderr
         with open(spike_log_file, "w") as log_file:
-            result = subprocess.run(
-                spike_args, stdout=log_file, stderr=subprocess.STDOUT, check=True
+            if not filter_log:
+                # Keep the complete interleaved instruction log
+                return_code = run_process(
+                    "spike", seed, spike_args, stdout=log_file, stderr=subprocess.STDOUT
+                )
+                if return_code != 0:
+                    raise subprocess.CalledProcessError(return_code, spike_args)
+                return seed, spike_log_file, f"Log at {spike_log_file}"
+
+            # Spike writes its log to stderr. Stream it through the filter
+            # so that only the test's commit lines ever reach the disk.
+            started = time.time()
+            process = subprocess.Popen(
+                spike_args,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                errors="replace",
+                bufsize=1 << 16,
             )
+            log_filter = CommitLogFilter()
+            try:
+                log_file.writelines(log_filter.filter(process.stdout))
+                # Let Spike run to completion past the end of the test
+                while process.stdout.read(1 << 16):
+                    pass
+            finally:
+                process.stdout.close()
+                return_code = wait_process(process, "spike", seed, started)
 
-        print(
-            f"--- Spike simulation complete for SEED {seed}. Log at {spike_log_file} ---"
-        )
+        if return_code != 0:
+            raise subprocess.CalledProcessError(return_code, spike_args)
+        if not log_filter.finished:
+            return (
+                seed,
+                None,
+                f"Error: Spike log for seed {seed} has no ECALL ending the test",
+            )
 
-        return True
+        return (
+            seed,
+            spike_log_file,
+            f"Log at {spike_log_file} ({log_filter.lines_out} commit lines kept)",
+        )
 
     except subprocess.CalledProcessError as e:
-        print(f"Error running Spike for seed {seed}: {e}", file=sys.stderr)
-        return False
+        return seed, None, f"Error running Spike for seed {seed}: {e}"
     except FileNotFoundError:
-        print(
+        return (
+            seed,
+            None,
             f"Error: '{spike_cmd}' command not found. Is Spike installed and in PATH?",
-            file=sys.stderr,
         )
-        return False
 
 
-def main():
-    if len(sys.argv) < 2:
-        print(
-            "Usage: python3 scripts/run_spike.py <seed1> [seed2] [seed3] ...",
-            file=sys.stderr,
+def run_iss_for_seed(seed, out_dir, elf_file, filter_log=True, log_file=None):
+    """
+    Run the built-in RV32I model instead of Spike, writing the same log.
+    Returns (seed, log_file, message) like run_spike_for_seed().
+    """
+    log_file = log_file or spike_log_path(out_dir, seed)
+    try:
+        count = run_elf(elf_file, log_file, full_log=not filter_log)
+    except (OSError, ElfError, IssError) as e:
+        return seed, None, f"Error: SEED {seed} screened out by the RV32I model: {e}"
+    return seed, log_file, f"Log at {log_file} ({count} instructions, RV32I model)"
+
+
+def cross_check(seed, out_dir, elf_file, spike_log_file):
+    """
+    Run the built-in model on a seed that Spike has run and compare their
+    GPR writes. Returns None if they agree, or an error message.
+    """
+    iss_log_dir = os.path.join(os.path.dirname(spike_log_file), "iss")
+    os.makedirs(iss_log_dir, exist_ok=True)
+    iss_log_file = os.path.join(iss_log_dir, os.path.basename(spike_log_file))
+    _, log_file, message = run_iss_for_seed(
+        seed, out_dir, elf_file, log_file=iss_log_file
+    )
+    if log_file is None:
+        return message
+
+    report = io.StringIO()
+    with redirect_stdout(report):
+        matched, mismatches, _ = compare_streams(
+            log_gpr_writes(spike_log_file), log_gpr_writes(log_file), "spike", "iss"
         )
-        sys.exit(1)
+    if mismatches:
+        return (
+            f"Error: RV32I model disagrees with Spike on SEED {seed} "
+            f"({matched} matched, {mismatches} mismatch):\n{report.getvalue()}"
+        )
+    return None
 
-    # Convert seed arguments to integers
-    try:
-        seeds = [int(seed) for seed in sys.argv[1:]]
-    except ValueError:
-        print("Error: All seeds must be integers.", file=sys.stderr)
-        sys.exit(1)
 
-    # Find the output directory
-    out_dir = find_output_directory()
+def run_golden_for_seed(seed, out_dir, elf_file, filter_log, model):
+    """
+    Run the selected reference model for a seed. Spike is recorded as its
+    own stage by run_spike_for_seed(), the in-process model as 'iss'.
+    """
+    if model == "iss":
+        with stage("iss", seed):
+            return run_iss_for_seed(seed, out_dir, elf_file, filter_log)
+
+    result = run_spike_for_seed(seed, out_dir, elf_file, filter_log)
+    if model == "check" and result[1] is not None:
+        with stage("iss", seed):
+            error = cross_check(seed, out_dir, elf_file, result[1])
+        if error:
+            return seed, None, error
+        return result[:2] + (result[2] + ", RV32I model agrees",)
+    return result
+
+
+def run_golden_timed(seed, out_dir, elf_file, filter_log, model):
+    """run_golden_for_seed() plus its duration, for the results database"""
+    started = time.time()
+    result = run_golden_for_seed(seed, out_dir, elf_file, filter_log, model)
+    if result[1] is not None:
+        with stage("golden", seed):
+            commits = spike_log_to_golden(result[1], golden_path(result[1]))
+        result = result[:2] + (f"{result[2]}, {commits} golden commits",)
+    return result + (time.time() - started,)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run Spike on the compiled ELF files of the given seeds."
+    )
+    parser.add_argument("seeds", nargs="+", type=int, help="Seeds to simulate")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of Spike processes to run in parallel (default: all CPUs)",
+    )
+    parser.add_argument(
+        "--full-log",
+        action="store_true",
+        help="Keep Spike's complete log instead of only the commit lines "
+        "(also enabled by SPIKE_LOG_FILTER=0)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip seeds whose Spike run is already recorded as passed",
+    )
+    parser.add_argument(
+        "--model",
+        choices=GOLDEN_MODELS,
+        default=golden_model(),
+        help="Reference model: spike, iss (built-in RV32I model) or check "
+        "(Spike cross-checked against the model); default: GOLDEN_MODEL or spike",
+    )
+    args = parser.parse_args()
+
+    filter_log = log_filter_enabled() and not args.full_log
+
+    # Look up the output directory and compiled ELF files
+    manifest = load_manifest()
+    out_dir = manifest["out_dir"]
+
+    # An interrupted run only re-runs the seeds without a passing Spike log
+    run_id = manifest.get("run_id")
+    seeds = select_seeds(run_id, args.seeds, "spike", rerun_failed=args.resume)
+    if len(seeds) != len(args.seeds):
+        print(f"--- {len(args.seeds) - len(seeds)} Spike log(s) already complete ---")
+
+    spike_logs = {}
+    results = []
+    identity = model_identity(args.model)
+    keys = {}
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = []
+        for seed in seeds:
+            elf_file = get_artifact(manifest, seed, "elf")
+            keys[seed] = golden_key(elf_file, args.model, identity, filter_log)
+            spike_log_file = spike_log_path(out_dir, seed)
+            if build_cache.fetch("golden", keys[seed], spike_log_file, ".log"):
+                print(f"--- Cached {args.model} log for SEED {seed} ---")
+                spike_log_to_golden(spike_log_file, golden_path(spike_log_file))
+                spike_logs[seed] = {
+                    "spike_log": spike_log_file,
+                    "golden": golden_path(spike_log_file),
+                }
+                results.append(
+                    {
+                        "seed": seed,
+                        "status": "pass",
+                        "duration": 0.0,
+                        "artifacts": spike_logs[seed],
+                    }
+                )
+                continue
+            print(f"--- Running {args.model} for SEED {seed} on {elf_file} ---")
+            futures.append(
+                pool.submit(
+                    run_golden_timed, seed, out_dir, elf_file, filter_log, args.model
+                )
+            )
+
+        for future in as_completed(futures):
+            seed, spike_log_file, message, duration = future.result()
+            if spike_log_file is None:
+                print(message, file=sys.stderr)
+                results.append({"seed": seed, "status": "fail", "duration": duration})
+                continue
+            print(f"--- Spike simulation complete for SEED {seed}. {message} ---")
+            build_cache.store("golden", keys[seed], spike_log_file, ".log")
+            spike_logs[seed] = {
+                "spike_log": spike_log_file,
+                "golden": golden_path(spike_log_file),
+            }
+            results.append(
+                {
+                    "seed": seed,
+                    "status": "pass",
+                    "duration": duration,
+                    "artifacts": spike_logs[seed],
+                }
+            )
 
-    # Process each seed
-    success_count = 0
-    for seed in seeds:
-        elf_file = find_elf_file(out_dir, seed)
-        if run_spike_for_seed(seed, out_dir, elf_file):
-            success_count += 1
+    record_many(spike_logs)
+    record_results(run_id, "spike", results)
 
-    if success_count != len(seeds):
+    if len(spike_logs) != len(seeds):
         print(
-            f"Error: Only {success_count}/{len(seeds)} Spike simulations succeeded",
+            f"Error: Only {len(spike_logs)}/{len(seeds)} Spike simulations succeeded",
             file=sys.stderr,
         )
         sys.exit(1)
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# scripts/rv32i_disasm.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+An RV32I (+ Zicsr, Zifencei) disassembler that reproduces Spike's
+instruction strings, e.g.
+
+    csrr    t0, mhartid
+    beq     a3, s8, pc + 28
+    j       pc - 0x8
+
+including Spike's pseudo-instruction aliases (li, mv, nop, j, jr, ret, ...).
+The disassembly of a whole ELF file is cached per ELF hash (see
+build_cache.py), so every step that needs it decodes a program only once.
+
+Usage:
+    python3 scripts/rv32i_disasm.py <elf_file>
+"""
+
+import sys
+import json
+import build_cache
+from commit_log import ABI_NAMES
+from elf_reader import ElfFile, ElfError
+
+# Bump when the output format changes, to invalidate cached tables
+DISASM_VERSION = "1"
+
+# riscv-dv jumps from the boot code to the test body at this label
+TEST_START_SYMBOL = "h0_start"
+
+CSR_NAMES = {
+    0x001: "fflags",
+    0x002: "frm",
+    0x003: "fcsr",
+    0x100: "sstatus",
+    0x104: "sie",
+    0x105: "stvec",
+    0x106: "scounteren",
+    0x10A: "senvcfg",
+    0x140: "sscratch",
+    0x141: "sepc",
+    0x142: "scause",
+    0x143: "stval",
+    0x144: "sip",
+    0x180: "satp",
+    0x300: "mstatus",
+    0x301: "misa",
+    0x302: "medeleg",
+    0x303: "mideleg",
+    0x304: "mie",
+    0x305: "mtvec",
+    0x306: "mcounteren",
+    0x30A: "menvcfg",
+    0x310: "mstatush",
+    0x31A: "menvcfgh",
+    0x320: "mcountinhibit",
+    0x340: "mscratch",
+    0x341: "mepc",
+    0x342: "mcause",
+    0x343: "mtval",
+    0x344: "mip",
+    0x34A: "mtinst",
+    0x34B: "mtval2",
+    0x747: "mseccfg",
+    0x757: "mseccfgh",
+    0x7A0: "tselect",
+    0x7A1: "tdata1",
+    0x7A2: "tdata2",
+    0x7A3: "tdata3",
+    0x7A4: "tinfo",
+    0x7B0: "dcsr",
+    0x7B1: "dpc",
+    0x7B2: "dscratch0",
+    0x7B3: "dscratch1",
+    0xB00: "mcycle",
+    0xB02: "minstret",
+    0xB80: "mcycleh",
+    0xB82: "minstreth",
+    0xC00: "cycle",
+    0xC01: "time",
+    0xC02: "instret",
+    0xC80: "cycleh",
+    0xC81: "timeh",
+    0xC82: "instreth",
+    0xF11: "mvendorid",
+    0xF12: "marchid",
+    0xF13: "mimpid",
+    0xF14: "mhartid",
+    0xF15: "mconfigptr",
+}
+CSR_NAMES.update({0x3A0 + i: f"pmpcfg{i}" for i in range(16)})
+CSR_NAMES.update({0x3B0 + i: f"pmpaddr{i}" for i in range(64)})
+for _n in range(3, 32):
+    CSR_NAMES[0x320 + _n] = f"mhpmevent{_n}"
+    CSR_NAMES[0xB00 + _n] = f"mhpmcounter{_n}"
+    CSR_NAMES[0xB80 + _n] = f"mhpmcounter{_n}h"
+    CSR_NAMES[0xC00 + _n] = f"hpmcounter{_n}"
+    CSR_NAMES[0xC80 + _n] = f"hpmcounter{_n}h"
+
+LOADS = {0: "lb", 1: "lh", 2: "lw", 4: "lbu", 5: "lhu"}
+STORES = {0: "sb", 1: "sh", 2: "sw"}
+BRANCHES = {0: "beq", 1: "bne", 4: "blt", 5: "bge", 6: "bltu", 7: "bgeu"}
+# Spike's single-register forms for comparisons against zero
+BRANCHES_ZERO = {0: "beqz", 1: "bnez", 4: "bltz", 5: "bgez"}
+OP_IMM = {0: "addi", 2: "slti", 3: "sltiu", 4: "xori", 6: "ori", 7: "andi"}
+OP = {
+    (0x00, 0): "add",
+    (0x20, 0): "sub",
+    (0x00, 1): "sll",
+    (0x00, 2): "slt",
+    (0x00, 3): "sltu",
+    (0x00, 4): "xor",
+    (0x00, 5): "srl",
+    (0x20, 5): "sra",
+    (0x00, 6): "or",
+    (0x00, 7): "and",
+}
+CSR_OPS = {
+    1: "csrrw",
+    2: "csrrs",
+    3: "csrrc",
+    5: "csrrwi",
+    6: "csrrsi",
+    7: "csrrci",
+}
+# csrw/csrs/csrc and their immediate forms when the old value is discarded
+CSR_WRITE_ALIASES = {
+    1: "csrw",
+    2: "csrs",
+    3: "csrc",
+    5: "csrwi",
+    6: "csrsi",
+    7: "csrci",
+}
+SYSTEM = {
+    0x00000073: "ecall",
+    0x00100073: "ebreak",
+    0x10200073: "sret",
+    0x30200073: "mret",
+    0x7B200073: "dret",
+    0x10500073: "wfi",
+}
+PREFETCHES = {0: "prefetch.i", 1: "prefetch.r", 3: "prefetch.w"}
+
+
+def _sext(value, bits):
+    """Sign-extend a 'bits'-wide value"""
+    sign = 1 << (bits - 1)
+    return (value & (sign - 1)) - (value & sign)
+
+
+def _fmt(mnemonic, *args):
+    """Spike pads the mnemonic to 8 columns (at least one space)"""
+    if not args:
+        return mnemonic
+    return mnemonic + " " * max(1, 8 - len(mnemonic)) + ", ".join(args)
+
+
+def _csr_name(csr):
+    return CSR_NAMES.get(csr, f"unknown_{csr:03x}")
+
+
+def _fence_set(bits):
+    return "".join(c for c, m in zip("iorw", (8, 4, 2, 1)) if bits & m)
+
+
+def disassemble(insn):
+    """Disassemble one 32-bit instruction word into Spike's instr_str"""
+    opcode = insn & 0x7F
+    rd = (insn >> 7) & 0x1F
+    funct3 = (insn >> 12) & 0x7
+    rs1 = (insn >> 15) & 0x1F
+    rs2 = (insn >> 20) & 0x1F
+    funct7 = insn >> 25
+    i_imm = _sext(insn >> 20, 12)
+    xrd, xrs1, xrs2 = ABI_NAMES[rd], ABI_NAMES[rs1], ABI_NAMES[rs2]
+
+    if opcode == 0x37:
+        return _fmt("lui", xrd, f"0x{insn >> 12:x}")
+    if opcode == 0x17:
+        return _fmt("auipc", xrd, f"0x{insn >> 12:x}")
+
+    if opcode == 0x6F:
+        offset = _sext(
+            ((insn >> 31) << 20)
+            | (((insn >> 12) & 0xFF) << 12)
+            | (((insn >> 20) & 0x1) << 11)
+            | (((insn >> 21) & 0x3FF) << 1),
+            21,
+        )
+        target = f"pc {'+' if offset >= 0 else '-'} 0x{abs(offset):x}"
+        if rd == 0:
+            return _fmt("j", target)
+        if rd == 1:
+            return _fmt("jal", target)
+        return _fmt("jal", xrd, target)
+
+    if opcode == 0x67 and funct3 == 0:
+        if rd == 0 and rs1 == 1 and i_imm == 0:
+            return "ret"
+        if rd == 0 and i_imm == 0:
+            return _fmt("jr", xrs1)
+        if rd == 1 and i_imm == 0:
+            return _fmt("jalr", xrs1)
+        return _fmt("jalr", xrd, f"{i_imm}({xrs1})")
+
+    if opcode == 0x63 and funct3 in BRANCHES:
+        offset = _sext(
+            ((insn >> 31) << 12)
+            | (((insn >> 7) & 0x1) << 11)
+            | (((insn >> 25) & 0x3F) << 5)
+            | (((insn >> 8) & 0xF) << 1),
+            13,
+        )
+        target = f"pc {'+' if offset >= 0 else '-'} {abs(offset)}"
+        if rs2 == 0 and funct3 in BRANCHES_ZERO:
+            return _fmt(BRANCHES_ZERO[funct3], xrs1, target)
+        return _fmt(BRANCHES[funct3], xrs1, xrs2, target)
+
+    if opcode == 0x03 and funct3 in LOADS:
+        return _fmt(LOADS[funct3], xrd, f"{i_imm}({xrs1})")
+
+    if opcode == 0x23 and funct3 in STORES:
+        s_imm = _sext(((insn >> 25) << 5) | ((insn >> 7) & 0x1F), 12)
+        return _fmt(STORES[funct3], xrs2, f"{s_imm}({xrs1})")
+
+    if opcode == 0x13:
+        if funct3 == 1 and funct7 == 0:
+            return _fmt("slli", xrd, xrs1, str(rs2))
+        if funct3 == 5 and funct7 == 0x00:
+            return _fmt("srli", xrd, xrs1, str(rs2))
+        if funct3 == 5 and funct7 == 0x20:
+            return _fmt("srai", xrd, xrs1, str(rs2))
+        if funct3 not in OP_IMM:
+            return "unknown"
+        if funct3 == 0:
+            if rd == 0 and rs1 == 0 and i_imm == 0:
+                return "nop"
+            if rs1 == 0:
+                return _fmt("li", xrd, str(i_imm))
+            if i_imm == 0:
+                return _fmt("mv", xrd, xrs1)
+        if funct3 == 3 and i_imm == 1:
+            return _fmt("seqz", xrd, xrs1)
+        if funct3 == 4 and i_imm == -1:
+            return _fmt("not", xrd, xrs1)
+        if funct3 == 6 and rd == 0 and rs2 in PREFETCHES:
+            # Zicbop prefetch hints are encoded as 'ori zero, rs1, imm'
+            return _fmt(PREFETCHES[rs2], f"{i_imm}({xrs1})")
+        return _fmt(OP_IMM[funct3], xrd, xrs1, str(i_imm))
+
+    if opcode == 0x33 and (funct7, funct3) in OP:
+        mnemonic = OP[(funct7, funct3)]
+        if mnemonic == "sltu" and rs1 == 0:
+            return _fmt("snez", xrd, xrs2)
+        return _fmt(mnemonic, xrd, xrs1, xrs2)
+
+    if opcode == 0x0F:
+        if funct3 == 1:
+            return "fence.i"
+        if funct3 == 0:
+            if insn == 0x8330000F:
+                return "fence.tso"
+            pred, succ = (insn >> 24) & 0xF, (insn >> 20) & 0xF
+            return _fmt("fence", f"{_fence_set(pred)},{_fence_set(succ)}")
+        return "unknown"
+
+    if opcode == 0x73:
+        if insn in SYSTEM:
+            return SYSTEM[insn]
+        if funct3 not in CSR_OPS:
+            return "unknown"
+        csr = _csr_name(insn >> 20)
+        # The immediate forms carry a 5-bit zero-extended immediate in rs1
+        source = str(rs1) if funct3 >= 5 else xrs1
+        if funct3 == 2 and rs1 == 0:
+            return _fmt("csrr", xrd, csr)
+        if rd == 0:
+            return _fmt(CSR_WRITE_ALIASES[funct3], csr, source)
+        return _fmt(CSR_OPS[funct3], xrd, csr, source)
+
+    return "unknown"
+
+
+def disassemble_elf(elf_file):
+    """
+    Disassemble every code section of an ELF file. Returns (table, start_pc)
+    where table maps each pc to (binary, instr_str) and start_pc is the
+    address of the test body, or None if the ELF has no such symbol.
+    """
+    elf = ElfFile(elf_file)
+    table = {}
+    for section in elf.code_sections():
+        data = elf.section_data(section)
+        for offset in range(0, len(data) - 3, 4):
+            insn = int.from_bytes(data[offset : offset + 4], "little")
+            table[section.addr + offset] = (insn, disassemble(insn))
+    return table, elf.symbols.get(TEST_START_SYMBOL)
+
+
+def program_table(elf_file):
+    """
+    disassemble_elf() through the build cache, keyed on the ELF's contents.
+    """
+    key = build_cache.hash_inputs(DISASM_VERSION, build_cache.hash_file(elf_file))
+    cached = build_cache.load("disasm", key, ".json")
+    if cached is not None:
+        entries = json.loads(cached)
+        table = {int(pc, 16): (insn, text) for pc, insn, text in entries["table"]}
+        return table, entries["start_pc"]
+
+    table, start_pc = disassemble_elf(elf_file)
+    entries = {
+        "start_pc": start_pc,
+        "table": [(f"{pc:x}", insn, text) for pc, (insn, text) in table.items()],
+    }
+    build_cache.save("disasm", key, json.dumps(entries).encode(), ".json")
+    return table, start_pc
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python3 scripts/rv32i_disasm.py <elf_file>", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        table, _ = program_table(sys.argv[1])
+    except (OSError, ElfError) as e:
+        print(f"Error disassembling ELF file: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for pc, (insn, text) in sorted(table.items()):
+        print(f"0x{pc:08x} (0x{insn:08x}) {text}")
+
+
+if __name__ == "__main__":
+    main()
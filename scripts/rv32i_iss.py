@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+# scripts/rv32i_iss.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+An in-process RV32I instruction set simulator (ISS): a golden model of the
+machine-mode subset declared in riscv_core_setting.py that runs a test
+program without starting Spike.
+
+It loads the ELF into a RAM shaped like Spike's '-m0x80000000:0x20000',
+starts at the entry point with the registers Spike's boot ROM leaves behind,
+and writes the commit log that run_spike.py's filter would keep:
+
+    core   0: 3 0x80000000 (0xf14022f3) x5  0x00000000
+    core   0: 3 0x80000010 (0x00512023) mem 0x80001000 0x00000005
+    core   0: 3 0x800001a4 (0x00000073)
+
+Loads, stores and CSR writes carry Spike's fields (' mem ...',
+' c768_mstatus ...'), so the log matches Spike's filtered log line for line.
+With --full-log, each commit is also preceded by Spike's disassembly line
+and the log ends with the ECALL's exception line, like 'spike -l'. That log
+only matches Spike's from 0x80000000 on: the model does not run the boot
+ROM (0x1000...) and writes no '>>>>' symbol lines.
+
+The run ends at the ECALL that ends the test. Anything else the core under
+test cannot run stops it with an error instead of a trap: an exception
+(illegal instruction, misaligned or out-of-RAM access, EBREAK), a return to
+a lower privilege mode, a jump to itself, or more than ISS_MAX_INSTRS
+instructions (default: 1000000). Such programs are screened out before an
+RTL simulation is spent on them.
+
+Usage:
+    python3 scripts/rv32i_iss.py [--full-log] [-o <log_file>] <elf_file>
+"""
+
+import os
+import sys
+import struct
+import argparse
+from commit_log import ECALL_BINARY, TEST_START_PC, format_commit
+from elf_reader import ElfFile, ElfError
+from rv32i_disasm import CSR_NAMES, disassemble
+
+# RAM of 'spike -m0x80000000:0x20000'
+MEM_BASE = TEST_START_PC
+MEM_SIZE = 0x20000
+
+DEFAULT_MAX_INSTRS = 1000000
+
+MASK = 0xFFFFFFFF
+PRIV_M = 3
+
+# Spike's boot ROM (auipc t0; addi a1, t0, 32; csrr a0, mhartid; lw t0, 24(t0);
+# jr t0) leaves t0 = entry point, a0 = hart id and a1 = device tree address
+BOOT_REGS = {5: None, 10: 0, 11: 0x1020}
+BOOT_INSTRET = 5
+
+# Exception causes, named like Spike's log
+TRAP_NAMES = {
+    0: "trap_instruction_address_misaligned",
+    1: "trap_instruction_access_fault",
+    2: "trap_illegal_instruction",
+    3: "trap_breakpoint",
+    4: "trap_load_address_misaligned",
+    5: "trap_load_access_fault",
+    6: "trap_store_address_misaligned",
+    7: "trap_store_access_fault",
+}
+
+MRET = 0x30200073
+EBREAK = 0x00100073
+WFI = 0x10500073
+
+MSTATUS_MIE = 0x8
+MSTATUS_MPIE = 0x80
+MSTATUS_MPP = 0x1800
+MSTATUS_MPRV = 0x20000
+MSTATUSH = 0x310
+
+# Writable bits of the machine CSRs, as Spike models an rv32i hart with
+# M, S and U modes; misa and the ID registers ignore writes
+CSR_MASKS = {
+    0x300: 0x007E19AA,  # mstatus
+    0x301: 0,  # misa
+    0x304: 0x00000AAA,  # mie
+    0x305: ~0x2 & MASK,  # mtvec
+    0x306: MASK,  # mcounteren
+    0x340: MASK,  # mscratch
+    0x341: ~0x3 & MASK,  # mepc
+    0x342: MASK,  # mcause
+    0x343: MASK,  # mtval
+    0x344: 0x00000222,  # mip
+}
+CSR_RESET = {
+    0x300: 0,
+    0x301: 0x40140100,  # RV32, I, S, U
+    0x304: 0,
+    0x305: 0,
+    0x306: 0,
+    0x340: 0,
+    0x341: 0,
+    0x342: 0,
+    0x343: 0,
+    0x344: 0,
+}
+# Read-only machine information registers
+CSR_IDS = {0xF11: 0, 0xF12: 5, 0xF13: 0, 0xF14: 0}
+# mcycle and minstret with their user aliases and high halves; Spike counts
+# one cycle per retired instruction
+MCYCLE = 0xB00
+MINSTRET = 0xB02
+COUNTERS = {0xB00: MCYCLE, 0xB02: MINSTRET, 0xC00: MCYCLE, 0xC02: MINSTRET}
+COUNTERS_HIGH = {0xB80: MCYCLE, 0xB82: MINSTRET, 0xC80: MCYCLE, 0xC82: MINSTRET}
+
+U8 = struct.Struct("<B")
+S8 = struct.Struct("<b")
+U16 = struct.Struct("<H")
+S16 = struct.Struct("<h")
+U32 = struct.Struct("<I")
+LOAD_FORMATS = {0: (S8, 1), 1: (S16, 2), 2: (U32, 4), 4: (U8, 1), 5: (U16, 2)}
+STORE_FORMATS = {0: (U8, 1, 0xFF), 1: (U16, 2, 0xFFFF), 2: (U32, 4, MASK)}
+
+
+class IssError(Exception):
+    """Raised when a program does something the modeled subset cannot run"""
+
+
+class Trap(Exception):
+    """An exception taken by an instruction"""
+
+    def __init__(self, cause, tval=0):
+        super().__init__(TRAP_NAMES[cause])
+        self.cause = cause
+        self.tval = tval
+
+
+def sext(value, bits):
+    """Sign-extend a 'bits'-wide value to 32 bits"""
+    sign = 1 << (bits - 1)
+    return ((value & (sign - 1)) - (value & sign)) & MASK
+
+
+def signed(value):
+    """A 32-bit register value as a signed integer"""
+    return value - (1 << 32) if value & 0x80000000 else value
+
+
+def decode(insn):
+    """
+    Fields of an instruction word, with the immediate of its format:
+    (insn, opcode, rd, funct3, rs1, rs2, funct7, imm)
+    """
+    opcode = insn & 0x7F
+    if opcode in (0x37, 0x17):
+        imm = insn & 0xFFFFF000
+    elif opcode == 0x6F:
+        imm = sext(
+            ((insn >> 31) << 20)
+            | (((insn >> 12) & 0xFF) << 12)
+            | (((insn >> 20) & 0x1) << 11)
+            | (((insn >> 21) & 0x3FF) << 1),
+            21,
+        )
+    elif opcode == 0x63:
+        imm = sext(
+            ((insn >> 31) << 12)
+            | (((insn >> 7) & 0x1) << 11)
+            | (((insn >> 25) & 0x3F) << 5)
+            | (((insn >> 8) & 0xF) << 1),
+            13,
+        )
+    elif opcode == 0x23:
+        imm = sext(((insn >> 25) << 5) | ((insn >> 7) & 0x1F), 12)
+    else:
+        imm = sext(insn >> 20, 12)
+    return (
+        insn,
+        opcode,
+        (insn >> 7) & 0x1F,
+        (insn >> 12) & 0x7,
+        (insn >> 15) & 0x1F,
+        (insn >> 20) & 0x1F,
+        insn >> 25,
+        imm,
+    )
+
+
+def alu(funct7, funct3, a, b, immediate):
+    """Result of an OP or OP-IMM instruction, or None for an illegal encoding"""
+    if funct3 == 0:
+        if immediate or funct7 == 0x00:
+            return (a + b) & MASK
+        return (a - b) & MASK if funct7 == 0x20 else None
+    if funct3 in (1, 5):
+        shamt = b & 0x1F
+        if funct3 == 1:
+            return (a << shamt) & MASK if funct7 == 0x00 else None
+        if funct7 == 0x00:
+            return a >> shamt
+        return (signed(a) >> shamt) & MASK if funct7 == 0x20 else None
+    if not immediate and funct7 != 0x00:
+        return None
+    if funct3 == 2:
+        return int(signed(a) < signed(b))
+    if funct3 == 3:
+        return int(a < b)
+    if funct3 == 4:
+        return a ^ b
+    if funct3 == 6:
+        return a | b
+    return a & b
+
+
+def branch_taken(funct3, a, b):
+    """Outcome of a branch, or None for an illegal encoding"""
+    if funct3 == 0:
+        return a == b
+    if funct3 == 1:
+        return a != b
+    if funct3 == 4:
+        return signed(a) < signed(b)
+    if funct3 == 5:
+        return signed(a) >= signed(b)
+    if funct3 == 6:
+        return a < b
+    if funct3 == 7:
+        return a >= b
+    return None
+
+
+class Rv32iIss:
+    """Architectural state of one hart running one program"""
+
+    def __init__(self, elf_file, mem_size=MEM_SIZE):
+        elf = ElfFile(elf_file)
+        self.mem = bytearray(mem_size)
+        for segment in elf.load_segments():
+            if not segment.filesz:
+                continue
+            start = segment.paddr - MEM_BASE
+            if start < 0 or start + segment.memsz > mem_size:
+                raise IssError(
+                    f"Segment at 0x{segment.paddr:08x} is outside the RAM at "
+                    f"0x{MEM_BASE:08x}"
+                )
+            data = elf.data[segment.offset : segment.offset + segment.filesz]
+            self.mem[start : start + segment.filesz] = data
+
+        self.pc = elf.entry
+        self.regs = [0] * 32
+        for reg, value in BOOT_REGS.items():
+            self.regs[reg] = elf.entry if value is None else value
+        self.csrs = dict(CSR_RESET)
+        self.priv = PRIV_M
+        # Counters are kept as offsets from the number of retired instructions
+        self.retired = 0
+        self.counters = {MCYCLE: BOOT_INSTRET, MINSTRET: BOOT_INSTRET}
+        self.decoded = {}
+
+    def _offset(self, addr, size, misaligned, fault):
+        """RAM offset of an access, or the trap it takes"""
+        if addr & (size - 1):
+            raise Trap(misaligned, addr)
+        offset = addr - MEM_BASE
+        if offset < 0 or offset + size > len(self.mem):
+            raise Trap(fault, addr)
+        return offset
+
+    def fetch(self, pc):
+        """
+        Decoded instruction at pc, decoded once per address, followed by the
+        start of its commit line
+        """
+        fields = self.decoded.get(pc)
+        if fields is None:
+            offset = self._offset(pc, 4, 0, 1)
+            insn = U32.unpack_from(self.mem, offset)[0]
+            fields = decode(insn) + (format_commit(pc, insn)[:-1],)
+            self.decoded[pc] = fields
+        return fields
+
+    def read_csr(self, csr):
+        if csr in self.csrs:
+            return self.csrs[csr]
+        if csr in CSR_IDS:
+            return CSR_IDS[csr]
+        if csr in COUNTERS:
+            return (self.counters[COUNTERS[csr]] + self.retired) & MASK
+        if csr in COUNTERS_HIGH:
+            return (self.counters[COUNTERS_HIGH[csr]] + self.retired) >> 32
+        raise Trap(2)
+
+    def csr_field(self, csr, value):
+        """Commit log field of a CSR write, e.g. ' c768_mstatus 0x00000080'"""
+        return f" c{csr}_{CSR_NAMES.get(csr, 'unknown')} 0x{value:08x}"
+
+    def write_csr(self, csr, value):
+        """Write a CSR and return its commit log field"""
+        if csr >> 10 == 3:
+            # Read-only address space (IDs and user counters)
+            raise Trap(2)
+        if csr in CSR_MASKS:
+            mask = CSR_MASKS[csr]
+            value = (self.csrs[csr] & ~mask) | (value & mask)
+            if csr == 0x300 and value & MSTATUS_MPP == 0x1000:
+                # Reserved MPP encoding (H mode) falls back to U mode
+                value &= ~MSTATUS_MPP
+            self.csrs[csr] = value
+            return self.csr_field(csr, value)
+        if csr in COUNTERS:
+            counter = COUNTERS[csr]
+            written = ((self.counters[counter] + self.retired) & ~MASK) | value
+        elif csr in COUNTERS_HIGH:
+            counter = COUNTERS_HIGH[csr]
+            written = ((self.counters[counter] + self.retired) & MASK) | (value << 32)
+        else:
+            raise Trap(2)
+        # The written value is not incremented by the write itself
+        self.counters[counter] = written - self.retired - 1
+        return self.csr_field(csr, value)
+
+    def mret(self):
+        """
+        Return from a machine-mode trap; returns the new pc and the commit
+        log fields of the mstatus update.
+        """
+        mstatus = self.csrs[0x300]
+        priv = (mstatus & MSTATUS_MPP) >> 11
+        mstatus &= ~(MSTATUS_MIE | MSTATUS_MPP)
+        if mstatus & MSTATUS_MPIE:
+            mstatus |= MSTATUS_MIE
+        mstatus |= MSTATUS_MPIE
+        if priv != PRIV_M:
+            mstatus &= ~MSTATUS_MPRV
+        self.csrs[0x300] = mstatus
+        if priv != PRIV_M:
+            raise IssError(
+                f"MRET at pc 0x{self.pc:08x} enters privilege mode {priv}; "
+                "only machine mode is modeled"
+            )
+        fields = self.csr_field(0x300, mstatus) + self.csr_field(MSTATUSH, 0)
+        return self.csrs[0x341], fields
+
+    def step(self, decoded):
+        """
+        Execute one fetch()ed instruction. Returns (next_pc, rd, value, fields)
+        where rd is None if no GPR is written and fields holds the commit log
+        fields of memory accesses and CSR writes.
+        """
+        pc = self.pc
+        insn, opcode, rd, funct3, rs1, rs2, funct7, imm, _ = decoded
+        regs = self.regs
+        next_pc = (pc + 4) & MASK
+
+        if opcode == 0x13:
+            value = alu(funct7, funct3, regs[rs1], imm, funct3 not in (1, 5))
+            if value is None:
+                raise Trap(2, insn)
+            return next_pc, rd, value, ""
+        if opcode == 0x33:
+            value = alu(funct7, funct3, regs[rs1], regs[rs2], False)
+            if value is None:
+                raise Trap(2, insn)
+            return next_pc, rd, value, ""
+        if opcode == 0x03:
+            if funct3 not in LOAD_FORMATS:
+                raise Trap(2, insn)
+            fmt, size = LOAD_FORMATS[funct3]
+            addr = (regs[rs1] + imm) & MASK
+            offset = self._offset(addr, size, 4, 5)
+            value = fmt.unpack_from(self.mem, offset)[0] & MASK
+            return next_pc, rd, value, f" mem 0x{addr:08x}"
+        if opcode == 0x23:
+            if funct3 not in STORE_FORMATS:
+                raise Trap(2, insn)
+            fmt, size, mask = STORE_FORMATS[funct3]
+            addr = (regs[rs1] + imm) & MASK
+            offset = self._offset(addr, size, 6, 7)
+            value = regs[rs2] & mask
+            fmt.pack_into(self.mem, offset, value)
+            # Self-modifying code is decoded again
+            self.decoded.pop(addr & ~0x3, None)
+            fields = f" mem 0x{addr:08x} 0x{value:0{size * 2}x}"
+            return next_pc, None, None, fields
+        if opcode == 0x63:
+            taken = branch_taken(funct3, regs[rs1], regs[rs2])
+            if taken is None:
+                raise Trap(2, insn)
+            if taken:
+                next_pc = (pc + imm) & MASK
+                if next_pc & 0x3:
+                    raise Trap(0, next_pc)
+            return next_pc, None, None, ""
+        if opcode == 0x37:
+            return next_pc, rd, imm, ""
+        if opcode == 0x17:
+            return next_pc, rd, (pc + imm) & MASK, ""
+        if opcode == 0x6F:
+            target = (pc + imm) & MASK
+            if target & 0x3:
+                raise Trap(0, target)
+            return target, rd, next_pc, ""
+        if opcode == 0x67 and funct3 == 0:
+            target = (regs[rs1] + imm) & ~0x1 & MASK
+            if target & 0x3:
+                raise Trap(0, target)
+            return target, rd, next_pc, ""
+        if opcode == 0x0F and funct3 in (0, 1):
+            if funct3 == 1:
+                self.decoded.clear()
+            return next_pc, None, None, ""
+        if opcode == 0x73:
+            if funct3 == 0:
+                if insn == MRET:
+                    target, fields = self.mret()
+                    return target, None, None, fields
+                if insn == WFI:
+                    return next_pc, None, None, ""
+                raise Trap(3 if insn == EBREAK else 2, insn)
+            if funct3 == 4:
+                raise Trap(2, insn)
+            csr = insn >> 20
+            old = self.read_csr(csr)
+            source = rs1 if funct3 >= 5 else regs[rs1]
+            if funct3 & 0x3 == 1:
+                fields = self.write_csr(csr, source)
+            elif rs1 == 0:
+                fields = ""
+            elif funct3 & 0x3 == 2:
+                fields = self.write_csr(csr, old | source)
+            else:
+                fields = self.write_csr(csr, old & ~source)
+            return next_pc, rd, old, fields
+        raise Trap(2, insn)
+
+    def run(self, out, max_instrs=DEFAULT_MAX_INSTRS, full_log=False):
+        """
+        Run the program up to its ECALL, writing the commit log to 'out'.
+        Returns the number of instructions executed before the ECALL.
+        """
+        regs = self.regs
+        for count in range(max_instrs):
+            pc = self.pc
+            try:
+                decoded = self.fetch(pc)
+                insn = decoded[0]
+                if full_log:
+                    out.write(
+                        f"core   0: 0x{pc:08x} (0x{insn:08x}) {disassemble(insn)}\n"
+                    )
+                if insn == ECALL_BINARY:
+                    if full_log:
+                        out.write(
+                            f"core   0: exception trap_machine_ecall, epc 0x{pc:08x}\n"
+                        )
+                    else:
+                        out.write(format_commit(pc, insn))
+                    return count
+                next_pc, rd, value, fields = self.step(decoded)
+            except Trap as trap:
+                raise IssError(
+                    f"Exception {trap} at pc 0x{pc:08x} "
+                    f"(tval 0x{trap.tval:08x}) before the ECALL"
+                ) from None
+
+            # Like Spike, writes to x0 are not logged
+            if rd:
+                regs[rd] = value
+                out.write(f"{decoded[8]} x{rd:<2} 0x{value:08x}{fields}\n")
+            else:
+                out.write(f"{decoded[8]}{fields}\n")
+            self.retired += 1
+
+            if next_pc == pc and (not rd or insn & 0x7F == 0x6F):
+                raise IssError(f"Program hangs in a jump to itself at pc 0x{pc:08x}")
+            self.pc = next_pc
+
+        raise IssError(f"No ECALL after {max_instrs} instructions")
+
+
+def max_instructions():
+    """Instruction limit of a run, overridable with ISS_MAX_INSTRS"""
+    return int(os.environ.get("ISS_MAX_INSTRS", DEFAULT_MAX_INSTRS))
+
+
+def run_elf(elf_file, log_file=None, full_log=False, max_instrs=None):
+    """
+    Run an ELF file and write its commit log to log_file (default: stdout).
+    Returns the number of instructions executed; raises IssError or ElfError
+    if the program cannot be run to its ECALL.
+    """
+    iss = Rv32iIss(elf_file)
+    max_instrs = max_instrs or max_instructions()
+    if log_file is None:
+        return iss.run(sys.stdout, max_instrs, full_log)
+    with open(log_file, "w") as out:
+        return iss.run(out, max_instrs, full_log)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run an RV32I program on the built-in golden model."
+    )
+    parser.add_argument("elf_file", help="ELF file of the test program")
+    parser.add_argument("-o", "--output", help="Commit log file (default: stdout)")
+    parser.add_argument(
+        "--full-log",
+        action="store_true",
+        help="Write Spike's disassembly lines along with the commits",
+    )
+    parser.add_argument(
+        "--max-instrs",
+        type=int,
+        help=f"Instruction limit (default: ISS_MAX_INSTRS or {DEFAULT_MAX_INSTRS})",
+    )
+    args = parser.parse_args()
+
+    try:
+        count = run_elf(args.elf_file, args.output, args.full_log, args.max_instrs)
+    except (OSError, ElfError, IssError) as e:
+        print(f"Error running {args.elf_file}: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"{args.elf_file}: ECALL after {count} instructions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
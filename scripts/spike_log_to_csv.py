@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# scripts/spike_log_to_csv.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Convert a Spike log into the riscv-dv trace CSV format.
+
+Accepts both the filtered commit-only logs written by run_spike.py and full
+'spike -l --log-commits' logs. Like riscv-dv's spike_log_to_trace_csv.py, it
+emits one row per GPR write from 0x80000000 onward and ends with the ECALL.
+The instr_str column is only filled in for full logs, which carry Spike's
+disassembly.
+"""
+
+import sys
+import csv
+import argparse
+from commit_log import (
+    COMMIT_RE,
+    DISASM_RE,
+    ECALL_BINARY,
+    TEST_START_PC,
+    gpr_field,
+)
+
+CSV_HEADER = [
+    "pc",
+    "instr",
+    "gpr",
+    "csr",
+    "binary",
+    "mode",
+    "instr_str",
+    "operand",
+    "pad",
+]
+
+
+def trace_rows(lines):
+    """Yield the CSV rows of a Spike log"""
+    started = False
+    instr_str = ""
+
+    for line in lines:
+        commit = COMMIT_RE.match(line)
+        if commit is None:
+            disasm = DISASM_RE.match(line)
+            if disasm is None:
+                continue
+            pc_str, binary, instr_str = disasm.groups()
+            if started and int(binary, 16) == ECALL_BINARY:
+                break
+            continue
+
+        pc_str, binary, rd_str, rd_val = commit.groups()
+        if not started:
+            if int(pc_str, 16) < TEST_START_PC:
+                continue
+            started = True
+
+        if int(binary, 16) == ECALL_BINARY:
+            break
+
+        # Only instructions that write a GPR other than x0 are compared
+        if rd_str is None or rd_str == "0":
+            continue
+
+        yield {
+            "pc": pc_str,
+            "instr": "",
+            "gpr": gpr_field(int(rd_str), int(rd_val, 16)),
+            "csr": "",
+            "binary": binary,
+            "mode": "3",
+            "instr_str": instr_str,
+            "operand": "",
+            "pad": "",
+        }
+        instr_str = ""
+    else:
+        return
+
+    # The trace ends with the ECALL, which writes no register
+    yield {
+        "pc": pc_str,
+        "instr": "",
+        "gpr": "",
+        "csr": "",
+        "binary": binary,
+        "mode": "",
+        "instr_str": "ecall",
+        "operand": "",
+        "pad": "",
+    }
+
+
+def spike_log_to_csv(log_file, csv_file):
+    """Convert log_file to csv_file and return the number of rows written"""
+    count = 0
+    with open(log_file, "r", errors="replace") as f_in, open(
+        csv_file, "w", newline=""
+    ) as f_out:
+        writer = csv.DictWriter(f_out, fieldnames=CSV_HEADER)
+        writer.writeheader()
+        for row in trace_rows(f_in):
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert a Spike log to riscv-dv CSV format."
+    )
+    parser.add_argument("--log", required=True, help="Input Spike log file")
+    parser.add_argument("--csv", required=True, help="Output CSV file")
+    args = parser.parse_args()
+
+    try:
+        spike_log_to_csv(args.log, args.csv)
+    except IOError as e:
+        print(f"Error converting Spike log to CSV: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
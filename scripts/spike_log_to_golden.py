@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# scripts/spike_log_to_golden.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Convert a Spike log into the golden commit file of the UVM commit scoreboard.
+
+The golden file holds every commit of the test program, from 0x80000000 up
+to and including the ECALL, one fixed-width line of hexadecimal fields per
+commit:
+
+    80000000 f14022f3 1 05 00000000
+    80000008 00628263 0 00 00000000
+
+that is pc, instruction, GPR write enable, rd and the written value. The
+scoreboard reads it with one $fscanf("%h %h %h %h %h") per commit instead of
+searching the raw log for the test start and trying two $sscanf formats on
+every line. Accepts filtered and full Spike logs, and the logs of the
+built-in RV32I model.
+
+Usage:
+    python3 scripts/spike_log_to_golden.py --log <spike_log> --golden <golden_file>
+"""
+
+import os
+import sys
+import argparse
+from commit_log import CommitLogFilter, parse_commit
+
+GOLDEN_SUFFIX = ".golden"
+
+
+def golden_path(spike_log_file):
+    """Golden file written next to a Spike log"""
+    return os.path.splitext(spike_log_file)[0] + GOLDEN_SUFFIX
+
+
+def golden_lines(lines):
+    """Yield the golden file lines of a Spike log"""
+    for line in CommitLogFilter().filter(lines):
+        pc, binary, rd, value = parse_commit(line)
+        if rd is None:
+            yield f"{pc:08x} {binary:08x} 0 00 00000000\n"
+        else:
+            yield f"{pc:08x} {binary:08x} 1 {rd:02x} {value:08x}\n"
+
+
+def spike_log_to_golden(log_file, golden_file):
+    """Convert log_file to golden_file and return the number of commits"""
+    count = 0
+    with open(log_file, "r", errors="replace") as f_in, open(golden_file, "w") as f_out:
+        for line in golden_lines(f_in):
+            f_out.write(line)
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert a Spike log to the UVM scoreboard's golden file."
+    )
+    parser.add_argument("--log", required=True, help="Input Spike log file")
+    parser.add_argument("--golden", help="Output golden file (default: <log>.golden)")
+    args = parser.parse_args()
+
+    try:
+        spike_log_to_golden(args.log, args.golden or golden_path(args.log))
+    except IOError as e:
+        print(f"Error converting Spike log to golden file: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# scripts/stage_timer.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Per-stage timing and resource instrumentation for the regression runners.
+
+Every stage of a seed appends one event to <TIMING_DIR>/events.jsonl
+(default: logs/timing), holding its wall time, CPU time and peak resident
+set size (RSS).
+
+Stages that run a tool (gen, compile, spike, vsim) start it as a child
+process with run_process() or wait for it with wait_process(). The child is
+reaped with os.wait4(), which reports its own CPU time and peak RSS, and
+recorded by record_process(); the warm generators of pygen_server.py are
+recorded the same way.
+
+Stages that run in the runner process (mem_convert, compare, golden, iss,
+...) are wrapped in stage(), which records the CPU time of the process
+during the stage. getrusage() only reports a peak RSS over the whole life of
+the process, so the stage's max_rss_kb is that mark if it rose during the
+stage, and null otherwise (the stage stayed below an earlier peak). The CPU
+time is exact when the stage runs alone in its process, as in the worker
+pools of run_spike.py and run_simulation.py; stages running concurrently in
+threads of one process share their counters.
+
+'report' turns the events into one JSON file per seed and a Chrome trace
+(trace.json) that chrome://tracing and https://ui.perfetto.dev open directly.
+Set TIMING=0 to disable the instrumentation.
+
+Usage:
+    python3 scripts/stage_timer.py report
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import threading
+import subprocess
+from collections import defaultdict
+from contextlib import contextmanager
+
+DEFAULT_TIMING_DIR = os.path.join("logs", "timing")
+EVENTS_FILE = "events.jsonl"
+TRACE_FILE = "trace.json"
+
+
+def timing_enabled():
+    """Stages are timed unless TIMING=0"""
+    return os.environ.get("TIMING", "1") != "0"
+
+
+def timing_dir():
+    """Directory holding the events and reports"""
+    return os.environ.get("TIMING_DIR", DEFAULT_TIMING_DIR)
+
+
+def _cpu(usage):
+    return usage.ru_utime + usage.ru_stime
+
+
+def record_event(event):
+    """Append an event as one line, so concurrent writers never interleave"""
+    os.makedirs(timing_dir(), exist_ok=True)
+    line = json.dumps(event, sort_keys=True) + "\n"
+    fd = os.open(
+        os.path.join(timing_dir(), EVENTS_FILE),
+        os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+        0o644,
+    )
+    try:
+        os.write(fd, line.encode())
+    finally:
+        os.close(fd)
+
+
+def _event(name, seed, start, wall, cpu, child_cpu, max_rss, child_max_rss, args):
+    return {
+        "stage": name,
+        "seed": seed,
+        "script": os.path.basename(sys.argv[0]),
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "start": start,
+        "wall": wall,
+        "cpu": cpu,
+        "child_cpu": child_cpu,
+        # ru_maxrss is in kilobytes on Linux; None when not measured
+        "max_rss_kb": max_rss,
+        "child_max_rss_kb": child_max_rss,
+        "args": args,
+    }
+
+
+@contextmanager
+def stage(name, seed=None, **args):
+    """
+    Measure the enclosed block as stage 'name' of 'seed'. Extra keyword
+    arguments are stored with the event (e.g. the seeds of a batch). The
+    event is recorded even if the block raises or exits.
+    """
+    if not timing_enabled():
+        yield
+        return
+
+    start = time.time()
+    wall_start = time.perf_counter()
+    self_start = resource.getrusage(resource.RUSAGE_SELF)
+    children_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall_start
+        self_end = resource.getrusage(resource.RUSAGE_SELF)
+        children_end = resource.getrusage(resource.RUSAGE_CHILDREN)
+        record_event(
+            _event(
+                name,
+                seed,
+                start,
+                wall,
+                _cpu(self_end) - _cpu(self_start),
+                _cpu(children_end) - _cpu(children_start),
+                _rss_rise(self_start, self_end),
+                _rss_rise(children_start, children_end),
+                args,
+            )
+        )
+
+
+def _rss_rise(usage_start, usage_end):
+    """Peak RSS reached during a stage, or None if the mark did not rise"""
+    if usage_end.ru_maxrss > usage_start.ru_maxrss:
+        return usage_end.ru_maxrss
+    return None
+
+
+def record_process(name, seed, start, usage, **args):
+    """
+    Record stage 'name' of 'seed' as run by one child process that started
+    at 'start' (time.time()) and was reaped with os.wait4(), which returned
+    its resource 'usage'.
+    """
+    if not timing_enabled():
+        return
+    record_event(
+        _event(
+            name,
+            seed,
+            start,
+            time.time() - start,
+            0.0,
+            _cpu(usage),
+            None,
+            usage.ru_maxrss,
+            args,
+        )
+    )
+
+
+def wait_process(proc, name, seed, start, **args):
+    """
+    Wait for a child started with subprocess.Popen at 'start' and record it
+    as stage 'name' of 'seed'. Returns its exit status, which is also set as
+    proc.returncode.
+    """
+    try:
+        _, status, usage = os.wait4(proc.pid, 0)
+    except ChildProcessError:
+        # Already reaped elsewhere, so its usage is lost
+        return proc.wait()
+    except BaseException:
+        # Interrupted: do not leave the tool running, like subprocess.run()
+        proc.kill()
+        proc.wait()
+        raise
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    record_process(name, seed, start, usage, **args)
+    return proc.returncode
+
+
+def run_process(name, seed, cmd, timing_args=None, **popen_args):
+    """
+    Run a tool as stage 'name' of 'seed', like subprocess.run() without
+    output capture. timing_args are stored with the event. Returns the exit
+    status.
+    """
+    start = time.time()
+    proc = subprocess.Popen(cmd, **popen_args)
+    return wait_process(proc, name, seed, start, **(timing_args or {}))
+
+
+def load_events(directory=None):
+    """All recorded events, in start order"""
+    path = os.path.join(directory or timing_dir(), EVENTS_FILE)
+    events = []
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                events.append(json.loads(line))
+    return sorted(events, key=lambda event: event["start"])
+
+
+def chrome_trace(events):
+    """
+    Chrome trace event format: one complete ('X') event per stage, with the
+    runner process as the process and the seed as the thread, so each seed's
+    stages line up on one track.
+    """
+    trace = []
+    processes = {}
+    for event in events:
+        pid = event["pid"]
+        if pid not in processes:
+            processes[pid] = event["script"]
+            trace.append(
+                {
+                    "ph": "M",
+                    "name": "process_name",
+                    "pid": pid,
+                    "args": {"name": f"{event['script']} ({pid})"},
+                }
+            )
+        seed = event["seed"]
+        trace.append(
+            {
+                "ph": "X",
+                "name": event["stage"] if seed is None else f"{event['stage']} {seed}",
+                "cat": event["stage"],
+                "pid": pid,
+                "tid": seed if seed is not None else event["tid"] % 100000,
+                "ts": event["start"] * 1e6,
+                "dur": event["wall"] * 1e6,
+                "args": dict(
+                    event["args"],
+                    cpu_s=round(event["cpu"], 3),
+                    child_cpu_s=round(event["child_cpu"], 3),
+                    max_rss_kb=event["max_rss_kb"],
+                    child_max_rss_kb=event["child_max_rss_kb"],
+                ),
+            }
+        )
+    return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+
+def _max_rss(*values):
+    """Largest of the measured peak RSS values, or None if none was measured"""
+    measured = [value for value in values if value is not None]
+    return max(measured) if measured else None
+
+
+def write_report(directory=None):
+    """
+    Write seeds/<seed>.json and trace.json from the events and print the
+    time spent per stage.
+    """
+    directory = directory or timing_dir()
+    events = load_events(directory)
+
+    # A stage shared by several seeds (a vsim batch) is charged to each of
+    # them in equal shares
+    by_seed = defaultdict(list)
+    for event in events:
+        if event["seed"] is not None:
+            by_seed[event["seed"]].append(event)
+            continue
+        seeds = event["args"].get("seeds", [])
+        for seed in seeds:
+            share = dict(event)
+            for key in ("wall", "cpu", "child_cpu"):
+                share[key] = event[key] / len(seeds)
+            by_seed[seed].append(share)
+
+    seed_dir = os.path.join(directory, "seeds")
+    os.makedirs(seed_dir, exist_ok=True)
+    for seed, seed_events in by_seed.items():
+        stages = {}
+        for event in seed_events:
+            totals = stages.setdefault(
+                event["stage"],
+                {
+                    "wall": 0.0,
+                    "cpu": 0.0,
+                    "child_cpu": 0.0,
+                    "max_rss_kb": None,
+                    "child_max_rss_kb": None,
+                },
+            )
+            totals["wall"] += event["wall"]
+            totals["cpu"] += event["cpu"]
+            totals["child_cpu"] += event["child_cpu"]
+            for key in ("max_rss_kb", "child_max_rss_kb"):
+                totals[key] = _max_rss(totals[key], event[key])
+        with open(os.path.join(seed_dir, f"{seed}.json"), "w") as f:
+            json.dump({"seed": seed, "stages": stages}, f, indent=2)
+
+    with open(os.path.join(directory, TRACE_FILE), "w") as f:
+        json.dump(chrome_trace(events), f)
+
+    summary = defaultdict(lambda: [0, 0.0, 0.0, None])
+    for event in events:
+        totals = summary[event["stage"]]
+        totals[0] += 1
+        totals[1] += event["wall"]
+        totals[2] += event["cpu"] + event["child_cpu"]
+        totals[3] = _max_rss(totals[3], event["child_max_rss_kb"], event["max_rss_kb"])
+
+    print("=" * 57)
+    print("                 STAGE TIMING SUMMARY")
+    print("=" * 57)
+    print(
+        f"{'stage':<14}{'count':>6}{'wall [s]':>12}{'cpu [s]':>12}{'peak RSS [MB]':>14}"
+    )
+    for name, (count, wall, cpu, rss) in sorted(
+        summary.items(), key=lambda item: -item[1][1]
+    ):
+        rss = "-" if rss is None else f"{rss / 1024:.1f}"
+        print(f"{name:<14}{count:>6}{wall:>12.2f}{cpu:>12.2f}{rss:>14}")
+    print("=" * 57)
+    print(f"Per-seed timing: {seed_dir}/")
+    print(f"Chrome trace:    {os.path.join(directory, TRACE_FILE)}")
+
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] != "report":
+        print("Usage: python3 scripts/stage_timer.py report", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        write_report()
+    except FileNotFoundError:
+        print(
+            f"Error: No timing events in {timing_dir()}. Run a regression first.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# scripts/trace_bisect.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Locate the first divergence between a Spike log and an RTL trace by
+bisecting hashes of fixed-size windows of their GPR writes.
+
+Each trace is reduced to the GPR writes trace_compare.py compares (rd and
+value, from 0x80000000 up to the ECALL) and indexed once in windows of
+--window writes. For every window the index holds the file offset of its
+first write, the register file at its start and a running hash of all
+writes up to its end. The index is cached next to the trace
+(<trace>.windows.json) and rebuilt when the trace changes.
+
+Since the running hashes of two traces agree up to the first bad window and
+differ from there on, that window is found by a binary search over the
+cached hashes. Only the two windows are then read from the traces, and the
+first mismatching write is reported with the instructions of both sides,
+the writes leading up to it and the register file before it:
+
+    First divergence at GPR write #7165 (window 6 of 8, 4 hash comparisons)
+      spike: pc 80003b58 (40788e13) t3:00000407  addi t3, a7, 1031
+      rtl:   pc 80003b58 (40788e13) t3:fffffbf9  addi t3, a7, 1031
+
+Text and binary (+trace_bin) RTL traces are accepted, and filtered or full
+Spike logs.
+
+Usage:
+    python3 scripts/trace_bisect.py --spike <spike_log> --rtl <rtl_trace> \
+        [--elf <elf>] [--window 1024] [--context 8]
+"""
+
+import os
+import sys
+import json
+import struct
+import hashlib
+import argparse
+from itertools import islice, zip_longest
+from commit_log import ABI_NAMES, TEST_START_PC
+from rtl_trace import FLAG_ECALL, FLAG_REG_WRITE, HEADER, RECORD, is_binary_trace
+from rtl_trace import map_trace
+from trace_compare import describe, gpr_writes, report_disassembly
+
+INDEX_SUFFIX = ".windows.json"
+# Bump when the index format changes, so old indexes are rebuilt
+INDEX_VERSION = 1
+
+DEFAULT_WINDOW = 1024
+DEFAULT_CONTEXT = 8
+
+WRITE = struct.Struct("<BI")
+DIGEST_SIZE = 16
+
+
+def text_writes(path, offset=0):
+    """
+    Yield (offset, (pc, binary, rd, value)) for the GPR writes of a text log,
+    reading from a byte offset that is 0 or the offset of a write's line.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        line_offset = [offset]
+
+        def lines():
+            position = offset
+            for raw in f:
+                line_offset[0] = position
+                position += len(raw)
+                yield raw.decode(errors="replace")
+
+        # gpr_writes() yields a write as soon as it has read its line
+        for write in gpr_writes(lines()):
+            yield line_offset[0], write
+
+
+def binary_writes(path, offset=0):
+    """text_writes() for a binary RTL trace; offsets are those of records"""
+    data, count = map_trace(path)
+    if data is None:
+        return
+    end = HEADER.size + count * RECORD.size
+    offset = max(offset, HEADER.size)
+    started = offset > HEADER.size
+    records = RECORD.iter_unpack(memoryview(data)[offset:end])
+    for index, (pc, instr, value, rd, flags, _) in enumerate(records):
+        if not started:
+            if pc < TEST_START_PC:
+                continue
+            started = True
+        if flags & FLAG_ECALL:
+            return
+        if flags & FLAG_REG_WRITE and rd:
+            yield offset + index * RECORD.size, (pc, instr, rd, value)
+
+
+def trace_writes(path, offset=0):
+    """Offsets and GPR writes of a Spike log or RTL trace, from an offset"""
+    if is_binary_trace(path):
+        return binary_writes(path, offset)
+    return text_writes(path, offset)
+
+
+def build_index(path, window):
+    """Index the windows of a trace (see the module docstring)"""
+    regs = [0] * 32
+    windows = []
+    digests = []
+    total = 0
+    for offset, (_, _, rd, value) in trace_writes(path):
+        if total % window == 0:
+            windows.append({"offset": offset, "regs": list(regs)})
+            digests.append(hashlib.blake2b(digest_size=DIGEST_SIZE))
+        digests[-1].update(WRITE.pack(rd, value))
+        regs[rd] = value
+        total += 1
+
+    # Chain the window hashes, so equal hashes mean equal traces up to there
+    running = b""
+    for entry, digest in zip(windows, digests):
+        running = hashlib.blake2b(running + digest.digest(), digest_size=DIGEST_SIZE)
+        running = running.digest()
+        entry["hash"] = running.hex()
+    return {"writes": total, "windows": windows}
+
+
+def index_path(path):
+    return path + INDEX_SUFFIX
+
+
+def trace_stamp(path):
+    """Size and modification time that identify a version of a trace"""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def load_index(path, window, use_cache=True):
+    """Window index of a trace, from the cache when it is still valid"""
+    key = {"version": INDEX_VERSION, "stamp": trace_stamp(path), "window": window}
+    cache = index_path(path)
+    if use_cache:
+        try:
+            with open(cache, "r") as f:
+                index = json.load(f)
+            if all(index.get(name) == value for name, value in key.items()):
+                return index
+        except (OSError, ValueError):
+            pass
+
+    index = dict(key, **build_index(path, window))
+    if use_cache:
+        try:
+            with open(cache, "w") as f:
+                json.dump(index, f)
+        except OSError as e:
+            print(f"Warning: Could not cache the index: {e}", file=sys.stderr)
+    return index
+
+
+def first_bad_window(windows1, windows2):
+    """
+    Binary search for the first window whose running hash differs. Returns
+    (window, comparisons), or (None, comparisons) if the traces are equal.
+    """
+    common = min(len(windows1), len(windows2))
+    low, high = 0, common
+    comparisons = 0
+    while low < high:
+        middle = (low + high) // 2
+        comparisons += 1
+        if windows1[middle]["hash"] == windows2[middle]["hash"]:
+            low = middle + 1
+        else:
+            high = middle
+    if low == common and len(windows1) == len(windows2):
+        return None, comparisons
+    return low, comparisons
+
+
+def window_writes(path, windows, number, window):
+    """The GPR writes of one window of a trace (empty past its end)"""
+    if number >= len(windows):
+        return []
+    writes = trace_writes(path, windows[number]["offset"])
+    return [write for _, write in islice(writes, window)]
+
+
+def format_regs(regs):
+    """Register file as four columns of 'name=value'"""
+    fields = [f"{ABI_NAMES[rd]:>4}={value:08x}" for rd, value in enumerate(regs)]
+    return ["  " + "  ".join(fields[i : i + 4]) for i in range(0, len(fields), 4)]
+
+
+def bisect(spike_log, rtl_trace, window, context, disassembly=None, use_cache=True):
+    """
+    Print the first divergence of the two traces. Returns its GPR write
+    index, or None if the traces agree.
+    """
+    spike_index = load_index(spike_log, window, use_cache)
+    rtl_index = load_index(rtl_trace, window, use_cache)
+    spike_windows = spike_index["windows"]
+    rtl_windows = rtl_index["windows"]
+
+    number, comparisons = first_bad_window(spike_windows, rtl_windows)
+    if number is None:
+        print(
+            f"[PASSED]: {spike_index['writes']} GPR writes agree "
+            f"({len(spike_windows)} windows, {comparisons} hash comparisons)"
+        )
+        return None
+
+    expected_window = window_writes(spike_log, spike_windows, number, window)
+    actual_window = window_writes(rtl_trace, rtl_windows, number, window)
+    pairs = zip_longest(expected_window, actual_window)
+    for position, (expected, actual) in enumerate(pairs):
+        if expected is None or actual is None or expected[2:] != actual[2:]:
+            break
+    else:
+        # Equal writes but different hashes: a stale index
+        raise ValueError("the window index does not match the traces")
+
+    # Both traces agree on everything before the divergence
+    windows = spike_windows if number < len(spike_windows) else rtl_windows
+    regs = list(windows[number]["regs"])
+    matching = expected_window[:position]
+    for _, _, rd, value in matching:
+        regs[rd] = value
+
+    write = number * window + position
+    print(
+        f"First divergence at GPR write #{write} (window {number} of "
+        f"{max(len(spike_windows), len(rtl_windows))}, {comparisons} hash comparisons)"
+    )
+    print(f"  spike: {describe(expected, disassembly)}")
+    print(f"  rtl:   {describe(actual, disassembly)}")
+    if matching and context:
+        print(f"Last {min(context, len(matching))} matching GPR writes:")
+        for entry in matching[-context:]:
+            print(f"  {describe(entry, disassembly)}")
+    print("Register file before the divergence:")
+    for line in format_regs(regs):
+        print(line)
+    print(
+        f"[FAILED]: {spike_index['writes']} spike / {rtl_index['writes']} rtl GPR "
+        f"writes, first mismatch #{write}"
+    )
+    return write
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find the first divergence of a Spike log and an RTL trace."
+    )
+    parser.add_argument("--spike", required=True, help="Spike log file")
+    parser.add_argument("--rtl", required=True, help="RTL trace log file")
+    parser.add_argument("--elf", help="ELF file, to show the disassembly")
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=DEFAULT_WINDOW,
+        help=f"GPR writes per hashed window (default: {DEFAULT_WINDOW})",
+    )
+    parser.add_argument(
+        "--context",
+        type=int,
+        default=DEFAULT_CONTEXT,
+        help="Matching writes shown before the divergence "
+        f"(default: {DEFAULT_CONTEXT})",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Neither read nor write the indexes"
+    )
+    args = parser.parse_args()
+
+    try:
+        write = bisect(
+            args.spike,
+            args.rtl,
+            max(1, args.window),
+            args.context,
+            report_disassembly(args.elf),
+            not args.no_cache,
+        )
+    except (IOError, ValueError) as e:
+        print(f"Error bisecting traces: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    sys.exit(0 if write is None else 1)
+
+
+if __name__ == "__main__":
+    main()
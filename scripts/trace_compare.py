@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# scripts/trace_compare.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Streaming comparison of a Spike log against an RTL trace log.
+
+Both logs are read side by side in a single pass, without intermediate CSV
+files. The normalization matches the CSV flow (spike_log_to_csv.py,
+rtl_log_to_csv.py and riscv-dv's instr_trace_compare.py): only instructions
+that write a GPR other than x0 are compared, starting at 0x80000000 and
+ending at the test's ECALL. Binary RTL traces (+trace_bin, see rtl_trace.py)
+are read directly from their fixed-width records. The result line keeps
+instr_trace_compare's format:
+
+    [PASSED]: 1843 matched
+    [FAILED]: 1200 matched, 643 mismatch
+
+Usage:
+    python3 scripts/trace_compare.py --spike <spike_log> --rtl <rtl_log> [--elf <elf>]
+"""
+
+import sys
+import argparse
+from itertools import zip_longest
+from commit_log import (
+    COMMIT_RE,
+    DISASM_RE,
+    ECALL_BINARY,
+    TEST_START_PC,
+    gpr_field,
+)
+from elf_reader import ElfError
+from rtl_trace import binary_gpr_writes, is_binary_trace
+from rv32i_disasm import program_table
+
+# How many mismatches are listed before only counting the rest
+MISMATCH_PRINT_LIMIT = 5
+
+
+def gpr_writes(lines):
+    """
+    Yield (pc, binary, rd, value) for every GPR write of the test program in
+    a Spike log (filtered or full) or an RTL trace log.
+    """
+    started = False
+    for line in lines:
+        commit = COMMIT_RE.match(line)
+        if commit is None:
+            # Full Spike logs only mark the ECALL with a disassembly line
+            if started:
+                disasm = DISASM_RE.match(line)
+                if disasm and int(disasm.group(2), 16) == ECALL_BINARY:
+                    return
+            continue
+
+        pc_str, binary_str, rd_str, value_str = commit.groups()
+        pc = int(pc_str, 16)
+        if not started:
+            if pc < TEST_START_PC:
+                continue
+            started = True
+
+        binary = int(binary_str, 16)
+        if binary == ECALL_BINARY:
+            return
+
+        if rd_str is None or rd_str == "0":
+            continue
+
+        yield pc, binary, int(rd_str), int(value_str, 16)
+
+
+def log_gpr_writes(log_file):
+    """gpr_writes() of a log file; binary RTL traces are read without parsing"""
+    if is_binary_trace(log_file):
+        yield from binary_gpr_writes(log_file)
+        return
+    with open(log_file, "r", errors="replace") as f:
+        yield from gpr_writes(f)
+
+
+def describe(entry, disassembly=None):
+    """One-line description of a GPR write for the mismatch report"""
+    if entry is None:
+        return "<end of trace>"
+    pc, binary, rd, value = entry
+    text = f"pc {pc:08x} ({binary:08x}) {gpr_field(rd, value)}"
+    if disassembly and pc in disassembly:
+        text += f"  {disassembly[pc][1]}"
+    return text
+
+
+def chunk_lines(chunks):
+    """Split a stream of byte chunks, such as a pipe's, into text lines"""
+    pending = b""
+    for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.decode(errors="replace")
+    if pending:
+        yield pending.decode(errors="replace")
+
+
+def compare_streams(
+    spike_writes,
+    rtl_writes,
+    name1="spike",
+    name2="rtl",
+    disassembly=None,
+    max_mismatches=None,
+):
+    """
+    Compare two GPR write streams in order and print the first mismatches.
+    Writes missing from one stream count as mismatches. The optional disassembly table (see rv32i_disasm.py) adds
+    the instruction text to the report. With max_mismatches, the comparison
+    stops as soon as that many mismatches were found.
+
+    Returns (matched, mismatches, first_mismatch), where first_mismatch is a
+    one-line description of the first divergence, or None.
+    """
+    matched = 0
+    mismatches = 0
+    first_mismatch = None
+    truncated = False
+    pairs = zip_longest(spike_writes, rtl_writes)
+    for index, (expected, actual) in enumerate(pairs):
+        if expected is not None and actual is not None and expected[2:] == actual[2:]:
+            matched += 1
+            continue
+
+        mismatches += 1
+        if mismatches == 1:
+            print(f"First divergence at GPR write #{index}:")
+            first_mismatch = (
+                f"GPR write #{index}: {name1} {describe(expected, disassembly)}; "
+                f"{name2} {describe(actual, disassembly)}"
+            )
+        if mismatches <= MISMATCH_PRINT_LIMIT and not truncated:
+            print(f"  {name1}: {describe(expected, disassembly)}")
+            print(f"  {name2}: {describe(actual, disassembly)}")
+            # Once one trace has ended, the rest of the other is only counted
+            truncated = expected is None or actual is None
+        elif mismatches == MISMATCH_PRINT_LIMIT + 1 and not truncated:
+            print("  ... further mismatches are only counted")
+
+        if max_mismatches and mismatches >= max_mismatches:
+            print(f"Comparison stopped after {mismatches} mismatch(es)")
+            break
+
+    return matched, mismatches, first_mismatch
+
+
+def report_disassembly(elf_file):
+    """Disassembly table for the mismatch report, or None"""
+    if not elf_file:
+        return None
+    try:
+        disassembly, _ = program_table(elf_file)
+    except ElfError as e:
+        print(f"Warning: No disassembly for the report: {e}", file=sys.stderr)
+        return None
+    return disassembly
+
+
+def print_result(matched, mismatches):
+    """Print the riscv-dv style result line"""
+    if mismatches or not matched:
+        print(f"[FAILED]: {matched} matched, {mismatches} mismatch")
+    else:
+        print(f"[PASSED]: {matched} matched")
+
+
+def compare_trace_logs(spike_log_file, rtl_log_file, elf_file=None):
+    """
+    Compare a Spike log and an RTL trace log. Prints the riscv-dv style
+    result line and returns compare_streams()'s result. With elf_file, the
+    mismatch report includes the disassembly of the diverging instructions.
+    """
+    matched, mismatches, first_mismatch = compare_streams(
+        log_gpr_writes(spike_log_file),
+        log_gpr_writes(rtl_log_file),
+        disassembly=report_disassembly(elf_file),
+    )
+    print_result(matched, mismatches)
+    return matched, mismatches, first_mismatch
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare a Spike log against an RTL trace log."
+    )
+    parser.add_argument("--spike", required=True, help="Spike log file")
+    parser.add_argument("--rtl", required=True, help="RTL trace log file")
+    parser.add_argument(
+        "--elf", help="ELF file, to show the disassembly of mismatching writes"
+    )
+    args = parser.parse_args()
+
+    try:
+        matched, mismatches, _ = compare_trace_logs(args.spike, args.rtl, args.elf)
+    except (IOError, ValueError) as e:
+        print(f"Error comparing traces: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    sys.exit(1 if mismatches or not matched else 0)
+
+
+if __name__ == "__main__":
+    main()
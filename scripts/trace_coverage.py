@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# scripts/trace_coverage.py
+#
+# Copyright (c) 2025 Igor Bogdanov
+# All rights reserved.
+
+"""
+Instruction-level functional coverage of a test, measured on its Spike log.
+
+Like riscv-dv's own functional coverage, the bins are sampled from the
+instruction trace of the ISS rather than from the RTL, so they are known as
+soon as Spike has run. Every committed instruction of the test program
+(from 0x80000000 up to the ECALL) hits:
+
+    instr:<name>              the instruction itself
+    value:<name>:<class>      the class of the value it wrote to a GPR
+                              (zero, ones, negative, positive)
+    raw:<name>                a read of the register the previous
+                              instruction wrote (read-after-write hazard)
+    taken:<name> / not_taken:<name>   the outcome of a branch
+
+The bins a test can reach depend on its gen_opts (+no_branch_jump,
++no_csr_instr, ...); universe() lists them, and coverage is the fraction of
+that universe that was hit.
+
+Usage:
+    python3 scripts/trace_coverage.py [--gen-opts "<opts>"] <spike_log> ...
+"""
+
+import sys
+import argparse
+from commit_log import (
+    ECALL_BINARY,
+    ECALL_TRAP_RE,
+    TEST_START_PC,
+    parse_commit,
+)
+from rv32i_disasm import BRANCHES, CSR_OPS, LOADS, OP, OP_IMM, STORES
+
+SHIFTS_IMM = {(0x00, 1): "slli", (0x00, 5): "srli", (0x20, 5): "srai"}
+
+ALU = (
+    list(OP_IMM.values())
+    + list(SHIFTS_IMM.values())
+    + list(OP.values())
+    + ["lui", "auipc"]
+)
+
+# Instruction names of each area of the ISA
+AREAS = {
+    "alu": ALU,
+    "load": list(LOADS.values()),
+    "store": list(STORES.values()),
+    "branch": list(BRANCHES.values()),
+    "jump": ["jal", "jalr"],
+    "csr": list(CSR_OPS.values()),
+    "fence": ["fence", "fence.i"],
+}
+AREA_OF = {name: area for area, names in AREAS.items() for name in names}
+
+VALUE_CLASSES = ("zero", "ones", "negative", "positive")
+
+# Value classes an instruction cannot produce: comparisons only write 0 or 1,
+# lui/auipc always clear the low bits and lbu/lhu zero-extend
+IMPOSSIBLE_VALUES = {
+    "slt": ("ones", "negative"),
+    "sltu": ("ones", "negative"),
+    "slti": ("ones", "negative"),
+    "sltiu": ("ones", "negative"),
+    "lui": ("ones",),
+    "auipc": ("ones",),
+    "lbu": ("ones", "negative"),
+    "lhu": ("ones", "negative"),
+}
+
+# Instructions that read no register and so cannot have a hazard
+NO_SOURCES = ("lui", "auipc", "jal")
+
+# Areas whose instructions are checked for value classes and hazards
+VALUE_AREAS = ("alu", "load")
+HAZARD_AREAS = ("alu", "load", "store", "branch")
+
+
+def instruction_name(insn):
+    """Canonical RV32I name of an instruction word, or None"""
+    opcode = insn & 0x7F
+    funct3 = (insn >> 12) & 0x7
+    funct7 = insn >> 25
+    if opcode == 0x37:
+        return "lui"
+    if opcode == 0x17:
+        return "auipc"
+    if opcode == 0x6F:
+        return "jal"
+    if opcode == 0x67:
+        return "jalr"
+    if opcode == 0x63:
+        return BRANCHES.get(funct3)
+    if opcode == 0x03:
+        return LOADS.get(funct3)
+    if opcode == 0x23:
+        return STORES.get(funct3)
+    if opcode == 0x13:
+        if funct3 in (1, 5):
+            return SHIFTS_IMM.get((funct7, funct3))
+        return OP_IMM.get(funct3)
+    if opcode == 0x33:
+        return OP.get((funct7, funct3))
+    if opcode == 0x0F:
+        return "fence.i" if funct3 == 1 else "fence"
+    if opcode == 0x73 and funct3:
+        return CSR_OPS.get(funct3)
+    return None
+
+
+def source_registers(insn, name):
+    """Registers an instruction reads"""
+    area = AREA_OF.get(name)
+    if name in NO_SOURCES or area in ("fence", None):
+        return ()
+    rs1 = (insn >> 15) & 0x1F
+    rs2 = (insn >> 20) & 0x1F
+    if (insn & 0x7F) in (0x33, 0x23, 0x63):
+        return (rs1, rs2)
+    if area == "csr" and (insn >> 12) & 0x4:
+        # The immediate forms read no register
+        return ()
+    return (rs1,)
+
+
+def value_class(value):
+    """Class of a value written to a GPR"""
+    if value == 0:
+        return "zero"
+    if value == 0xFFFFFFFF:
+        return "ones"
+    return "negative" if value & 0x80000000 else "positive"
+
+
+def parse_gen_opts(gen_opts):
+    """riscv-dv gen_opts ('+key=value ...') as an ordered dictionary"""
+    options = {}
+    for token in gen_opts.split():
+        key, _, value = token.lstrip("+").partition("=")
+        options[key] = value
+    return options
+
+
+def directed_streams(options):
+    """Directed stream names of parsed gen_opts"""
+    return [
+        value.split(",")[0]
+        for key, value in options.items()
+        if key.startswith("directed_instr_")
+    ]
+
+
+def enabled_areas(gen_opts):
+    """Areas of the ISA a test with these gen_opts can generate"""
+    options = parse_gen_opts(gen_opts)
+    areas = set(AREAS)
+    if options.get("no_branch_jump") == "1":
+        areas -= {"branch", "jump"}
+    if options.get("no_csr_instr") == "1":
+        areas.discard("csr")
+    if options.get("no_fence") == "1":
+        areas.discard("fence")
+    # Without a data page, only directed load/store streams access memory
+    memory_streams = [s for s in directed_streams(options) if "load_store" in s]
+    if options.get("no_data_page") == "1" and not memory_streams:
+        areas -= {"load", "store"}
+    return areas
+
+
+def universe(gen_opts=""):
+    """All bins a test with these gen_opts can hit"""
+    areas = enabled_areas(gen_opts)
+    bins = set()
+    for area in areas:
+        for name in AREAS[area]:
+            bins.add(f"instr:{name}")
+            if area in VALUE_AREAS:
+                impossible = IMPOSSIBLE_VALUES.get(name, ())
+                bins.update(
+                    f"value:{name}:{cls}"
+                    for cls in VALUE_CLASSES
+                    if cls not in impossible
+                )
+            if area in HAZARD_AREAS and name not in NO_SOURCES:
+                bins.add(f"raw:{name}")
+            if area == "branch":
+                bins.update({f"taken:{name}", f"not_taken:{name}"})
+    return bins
+
+
+def bin_area(coverage_bin):
+    """Area a bin belongs to; value classes and hazards are areas of their own"""
+    kind, name = coverage_bin.split(":")[:2]
+    if kind == "value":
+        return "value"
+    if kind == "raw":
+        return "hazard"
+    return AREA_OF[name]
+
+
+def trace_commits(lines):
+    """
+    Yield (pc, insn, rd, value) for every commit of the test program in a
+    filtered or full Spike log, up to the ECALL.
+    """
+    started = False
+    for line in lines:
+        commit = parse_commit(line)
+        if commit is None:
+            if started and ECALL_TRAP_RE.search(line):
+                return
+            continue
+        if not started:
+            if commit[0] < TEST_START_PC:
+                continue
+            started = True
+        if commit[1] == ECALL_BINARY:
+            return
+        yield commit
+
+
+def log_bins(spike_log):
+    """Set of bins hit by the test whose Spike log is spike_log"""
+    bins = set()
+    previous_rd = None
+    branch = None
+    with open(spike_log, "r", errors="replace") as f:
+        for pc, insn, rd, value in trace_commits(f):
+            if branch is not None:
+                branch_pc, branch_name = branch
+                outcome = "not_taken" if pc == branch_pc + 4 else "taken"
+                bins.add(f"{outcome}:{branch_name}")
+                branch = None
+
+            name = instruction_name(insn)
+            if name is None:
+                previous_rd = rd
+                continue
+            area = AREA_OF[name]
+            bins.add(f"instr:{name}")
+            if area in VALUE_AREAS and rd:
+                bins.add(f"value:{name}:{value_class(value)}")
+            if previous_rd and previous_rd in source_registers(insn, name):
+                bins.add(f"raw:{name}")
+            if area == "branch":
+                branch = (pc, name)
+            previous_rd = rd
+    return bins
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Functional coverage of tests measured on their Spike logs."
+    )
+    parser.add_argument("spike_logs", nargs="+", help="Spike log files")
+    parser.add_argument(
+        "--gen-opts", default="", help="gen_opts of the test, to narrow the bins"
+    )
+    parser.add_argument(
+        "--missing", action="store_true", help="List the bins that were not hit"
+    )
+    args = parser.parse_args()
+
+    all_bins = universe(args.gen_opts)
+    covered = set()
+    for spike_log in args.spike_logs:
+        try:
+            bins = log_bins(spike_log) & all_bins
+        except OSError as e:
+            print(f"Error reading Spike log: {e}", file=sys.stderr)
+            sys.exit(1)
+        covered |= bins
+        print(f"{spike_log}: {len(bins)}/{len(all_bins)} bins")
+
+    print(
+        f"Coverage: {len(covered)}/{len(all_bins)} bins "
+        f"({len(covered) / len(all_bins):.1%})"
+    )
+    if args.missing:
+        for coverage_bin in sorted(all_bins - covered):
+            print(f"  {coverage_bin}")
+
+
+if __name__ == "__main__":
+    main()
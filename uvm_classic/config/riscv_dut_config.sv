@@ -12,7 +12,9 @@ class riscv_dut_config extends uvm_object;
     
     // Spike reference configuration
     string spike_log_path = "";         // Path to Spike reference log
+    string golden_file_path = "";       // Pre-parsed golden commits (optional)
     string mem_file_path = "";          // Path to memory initialization file
+    string mem_file_format = "bin";     // "bin" ($readmemb) or "hex" ($readmemh)
 
     function new(string name = "riscv_dut_config");
         super.new(name);
@@ -37,7 +39,9 @@ class riscv_dut_config extends uvm_object;
     function void print_config();
         `uvm_info("CONFIG", $sformatf("RISC-V DUT Configuration:"), UVM_LOW)
         `uvm_info("CONFIG", $sformatf("  spike_log_path: %s", spike_log_path), UVM_LOW)
+        `uvm_info("CONFIG", $sformatf("  golden_file_path: %s", golden_file_path), UVM_LOW)
         `uvm_info("CONFIG", $sformatf("  mem_file_path: %s", mem_file_path), UVM_LOW)
+        `uvm_info("CONFIG", $sformatf("  mem_file_format: %s", mem_file_format), UVM_LOW)
     endfunction
 
 endclass 
\ No newline at end of file
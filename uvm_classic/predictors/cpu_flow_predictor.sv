@@ -12,6 +12,7 @@ class cpu_flow_predictor extends uvm_component;
 
     logic [31:0] instr_mem[bit[31:0]];
     string mem_init_file;
+    string mem_init_format = "bin";
 
     function new(string name = "cpu_flow_predictor", uvm_component parent = null);
         super.new(name, parent);
@@ -24,11 +25,15 @@ class cpu_flow_predictor extends uvm_component;
         if (!uvm_config_db#(string)::get(this, "", "MEM_FILE", mem_init_file)) begin
             `uvm_fatal(get_type_name(), "Memory init file not provided via config_db")
         end
+        void'(uvm_config_db#(string)::get(this, "", "MEM_FORMAT", mem_init_format));
     endfunction
     
     task automatic run_phase(uvm_phase phase);
         `uvm_info(get_type_name(), $sformatf("Loading instruction memory for predictor from file: %s", mem_init_file), UVM_MEDIUM)
-        $readmemb(mem_init_file, instr_mem);
+        if (mem_init_format == "hex")
+            $readmemh(mem_init_file, instr_mem);
+        else
+            $readmemb(mem_init_file, instr_mem);
     endtask
 
     virtual function automatic void write(riscv_flow_transaction tx);
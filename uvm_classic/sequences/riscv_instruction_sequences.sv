@@ -10,6 +10,7 @@ class riscv_memory_file_sequence extends uvm_sequence#(riscv_instruction_transac
 
     // Configuration
     string memory_file_path;
+    string memory_file_format = "bin"; // "bin" ($readmemb) or "hex" ($readmemh)
     logic [31:0] memory_data[0:16383]; // 16K instruction memory
     int num_instructions;
 
@@ -26,7 +27,10 @@ class riscv_memory_file_sequence extends uvm_sequence#(riscv_instruction_transac
             `uvm_fatal(get_type_name(), "Memory file path not set")
         end
         
-        $readmemb(memory_file_path, memory_data);
+        if (memory_file_format == "hex")
+            $readmemh(memory_file_path, memory_data);
+        else
+            $readmemb(memory_file_path, memory_data);
         
         num_instructions = 0;
         for (int i = 16383; i >= 0; i--) begin
@@ -10,6 +10,11 @@ class cpu_commit_scoreboard extends uvm_scoreboard;
     
     string spike_log_path;
     integer spike_log_fh;
+    // Pre-parsed golden file (scripts/spike_log_to_golden.py), used instead
+    // of the Spike log when given
+    string golden_file_path = "";
+    integer golden_fh = 0;
+    riscv_commit_transaction golden_tx;
     uvm_event test_done_event;
     bit ecall_detected = 0;
 
@@ -21,6 +26,7 @@ class cpu_commit_scoreboard extends uvm_scoreboard;
         super.build_phase(phase);
         if(!uvm_config_db#(string)::get(this, "", "SPIKE_LOG", spike_log_path))
            `uvm_fatal(get_type_name(), "Could not get SPIKE_LOG path");
+        void'(uvm_config_db#(string)::get(this, "", "GOLDEN_FILE", golden_file_path));
         if(!uvm_config_db#(uvm_event)::get(this, "", "test_done_event", test_done_event))
            `uvm_fatal(get_type_name(), "Could not get test_done_event");
         if(!uvm_config_db#(uvm_tlm_analysis_fifo#(riscv_commit_transaction))::get(this, 
@@ -48,6 +54,11 @@ class cpu_commit_scoreboard extends uvm_scoreboard;
         
         if (expected_q.size() > 0) return;
 
+        if (golden_fh) begin
+            read_golden_line();
+            return;
+        end
+
         while(expected_q.size() == 0) begin
             if ($feof(spike_log_fh)) begin
                 `uvm_info(get_type_name(), "End of Spike log reached.", UVM_MEDIUM)
@@ -94,6 +105,29 @@ class cpu_commit_scoreboard extends uvm_scoreboard;
         expected_q.push_back(expected_tx);
     endfunction
 
+    // One line per commit: pc instr gpr_write_enable rd_addr rd_data, in hex
+    task read_golden_line();
+        bit [31:0] pc_exp, instr_exp, rd_data_exp;
+        bit [4:0]  rd_addr_exp;
+        bit gpr_write_enable_exp;
+
+        if ($fscanf(golden_fh, "%h %h %h %h %h\n", pc_exp, instr_exp,
+                    gpr_write_enable_exp, rd_addr_exp, rd_data_exp) != 5) begin
+            `uvm_info(get_type_name(), "End of golden file reached.", UVM_MEDIUM)
+            test_done_event.trigger();
+            return;
+        end
+
+        // The queue holds at most this one transaction, popped before the
+        // next line is read, so it is reused rather than created per commit
+        golden_tx.pc = pc_exp;
+        golden_tx.instr = instr_exp;
+        golden_tx.gpr_write_enable = gpr_write_enable_exp;
+        golden_tx.rd_addr = rd_addr_exp;
+        golden_tx.rd_data = rd_data_exp;
+        expected_q.push_back(golden_tx);
+    endtask
+
     task check_transaction(riscv_commit_transaction actual_tx);
         riscv_commit_transaction expected_tx;
 
@@ -122,6 +156,17 @@ class cpu_commit_scoreboard extends uvm_scoreboard;
     endtask
 
     function void start_of_simulation_phase(uvm_phase phase);
+        if (golden_file_path != "") begin
+            // The golden file starts at the first commit of the test
+            golden_fh = $fopen(golden_file_path, "r");
+            if (golden_fh == 0) begin
+                `uvm_fatal(get_type_name(), $sformatf("Could not open golden file: %s", golden_file_path))
+            end
+            golden_tx = riscv_commit_transaction::type_id::create("expected_tx");
+            `uvm_info(get_type_name(), $sformatf("Reading expected commits from %s", golden_file_path), UVM_MEDIUM)
+            return;
+        end
+
         spike_log_fh = $fopen(spike_log_path, "r");
         if (spike_log_fh == 0) begin
             `uvm_fatal(get_type_name(), $sformatf("Could not open Spike log: %s", spike_log_path))
@@ -18,7 +18,9 @@ class riscv_base_test extends uvm_test;
 
     virtual function void build_phase(uvm_phase phase);
         string spike_log_path;
+        string golden_file_path;
         string mem_file_path;
+        string mem_file_format;
         super.build_phase(phase);
         
         cfg = riscv_dut_config::type_id::create("cfg");
@@ -28,12 +30,23 @@ class riscv_base_test extends uvm_test;
 
         if (!$value$plusargs("SPIKE_LOG=%s", spike_log_path))
             `uvm_fatal(get_type_name(), "SPIKE_LOG plusarg not provided")
+
+        // Optional: expected commits pre-parsed from the Spike log
+        if (!$value$plusargs("GOLDEN_FILE=%s", golden_file_path))
+            golden_file_path = "";
         
         if (!$value$plusargs("MEM_FILE=%s", mem_file_path))
             `uvm_fatal(get_type_name(), "MEM_FILE plusarg not provided")
 
+        if (!$value$plusargs("MEM_FORMAT=%s", mem_file_format))
+            mem_file_format = "bin";
+        if (mem_file_format != "bin" && mem_file_format != "hex")
+            `uvm_fatal(get_type_name(), $sformatf("MEM_FORMAT must be bin or hex, got %s", mem_file_format))
+
         cfg.spike_log_path = spike_log_path;
+        cfg.golden_file_path = golden_file_path;
         cfg.mem_file_path = mem_file_path;
+        cfg.mem_file_format = mem_file_format;
         `uvm_info("TEST", "Configuration paths set successfully", UVM_MEDIUM)
         
         if (!uvm_config_db#(virtual cpu_interface.monitor_mp)::get(this, "*", "monitor_vif", cfg.monitor_vif))
@@ -55,7 +68,9 @@ class riscv_base_test extends uvm_test;
         
         // Backwards compatibility
         uvm_config_db#(string)::set(this, "env.commit_scoreboard", "SPIKE_LOG", spike_log_path);
+        uvm_config_db#(string)::set(this, "env.commit_scoreboard", "GOLDEN_FILE", golden_file_path);
         uvm_config_db#(string)::set(this, "env.flow_predictor", "MEM_FILE", mem_file_path);
+        uvm_config_db#(string)::set(this, "env.flow_predictor", "MEM_FORMAT", mem_file_format);
         uvm_config_db#(uvm_event)::set(this, "env.commit_scoreboard", "test_done_event", test_done_event);
         uvm_config_db#(uvm_event)::set(this, "env.flow_scoreboard", "test_done_event", test_done_event);
     endfunction
@@ -73,6 +88,7 @@ class riscv_base_test extends uvm_test;
         
         memory_seq = riscv_memory_file_sequence::type_id::create("memory_seq");
         memory_seq.memory_file_path = cfg.mem_file_path;
+        memory_seq.memory_file_format = cfg.mem_file_format;
         
         `uvm_info("TEST", $sformatf("Starting memory file sequence with file: %s", cfg.mem_file_path), UVM_MEDIUM)
         
@@ -39,24 +39,102 @@ module tb_top;
         .rst(rst)
     );
 
+    string ram_init_format;
+    bit program_done;
+    bit trace_bin;
+    bit trace_flush;
+
+    // Binary trace (+trace_bin): an "RVTR" header and version word followed
+    // by one 16-byte record per cycle (see scripts/rtl_trace.py):
+    // pc, instr, value, and a word holding rd (bits 7:0) and flags (15:8).
+    localparam bit [31:0] TRACE_MAGIC   = 32'h52545652;  // "RVTR" little-endian
+    localparam bit [31:0] TRACE_VERSION = 32'd1;
+    // Record flags: bit 0 marks a GPR write, bit 1 the ECALL
+    wire [7:0] trace_flags = {6'b0, instruction == 32'h00000073, reg_write_o};
+
+    // Open the trace log of the next program
+    task automatic open_trace(string trace_log);
+        $display("[TB] Opening trace log for writing: %s", trace_log);
+        if (trace_bin) begin
+            trace_file = $fopen(trace_log, "wb");
+            $fwrite(trace_file, "%u%u", TRACE_MAGIC, TRACE_VERSION);
+        end else begin
+            trace_file = $fopen(trace_log, "w");
+        end
+    endtask
+
+    // Load a program image into the instruction memory. Memory files are
+    // binary ($readmemb) unless +ram_init_format=hex.
+    task automatic load_program(string ram_init_file);
+        $display("[TB] Loading RAM init file: %s (%s)", ram_init_file, ram_init_format);
+        if (ram_init_format == "hex")
+            $readmemh(ram_init_file, instr_mem.RAM);
+        else
+            $readmemb(ram_init_file, instr_mem.RAM);
+    endtask
+
+    // Reset the DUT and run the loaded program until ECALL or the timeout
+    task automatic run_program();
+        program_done = 0;
+        rst = 1;
+        @(posedge clock);
+        rst = 0;
+        fork
+            wait (program_done);
+            #40000;
+        join_any
+        disable fork;
+        rst = 1;
+        $fclose(trace_file);
+    endtask
+
+    // Batch mode (+batch_file=<file>) runs several programs in one simulation.
+    // Each line of the batch file is "<ram_init_file> <trace_log> <words>",
+    // where <words> is the length of the image, so that only the previous
+    // program has to be cleared from the RAM before the next one is loaded.
     initial begin
         string trace_log;
         string ram_init_file;
+        string batch_file;
+        integer batch_fd;
+        integer num_words;
+        integer loaded_words;
 
-        if ($value$plusargs("ram_init_file=%s", ram_init_file)) begin
-            $display("[TB] Loading RAM init file: %s", ram_init_file);
-            $readmemb(ram_init_file, instr_mem.RAM);
-        end 
-
-        if ($value$plusargs("trace_log=%s", trace_log)) begin
-            $display("[TB] Opening trace log for writing: %s", trace_log);
-            trace_file = $fopen(trace_log, "w");
-        end else begin
-            trace_file = $fopen("rtl_trace.log", "w");
-        end
+        if (!$value$plusargs("ram_init_format=%s", ram_init_format))
+            ram_init_format = "bin";
+        trace_bin = $test$plusargs("trace_bin");
+        // Flush every record when the trace is checked live through a pipe
+        trace_flush = $test$plusargs("trace_flush");
 
         $dumpfile("logs/waves.vcd");
         $dumpvars(0, tb_top);
+
+        if ($value$plusargs("batch_file=%s", batch_file)) begin
+            batch_fd = $fopen(batch_file, "r");
+            if (batch_fd == 0) begin
+                $display("[TB] ERROR: Could not open batch file: %s", batch_file);
+                $finish;
+            end
+            loaded_words = 0;
+            while ($fscanf(batch_fd, "%s %s %d\n", ram_init_file, trace_log, num_words) == 3) begin
+                for (int i = 0; i < loaded_words; i++)
+                    instr_mem.RAM[i] = 32'b0;
+                load_program(ram_init_file);
+                loaded_words = num_words;
+                open_trace(trace_log);
+                run_program();
+            end
+            $fclose(batch_fd);
+        end else begin
+            if ($value$plusargs("ram_init_file=%s", ram_init_file))
+                load_program(ram_init_file);
+
+            if (!$value$plusargs("trace_log=%s", trace_log))
+                trace_log = "rtl_trace.log";
+            open_trace(trace_log);
+            run_program();
+        end
+        $finish;
     end
 
     initial begin
@@ -64,15 +142,6 @@ module tb_top;
         forever #5 clock = ~clock;
     end
 
-    initial begin
-        rst = 1;
-        @(posedge clock);
-        rst = 0;
-        #40000;
-        $fclose(trace_file);
-        $finish;
-    end
-
     cpu_top dut (
         .clock(clock),
         .rst(rst),
@@ -89,7 +158,11 @@ module tb_top;
     );
 
     always @(posedge clock) begin
-        if (!rst) begin
+        if (!rst && trace_bin) begin
+            $fwrite(trace_file, "%u%u%u%u", current_PC, instruction,
+                    reg_write_o ? rf_rd_value_o : 32'b0,
+                    {16'b0, trace_flags, 3'b0, rd_o});
+        end else if (!rst) begin
             if (reg_write_o) begin
                 $fdisplay(trace_file, "core   0: 3 0x%08h (0x%08h) x%0d 0x%08h",
                           current_PC, instruction, rd_o, rf_rd_value_o);
@@ -98,16 +171,19 @@ module tb_top;
                           current_PC, instruction);
             end
         end
+        if (!rst && trace_flush)
+            $fflush(trace_file);
     end
 
     always @(posedge clock) begin
         if (!rst && instruction == 32'h00000073) begin
-            $fdisplay(trace_file, "core   0: 3 0x%08h (0x%08h)",
-                      current_PC, instruction);
-            $display("ECALL instruction detected at PC=0x%h. Finishing simulation.", current_PC);
+            // The binary record of this cycle already carries the ECALL flag
+            if (!trace_bin)
+                $fdisplay(trace_file, "core   0: 3 0x%08h (0x%08h)",
+                          current_PC, instruction);
+            $display("ECALL instruction detected at PC=0x%h. Finishing program.", current_PC);
             #10;
-            $fclose(trace_file);
-            $finish;
+            program_done = 1;
         end
     end
 